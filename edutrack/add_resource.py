@@ -5,6 +5,7 @@ Usage: python add_resource.py
 
 from app import app, db
 from models import Resource
+from catalog import invalidate_catalog
 
 def add_resource(title, subject, url, grade=None, exam=None, difficulty='easy', resource_type='auto'):
     """
@@ -42,6 +43,7 @@ def add_resource(title, subject, url, grade=None, exam=None, difficulty='easy',
         
         db.session.add(resource)
         db.session.commit()
+        invalidate_catalog()
         print(f"✓ Successfully added: {title} ({resource_type.upper()})")
         return resource
 
@@ -1,28 +1,102 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, send_from_directory
+from flask import Flask, Blueprint, current_app, render_template, request, session, redirect, url_for, flash, jsonify, send_from_directory, send_file, abort
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
-from werkzeug.utils import secure_filename
+from alembic import command as alembic_command
+from sqlalchemy.engine import make_url
 from datetime import datetime, date, timedelta
-from models import db, User, Resource, Question, StudyPlan, Progress, WeeklyStats
-import random
+from models import db, User, Resource, Question, StudyPlan, Progress, WeeklyStats, UserInsight
+from pdf_ingest import ingest_pdfs, count_pages
+from question_import import import_questions_file, import_questions_upload, clean_record, DEFAULT_BATCH_SIZE
+from question_pool import question_pool
+from app_api import api
+from batch import batch_refresh, load_checkpoint, DEFAULT_SHARD_SIZE
+from catalog import catalog_version, invalidate_catalog, resource_query
+from fragments import fragment_cache, fragment_etag
+from config import (database_url, engine_options, sqlite_pragmas, apply_sqlite_pragmas, alembic_config,
+                    instrumentation_settings, write_behind_settings, DEFAULT_SECRET_KEY)
+from health import health
+from instrumentation import init_instrumentation
+from leaderboard import leaderboards
+from write_behind import ProgressWriter
+from previews import PreviewCache, MAX_PREVIEW_PAGES
+from planner import generate_plan, MAX_PLAN_WEEKS
+from pagination import paginate_keyset
+from skills import difficulty_for, skill_cache
+from user_cache import user_cache
+from seed import seed_scale, scale_email, DEFAULT_PASSWORD as SCALE_PASSWORD
+from search import search, highlight, plain, rebuild_search_index, KINDS as SEARCH_KINDS
+from storage import (store_stream, blob_path, blob_url, collect_garbage, release, PDF_URL_PREFIX, DIGEST_PATTERN,
+                     GC_MIN_AGE_SECONDS)
+from stats import (recompute_weekly_stats, dashboard_summary, weekly_history,
+                   DEFAULT_HISTORY_WEEKS, MAX_HISTORY_WEEKS)
+import click
+import time
 import re
 import os
 
-app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///edutrack.db'
-app.config['SECRET_KEY'] = 'supersecretkey'
-app.config['UPLOAD_FOLDER'] = 'static/pdfs'
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 ALLOWED_EXTENSIONS = {'pdf'}
+PDF_MAX_AGE = 365 * 24 * 3600  # stored PDFs are immutable
 
-db.init_app(app)
 login_manager = LoginManager()
-login_manager.init_app(app)
 login_manager.login_view = 'login'
+# `flask --app app.py <command>` maintenance commands
+commands = Blueprint('commands', __name__, cli_group=None)
+# (rule, view, options) for every page view; create_app() attaches them
+ROUTES = []
+
+def route(rule, **options):
+    """Like app.route(), for every app create_app() builds"""
+    def register(view):
+        ROUTES.append((rule, view, options))
+        return view
+    return register
+
+def create_app(overrides=None):
+    """Build and configure an EduTrack app (config.py settings, then overrides)
+
+    Importing this module builds the shared `app` below; wsgi.py serves it.
+    The schema is never touched here: run `flask --app app.py upgrade-db`
+    once per deploy, before starting the server.
+    """
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_url()
+    app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY') or DEFAULT_SECRET_KEY
+    app.config['UPLOAD_FOLDER'] = 'static/pdfs'  # legacy timestamped uploads
+    app.config['PDF_STORAGE'] = os.path.join(app.instance_path, 'pdfs')  # content-addressed store
+    app.config['PREVIEW_CACHE'] = os.path.join(app.instance_path, 'previews')  # rendered thumbnails
+    app.config['PREVIEW_CACHE_MAX_BYTES'] = 200 * 1024 * 1024
+    app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+    app.config.update(instrumentation_settings(app.instance_path))
+    app.config['WRITE_BEHIND'] = write_behind_settings()
+    app.config.update(overrides or {})
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(app.config['SQLALCHEMY_DATABASE_URI']))
+
+    db.init_app(app)
+    with app.app_context():
+        apply_sqlite_pragmas(db.engine, sqlite_pragmas())  # see config.py
+    app.extensions['preview_cache'] = PreviewCache(app.config['PREVIEW_CACHE'],
+                                                   app.config['PREVIEW_CACHE_MAX_BYTES'])
+    login_manager.init_app(app)
+    init_instrumentation(app)  # no-op unless INSTRUMENTATION=1
+    app.extensions['metrics'].add_source('user_cache', 'User loader cache', user_cache.stats,
+                                         counters=('hits', 'misses'))
+    app.extensions['metrics'].add_source('fragment_cache', 'Resource list fragments', fragment_cache.stats,
+                                         counters=('hits', 'misses'))
+    progress_writer = app.extensions['progress_writer'] = ProgressWriter(app, **app.config['WRITE_BEHIND'])
+    app.extensions['metrics'].add_source('progress_writer', 'Write-behind Progress queue', progress_writer.stats,
+                                         counters=('written', 'batches', 'synchronous'))
+    app.add_template_filter(highlight, 'highlight')
+    for rule, view, options in ROUTES:
+        app.add_url_rule(rule, view_func=view, **options)
+    app.register_blueprint(commands)
+    app.register_blueprint(api)  # JSON API under /api/v1 (app_api.py)
+    app.register_blueprint(health)  # /health/live and /health/ready (health.py)
+    return app
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    # Served from a per-process cache; see user_cache.py
+    return user_cache.get(int(user_id))
 
 def detect_resource_type(url):
     """Detect resource type from URL"""
@@ -39,113 +113,36 @@ def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 def save_uploaded_pdf(file):
-    """Save uploaded PDF file and return the URL path"""
+    """Stream an uploaded PDF into content-addressed storage
+
+    Returns (url, content_hash, file_size), or None for a disallowed file.
+    Uploading the same file twice stores it once.
+    """
     if file and allowed_file(file.filename):
-        # Create uploads directory if it doesn't exist
-        upload_folder = app.config['UPLOAD_FOLDER']
-        os.makedirs(upload_folder, exist_ok=True)
-        
-        # Secure the filename
-        filename = secure_filename(file.filename)
-        # Add timestamp to avoid conflicts
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_')
-        filename = timestamp + filename
-        
-        # Save file
-        file_path = os.path.join(upload_folder, filename)
-        file.save(file_path)
-        
-        # Return URL path (relative to static folder)
-        return url_for('static', filename=f'pdfs/{filename}')
+        content_hash, file_size = store_stream(file.stream, current_app.config['PDF_STORAGE'])
+        return blob_url(content_hash), content_hash, file_size
     return None
 
-def get_week_start(date_obj):
-    """Get the Monday of the week for a given date"""
-    days_since_monday = date_obj.weekday()
-    return date_obj - timedelta(days=days_since_monday)
-
-def update_weekly_stats(user_id):
-    """Update or create weekly stats for the current week"""
-    today = date.today()
-    week_start = get_week_start(today)
-    
-    # Get or create weekly stats
-    weekly_stat = WeeklyStats.query.filter_by(
-        user_id=user_id,
-        week_start=week_start
-    ).first()
-    
-    if not weekly_stat:
-        weekly_stat = WeeklyStats(
-            user_id=user_id,
-            week_start=week_start
-        )
-        db.session.add(weekly_stat)
-    
-    # Calculate stats for this week
-    week_end = week_start + timedelta(days=6)
-    
-    # Resources completed this week
-    resources = Progress.query.filter(
-        Progress.user_id == user_id,
-        Progress.item_type == 'resource',
-        Progress.timestamp >= datetime.combine(week_start, datetime.min.time()),
-        Progress.timestamp <= datetime.combine(week_end, datetime.max.time())
-    ).count()
-    
-    # Quizzes attempted this week
-    quizzes = Progress.query.filter(
-        Progress.user_id == user_id,
-        Progress.item_type == 'quiz',
-        Progress.timestamp >= datetime.combine(week_start, datetime.min.time()),
-        Progress.timestamp <= datetime.combine(week_end, datetime.max.time())
-    ).all()
-    
-    quizzes_attempted = len(quizzes)
-    quizzes_correct = sum(1 for q in quizzes if q.extra_score == 1)
-    
-    weekly_stat.resources_completed = resources
-    weekly_stat.quizzes_attempted = quizzes_attempted
-    weekly_stat.quizzes_correct = quizzes_correct
-    # Estimate study hours (1 resource = 0.5 hours, 1 quiz = 0.25 hours)
-    weekly_stat.study_hours = (resources * 0.5) + (quizzes_attempted * 0.25)
-    
-    db.session.commit()
-    return weekly_stat
+def upgrade_database():
+    """Create missing tables, then apply pending Alembic migrations"""
+    db.create_all()
+    config = alembic_config(current_app.root_path)
+    config.attributes['configure_logger'] = False
+    alembic_command.upgrade(config, 'head')
+
+@commands.cli.command('upgrade-db')
+def upgrade_db():
+    """Apply pending schema migrations (indexes, constraints)"""
+    upgrade_database()
+    print("✓ Database schema is up to date")
 
 # Initialize database
-@app.cli.command('init-db')
+@commands.cli.command('init-db')
 def init_db():
     """Initialize database with sample data"""
-    with app.app_context():
-        # Create all tables including WeeklyStats
-        db.create_all()
-        print("✓ All database tables created")
-        
-        # Add resource_type column if it doesn't exist (migration)
-        try:
-            from sqlalchemy import inspect, text
-            inspector = inspect(db.engine)
-            
-            try:
-                columns = [col['name'] for col in inspector.get_columns('resource')]
-                if 'resource_type' not in columns:
-                    with db.engine.begin() as conn:
-                        conn.execute(text('ALTER TABLE resource ADD COLUMN resource_type VARCHAR(20) DEFAULT "other"'))
-                    print("✓ Added resource_type column to resource table")
-            except Exception:
-                pass
-            
-            # Verify WeeklyStats table
-            try:
-                inspector.get_columns('weekly_stats')
-                print("✓ WeeklyStats table verified")
-            except Exception:
-                db.create_all()
-                print("✓ WeeklyStats table created")
-        except Exception as e:
-            print(f"Migration note: {e}")
-            db.create_all()
+    # Create missing tables, then apply Alembic migrations
+    upgrade_database()
+    print("✓ Database tables created and migrations applied")
     
     # Create admin user
     if not User.query.filter_by(email='admin@edutrack.local').first():
@@ -180,21 +177,135 @@ def init_db():
     # Add sample questions
     if Question.query.count() == 0:
         questions = [
-            Question(subject='Math', exam='JEE', difficulty='easy', prompt='What is 2+2?', answer='4', options='2,3,4,5'),
-            Question(subject='Chemistry', exam='NEET', difficulty='medium', prompt='What is the atomic number of Carbon?', answer='6', options='5,6,7,8'),
-            Question(subject='Physics', exam='JEE', difficulty='hard', prompt='What is the speed of light?', answer='3x10^8 m/s', options='3x10^8 m/s,3x10^7 m/s,3x10^9 m/s,3x10^6 m/s'),
+            Question(subject='Math', exam='JEE', difficulty='easy', prompt='What is 2+2?', options=['2', '3', '4', '5'], answer_index=2),
+            Question(subject='Chemistry', exam='NEET', difficulty='medium', prompt='What is the atomic number of Carbon?', options=['5', '6', '7', '8'], answer_index=1),
+            Question(subject='Physics', exam='JEE', difficulty='hard', prompt='What is the speed of light?', options=['3x10^8 m/s', '3x10^7 m/s', '3x10^9 m/s', '3x10^6 m/s'], answer_index=0),
         ]
         db.session.add_all(questions)
     
     db.session.commit()
+    invalidate_catalog()
     print("Database initialized with sample data!")
 
+@commands.cli.command('recompute-weekly-stats')
+@click.option('--user-id', type=int, default=None, help='Only rebuild stats for this user')
+def recompute_weekly_stats_command(user_id):
+    """Rebuild WeeklyStats from Progress history"""
+    rows = recompute_weekly_stats(user_id)
+    print(f"✓ Rebuilt {rows} weekly stats rows from progress history")
+
+@commands.cli.command('batch-refresh')
+@click.option('--start-id', type=int, default=None, help='First user id to refresh')
+@click.option('--end-id', type=int, default=None, help='Last user id to refresh')
+@click.option('--shard-size', type=int, default=DEFAULT_SHARD_SIZE, help='Users per worker task')
+@click.option('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+@click.option('--resume', is_flag=True, help='Continue from the last run\'s checkpoint')
+def batch_refresh_command(start_id, end_id, shard_size, workers, resume):
+    """Recompute weekly stats, quiz difficulty and plan adherence for all users"""
+    checkpoint_path = os.path.join(current_app.instance_path, 'batch_refresh.json')
+    if resume:
+        checkpoint = load_checkpoint(checkpoint_path)
+        if not checkpoint:
+            print("No checkpoint found; starting from the first user")
+        else:
+            start_id = checkpoint['next_user_id']
+            end_id = end_id or checkpoint['end_user_id']
+            if start_id > end_id:
+                print("✓ Last run already finished")
+                return
+            print(f"Resuming at user {start_id}")
+    started = time.perf_counter()
+    users, weekly_rows = batch_refresh(start_id, end_id, shard_size=shard_size, workers=workers,
+                                       checkpoint_path=checkpoint_path)
+    print(f"✓ Refreshed {users} users ({weekly_rows} weekly stats rows) "
+          f"in {time.perf_counter() - started:.1f}s")
+
+@commands.cli.command('seed-scale')
+@click.option('--users', type=int, default=10000, help='Students to create')
+@click.option('--resources', type=int, default=5000, help='Resources to create')
+@click.option('--questions', type=int, default=20000, help='Questions to create')
+@click.option('--events', type=int, default=100, help='Average Progress rows per student')
+@click.option('--weeks', type=int, default=12, help='Weeks of history')
+@click.option('--prefix', default='scale', help='Students log in as <prefix><n>@edutrack.local')
+@click.option('--password', default=SCALE_PASSWORD, help='Password of every generated student')
+@click.option('--seed', type=int, default=42, help='Random seed (same seed, same data)')
+def seed_scale_command(users, resources, questions, events, weeks, prefix, password, seed):
+    """Fill the database with a synthetic production-sized dataset"""
+    if User.query.filter_by(email=scale_email(prefix, 0)).first():
+        raise click.ClickException(f"{scale_email(prefix, 0)} already exists; pick another --prefix")
+    started = time.perf_counter()
+
+    def progress(table, rows):
+        print(f"  {table}: {rows:,} rows ({time.perf_counter() - started:.0f}s)")
+
+    report = seed_scale(users, resources, questions, events, weeks=weeks, prefix=prefix,
+                        password=password, seed=seed, progress=progress)
+    invalidate_catalog()
+    question_pool.invalidate()
+    elapsed = time.perf_counter() - started
+    print(f"✓ Seeded {report.total:,} rows in {elapsed:.0f}s ({report.total / elapsed:,.0f} rows/s): {report.summary()}")
+    print(f"  Log in as {scale_email(prefix, 0)} / {password}")
+
+@commands.cli.command('import-questions')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']), default=None,
+              help='File format (default: from the file extension)')
+@click.option('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='Rows per transaction')
+def import_questions_command(path, fmt, batch_size):
+    """Bulk import questions from a CSV or JSONL file"""
+    report = import_questions_file(path, fmt, batch_size)
+    question_pool.invalidate()
+    invalidate_catalog()
+    for error in report.errors:
+        print(f"  ! {error}")
+    print(f"✓ {report.summary()}")
+
+@commands.cli.command('ingest-pdfs')
+@click.argument('root', type=click.Path(exists=True, file_okay=False), required=False)
+@click.option('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+@click.option('--dry-run', is_flag=True, help='Report what would be added without writing')
+@click.option('--rescan', is_flag=True, help='Ignore the manifest and re-hash every file')
+def ingest_pdfs_command(root, workers, dry_run, rescan):
+    """Add every PDF under ROOT (default: the repo's chapter folders) as a Resource"""
+    root = root or os.path.dirname(current_app.root_path)
+    report = ingest_pdfs(
+        root,
+        storage_root=current_app.config['PDF_STORAGE'],
+        manifest_path=os.path.join(current_app.instance_path, 'pdf_manifest.json'),
+        workers=workers,
+        dry_run=dry_run,
+        rescan=rescan,
+        exclude=[os.path.join(current_app.root_path, current_app.config['UPLOAD_FOLDER'])]
+    )
+    if report.inserted and not dry_run:
+        invalidate_catalog()
+    print(f"✓ {report.summary()}")
+
+@commands.cli.command('gc-pdfs')
+@click.option('--dry-run', is_flag=True, help='List unreferenced files without deleting them')
+@click.option('--min-age', type=int, default=GC_MIN_AGE_SECONDS // 60,
+              help='Keep files stored in the last N minutes (uploads in progress)')
+def gc_pdfs_command(dry_run, min_age):
+    """Delete stored PDFs that no Resource references"""
+    removed = collect_garbage(current_app.config['PDF_STORAGE'], dry_run=dry_run, min_age=min_age * 60)
+    for digest in removed:
+        print(f"  - {digest}")
+    print(f"✓ {len(removed)} unreferenced file(s) {'found' if dry_run else 'removed'}")
+
+@commands.cli.command('rebuild-search-index')
+def rebuild_search_index_command():
+    """Refill the full-text search index from the resource and question tables"""
+    if rebuild_search_index():
+        print("✓ Search index rebuilt")
+    else:
+        print("Search index is SQLite-only; other databases use LIKE matching")
+
 # Routes
-@app.route('/')
+@route('/')
 def index():
     return render_template('index.html')
 
-@app.route('/login', methods=['GET', 'POST'])
+@route('/login', methods=['GET', 'POST'])
 def login():
     if request.method == 'POST':
         email = request.form.get('email')
@@ -209,7 +320,7 @@ def login():
     
     return render_template('login.html')
 
-@app.route('/register', methods=['GET', 'POST'])
+@route('/register', methods=['GET', 'POST'])
 def register():
     if request.method == 'POST':
         name = request.form.get('name')
@@ -237,88 +348,103 @@ def register():
     
     return render_template('register.html')
 
-@app.route('/logout')
+@route('/logout')
 @login_required
 def logout():
     logout_user()
     return redirect(url_for('index'))
 
-@app.route('/dashboard')
+@route('/dashboard')
 @login_required
 def dashboard():
-    # Count completed resources
-    completed_resources = Progress.query.filter_by(
-        user_id=current_user.id,
-        item_type='resource'
-    ).count()
-    
-    total_resources = Resource.query.count()
-    
-    # Count quiz attempts
-    quiz_attempts = Progress.query.filter_by(
-        user_id=current_user.id,
-        item_type='quiz'
-    ).count()
-    
-    total_quizzes = Question.query.count()
-    
-    # Simple achievements
-    achievements = []
-    if completed_resources >= 5:
-        achievements.append('Resource Explorer')
-    if quiz_attempts >= 10:
-        achievements.append('Quiz Master')
-    if completed_resources >= 10 and quiz_attempts >= 20:
-        achievements.append('Dedicated Learner')
-    
-    return render_template('dashboard.html',
-                         completed_resources=completed_resources,
-                         total_resources=total_resources,
-                         quiz_attempts=quiz_attempts,
-                         total_quizzes=total_quizzes,
-                         achievements=achievements)
-
-@app.route('/resources')
+    # One grouped Progress query; catalog totals come from a process cache
+    summary = dashboard_summary(current_user.id)
+    # This week's standings for the user's exam, from the in-memory boards
+    exam = current_user.target_exam or None
+    return render_template('dashboard.html', **summary, exam=exam,
+                           leaders=leaderboards.top(exam),
+                           my_rank=leaderboards.rank(current_user.id, exam))
+
+@route('/api/dashboard')
+@login_required
+def api_dashboard():
+    """Dashboard summary as JSON for cheap frontend polling"""
+    return jsonify(dashboard_summary(current_user.id))
+
+def search_args():
+    """(query, kind, page, per_page) from the query string"""
+    kind = request.args.get('kind', 'resources')
+    if kind not in SEARCH_KINDS:
+        kind = 'resources'
+    return (request.args.get('q', ''), kind,
+            request.args.get('page', 1, type=int),
+            request.args.get('per_page', 20, type=int))
+
+@route('/search')
+@login_required
+def search_page():
+    q, kind, page, per_page = search_args()
+    results = search(q, kind=kind, page=page, per_page=per_page)
+    return render_template('search.html', q=q, **results)
+
+@route('/api/search')
+@login_required
+def api_search():
+    """Ranked search results as JSON (?q=&kind=resources|questions&page=&per_page=)"""
+    q, kind, page, per_page = search_args()
+    results = search(q, kind=kind, page=page, per_page=per_page)
+    for row in results['results']:
+        row['snippet'] = plain(row['snippet'])
+    return jsonify(results)
+
+@route('/resources')
 @login_required
 def resources():
     subject = request.args.get('subject', '')
     difficulty = request.args.get('difficulty', '')
-    
-    query = Resource.query
-    
-    if subject:
-        query = query.filter_by(subject=subject)
-    if difficulty:
-        query = query.filter_by(difficulty=difficulty)
-    
+    after = request.args.get('after')
+    before = request.args.get('before')
+    per_page = request.args.get('per_page', 20, type=int)
+    
+    # The list depends on the filters, the user's grade/exam and the catalog,
+    # not on who asks: render it once per catalog version (see fragments.py)
+    version = catalog_version()
+    key = ('resources', current_user.grade, current_user.target_exam, subject, difficulty, after, before, per_page)
+    etag = fragment_etag(version, key, current_user.is_admin)
+    # A pending flash has to be rendered, so never answer 304 over one
+    if request.if_none_match.contains(etag) and not session.get('_flashes'):
+        response = current_app.response_class(status=304)
+    else:
+        catalog = fragment_cache.get((version,) + key, lambda: render_resource_catalog(version, subject, difficulty,
+                                                                                       after, before, per_page))
+        response = current_app.response_class(render_template('resources.html', catalog=catalog))
+    response.set_etag(etag)
+    # Per-user page: browsers may keep it but must revalidate every time
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+def render_resource_catalog(version, subject, difficulty, after, before, per_page):
+    """The filter form, one page of resources and its links, as HTML"""
     # Filter by user's grade/exam if available
-    if current_user.grade:
-        query = query.filter((Resource.grade == current_user.grade) | (Resource.grade == None))
-    if current_user.target_exam:
-        query = query.filter((Resource.exam == current_user.target_exam) | (Resource.exam == None))
-    
-    items = query.all()
-    subjects = db.session.query(Resource.subject).distinct().all()
-    subjects = [s[0] for s in subjects]
-    
-    return render_template('resources.html', items=items, subjects=subjects)
+    query = resource_query(current_user, subject, difficulty)
+    
+    # Newest first, one indexed page at a time (?after=/?before= cursors)
+    page = paginate_keyset(query, Resource, after=after, before=before, per_page=per_page)
+    subjects = fragment_cache.get((version, 'resource-subjects'), lambda: [
+        s[0] for s in db.session.query(Resource.subject).distinct().all()
+    ])
+    return render_template('_resource_catalog.html', items=page.items, page=page, subjects=subjects)
 
-@app.route('/track', methods=['POST'])
+@route('/track', methods=['POST'])
 @login_required
 def track():
     kind = request.form.get('kind')
     ref_id = request.form.get('ref_id')
     
-    progress = Progress(
-        user_id=current_user.id,
-        item_type=kind,
-        ref_id=ref_id
-    )
-    db.session.add(progress)
-    db.session.commit()
-    
-    # Update weekly stats
-    update_weekly_stats(current_user.id)
+    # Progress row and weekly counters: one transaction now, or queued in
+    # write-behind mode (see write_behind.py)
+    current_app.extensions['progress_writer'].submit(current_user.id, kind, ref_id)
     
     # Return JSON for AJAX requests (check if it's an AJAX request)
     if request.headers.get('X-Requested-With') == 'XMLHttpRequest' or request.is_json:
@@ -327,17 +453,20 @@ def track():
     flash('Progress tracked!', 'success')
     return redirect(request.referrer or url_for('resources'))
 
-@app.route('/quiz', methods=['GET', 'POST'])
+@route('/quiz', methods=['GET', 'POST'])
 @login_required
 def quiz():
     subject = request.args.get('subject', '')
     
     if request.method == 'POST':
-        qid = request.form.get('qid')
-        chosen = request.form.get('chosen')
-        question = Question.query.get(qid)
+        qid = request.form.get('qid', type=int)
+        chosen = request.form.get('chosen', type=int)  # option index
+        question = db.session.get(Question, qid) if qid is not None else None
+        if question is None:
+            flash('That question is no longer available. Try this one.', 'error')
+            return redirect(url_for('quiz', subject=subject))
         
-        if question and chosen == question.answer:
+        if chosen == question.answer_index:
             # Correct answer
             score = 1
             flash('Correct!', 'success')
@@ -345,84 +474,48 @@ def quiz():
             score = 0
             flash(f'Wrong! Correct answer: {question.answer}', 'error')
         
-        # Track progress
-        progress = Progress(
-            user_id=current_user.id,
-            item_type='quiz',
-            ref_id=qid,
-            extra_score=score
-        )
-        db.session.add(progress)
-        db.session.commit()
-        
-        # Update weekly stats
-        update_weekly_stats(current_user.id)
+        # Track progress, bump weekly stats and the subject skill in one
+        # transaction (queued in write-behind mode)
+        current_app.extensions['progress_writer'].submit(current_user.id, 'quiz', question.id, score,
+                                                         subject=question.subject)
+        skill_cache.apply(current_user.id, question.subject, score)
+        question_pool.remember(current_user.id, question.id)
         
         return redirect(url_for('quiz', subject=subject))
     
-    # Determine target difficulty based on recent performance
-    recent_quizzes = Progress.query.filter_by(
-        user_id=current_user.id,
-        item_type='quiz'
-    ).order_by(Progress.timestamp.desc()).limit(5).all()
-    
-    if recent_quizzes:
-        avg_score = sum(q.extra_score or 0 for q in recent_quizzes) / len(recent_quizzes)
-        if avg_score >= 0.8:
-            target_diff = 'hard'
-        elif avg_score >= 0.5:
-            target_diff = 'medium'
-        else:
-            target_diff = 'easy'
-    else:
-        target_diff = 'easy'
+    # Target difficulty from the user's (cached) accuracy in this subject
+    target_diff = difficulty_for(skill_cache.get(current_user.id), subject or None)
     
-    # Get question
-    query = Question.query.filter_by(difficulty=target_diff)
-    if subject:
-        query = query.filter_by(subject=subject)
-    
-    questions = query.all()
-    question = random.choice(questions) if questions else None
+    # Sample one question id from the in-memory pool, then load just that row
+    question = question_pool.pick(
+        target_diff,
+        subject=subject or None,
+        exam=current_user.target_exam or None,
+        user_id=current_user.id
+    )
     
-    subjects = db.session.query(Question.subject).distinct().all()
-    subjects = [s[0] for s in subjects]
+    subjects = question_pool.subjects()
     
     return render_template('quiz.html', question=question, subjects=subjects, target_diff=target_diff)
 
-@app.route('/study_plan', methods=['GET', 'POST'])
+@route('/study_plan', methods=['GET', 'POST'])
 @login_required
 def study_plan():
     if request.method == 'POST':
-        duration_weeks = int(request.form.get('duration_weeks', 4))
+        duration_weeks = request.form.get('duration_weeks', 4, type=int)
         selected_subjects = request.form.getlist('subjects')
         
         if not selected_subjects:
             flash('Please select at least one subject', 'error')
             return redirect(url_for('study_plan'))
         
-        # Deactivate old plans
-        StudyPlan.query.filter_by(user_id=current_user.id).update({'is_active': False})
-        
-        # Generate weekly plan
-        start_date = date.today()
-        plan_items = []
+        # Weighted by exam weightage and weak subjects; replaces the active plan
+        allocation = generate_plan(current_user.id, current_user.target_exam,
+                                   selected_subjects, duration_weeks)
         
-        for week in range(duration_weeks):
-            for day in range(7):
-                current_date = start_date + timedelta(weeks=week, days=day)
-                subject = random.choice(selected_subjects)
-                plan_items.append(StudyPlan(
-                    user_id=current_user.id,
-                    date=current_date,
-                    subject=subject,
-                    is_active=True
-                ))
-        
-        db.session.add_all(plan_items)
-        db.session.commit()
-        
-        flash('Study plan generated!', 'success')
+        summary = ', '.join(f'{subject} {days}d' for subject, days in
+                            sorted(allocation.items(), key=lambda item: -item[1]))
+        flash(f'Study plan generated! ({summary})', 'success')
         return redirect(url_for('study_plan'))
     
     # Get active plan
@@ -432,10 +525,46 @@ def study_plan():
     ).order_by(StudyPlan.date).all()
     
     all_subjects = ['Math', 'Physics', 'Chemistry', 'Biology', 'English']
+    # Adherence is precomputed nightly by `flask batch-refresh`
+    insight = db.session.get(UserInsight, current_user.id) if plan else None
     
-    return render_template('study_plan.html', plan=plan, all_subjects=all_subjects)
+    return render_template('study_plan.html', plan=plan, all_subjects=all_subjects,
+                           max_weeks=MAX_PLAN_WEEKS, insight=insight)
+
+@route(PDF_URL_PREFIX + '/<digest>.pdf')
+def serve_pdf(digest):
+    """Serve a stored PDF; the URL is its content hash, so it never changes"""
+    if not DIGEST_PATTERN.match(digest):
+        abort(404)
+    path = blob_path(current_app.config['PDF_STORAGE'], digest)
+    if not os.path.exists(path):
+        abort(404)
+    # conditional=True answers If-None-Match with 304 and Range with 206
+    response = send_file(path, mimetype='application/pdf', conditional=True,
+                         etag=digest, max_age=PDF_MAX_AGE)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
 
-@app.route('/admin', methods=['GET', 'POST'])
+@route(PDF_URL_PREFIX + '/<digest>/preview.jpg')
+def serve_pdf_preview(digest):
+    """First-page thumbnail of a stored PDF, rendered on first request"""
+    page = request.args.get('page', 1, type=int)
+    if not DIGEST_PATTERN.match(digest) or not 1 <= page <= MAX_PREVIEW_PAGES:
+        abort(404)
+    source = blob_path(current_app.config['PDF_STORAGE'], digest)
+    if not os.path.exists(source):
+        abort(404)
+    path = current_app.extensions['preview_cache'].get(source, digest, page)
+    if path is None:
+        abort(404)
+    response = send_file(path, mimetype='image/jpeg', conditional=True,
+                         etag=f'{digest}-p{page}', max_age=PDF_MAX_AGE)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+@route('/admin', methods=['GET', 'POST'])
 @login_required
 def admin():
     if not current_user.is_admin:
@@ -449,13 +578,16 @@ def admin():
             url = request.form.get('url', '').strip()
             resource_type = request.form.get('resource_type', 'other')
             
+            content_hash = file_size = page_count = None
+            
             # Check if PDF file was uploaded
             pdf_file = request.files.get('pdf_file')
             if pdf_file and pdf_file.filename:
                 # Handle file upload
-                uploaded_url = save_uploaded_pdf(pdf_file)
-                if uploaded_url:
-                    url = uploaded_url
+                stored = save_uploaded_pdf(pdf_file)
+                if stored:
+                    url, content_hash, file_size = stored
+                    page_count = count_pages(blob_path(current_app.config['PDF_STORAGE'], content_hash))
                     resource_type = 'pdf'
                     flash('PDF file uploaded successfully!', 'success')
                 else:
@@ -492,23 +624,30 @@ def admin():
                 exam=request.form.get('exam') or None,
                 difficulty=request.form.get('difficulty', 'easy'),
                 url=url,
-                resource_type=resource_type
+                resource_type=resource_type,
+                content_hash=content_hash,
+                file_size=file_size,
+                page_count=page_count
             )
             db.session.add(resource)
             db.session.commit()
+            invalidate_catalog()
+            if content_hash:
+                current_app.extensions['preview_cache'].pregenerate(blob_path(current_app.config['PDF_STORAGE'], content_hash), content_hash)
             flash(f'Resource added successfully! ({resource_type.upper()})', 'success')
         
         elif form_type == 'question':
-            question = Question(
-                subject=request.form.get('subject'),
-                exam=request.form.get('exam'),
-                difficulty=request.form.get('difficulty', 'easy'),
-                prompt=request.form.get('prompt'),
-                options=request.form.get('options'),
-                answer=request.form.get('answer')
-            )
+            # Same validation as the bulk importer (options separated by |)
+            try:
+                row = clean_record(request.form.to_dict())
+            except ValueError as e:
+                flash(f'Question not added: {e}', 'error')
+                return redirect(url_for('admin'))
+            question = Question(**row)
             db.session.add(question)
             db.session.commit()
+            question_pool.add(question)
+            invalidate_catalog()
             flash('Question added!', 'success')
         
         return redirect(url_for('admin'))
@@ -518,7 +657,51 @@ def admin():
     
     return render_template('admin.html', resources=resources, questions=questions)
 
-@app.route('/db_browser')
+@route('/admin/resources/<int:resource_id>/delete', methods=['POST'])
+@login_required
+def admin_delete_resource(resource_id):
+    """Remove a resource; its stored PDF goes once nothing else references it"""
+    if not current_user.is_admin:
+        flash('Access denied', 'error')
+        return redirect(url_for('dashboard'))
+    
+    resource = db.session.get(Resource, resource_id)
+    if resource is None:
+        flash('Resource not found.', 'error')
+        return redirect(url_for('admin'))
+    
+    content_hash = resource.content_hash
+    db.session.delete(resource)
+    db.session.commit()
+    invalidate_catalog()
+    if content_hash:
+        release(content_hash, current_app.config['PDF_STORAGE'])
+    flash(f'Resource "{resource.title}" deleted.', 'success')
+    return redirect(url_for('admin'))
+
+@route('/admin/import_questions', methods=['POST'])
+@login_required
+def admin_import_questions():
+    """Bulk question upload (CSV or JSONL) from the admin panel"""
+    if not current_user.is_admin:
+        flash('Access denied', 'error')
+        return redirect(url_for('dashboard'))
+    
+    upload = request.files.get('questions_file')
+    if not upload or not upload.filename:
+        flash('Please choose a CSV or JSONL file to import.', 'error')
+        return redirect(url_for('admin'))
+    
+    report = import_questions_upload(upload)
+    question_pool.invalidate()
+    invalidate_catalog()
+    
+    flash(f'Question import: {report.summary()}', 'success' if report.inserted else 'error')
+    for error in report.errors[:5]:
+        flash(error, 'error')
+    return redirect(url_for('admin'))
+
+@route('/db_browser')
 @login_required
 def db_browser():
     """Web-based database browser"""
@@ -536,113 +719,68 @@ def db_browser():
         'study_plans': StudyPlan.query.count()
     }
     
-    # Get data
-    users = User.query.order_by(User.created_at.desc()).limit(50).all()
-    resources = Resource.query.order_by(Resource.created_at.desc()).limit(50).all()
-    questions = Question.query.order_by(Question.created_at.desc()).limit(50).all()
+    # Get data: each section pages on its own cursor (?users_after=...)
+    pages = {
+        name: paginate_keyset(model.query, model,
+                              after=request.args.get(f'{name}_after'),
+                              before=request.args.get(f'{name}_before'),
+                              per_page=50)
+        for name, model in (('users', User), ('resources', Resource), ('questions', Question))
+    }
     weekly_stats = WeeklyStats.query.order_by(WeeklyStats.week_start.desc()).limit(20).all()
     recent_progress = Progress.query.order_by(Progress.timestamp.desc()).limit(30).all()
     
     return render_template('db_browser.html',
                          stats=stats,
-                         users=users,
-                         resources=resources,
-                         questions=questions,
+                         pages=pages,
+                         users=pages['users'].items,
+                         resources=pages['resources'].items,
+                         questions=pages['questions'].items,
                          weekly_stats=weekly_stats,
                          recent_progress=recent_progress)
 
-@app.route('/weekly_monitoring', methods=['GET'])
+@route('/admin/metrics')
+@login_required
+def admin_metrics():
+    """Per-endpoint latency percentiles and SQL counts for this process"""
+    if not current_user.is_admin:
+        flash('Access denied. Admin only.', 'error')
+        return redirect(url_for('dashboard'))
+    return render_template('metrics.html',
+                           enabled=current_app.config['INSTRUMENTATION'],
+                           metrics=current_app.extensions['metrics'],
+                           pid=os.getpid())
+
+@route('/metrics')
+def prometheus_metrics():
+    """Prometheus text format; admins, or a scraper with METRICS_TOKEN"""
+    token = current_app.config['METRICS_TOKEN']
+    authorized = (token and request.headers.get('Authorization') == f'Bearer {token}') or \
+        (current_user.is_authenticated and current_user.is_admin)
+    if not authorized:
+        abort(404)
+    return current_app.extensions['metrics'].prometheus(), 200, \
+        {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
+@route('/weekly_monitoring', methods=['GET'])
 @login_required
 def weekly_monitoring():
-    # Update current week stats
-    current_week_stat = update_weekly_stats(current_user.id)
-    
-    # Get last 4 weeks of stats
-    today = date.today()
-    weeks_data = []
-    
-    for i in range(4):
-        week_start = get_week_start(today) - timedelta(weeks=i)
-        week_stat = WeeklyStats.query.filter_by(
-            user_id=current_user.id,
-            week_start=week_start
-        ).first()
-        
-        if week_stat:
-            weeks_data.append({
-                'week': f"Week {4-i}",
-                'week_start': week_stat.week_start.strftime('%Y-%m-%d'),
-                'resources': week_stat.resources_completed,
-                'quizzes': week_stat.quizzes_attempted,
-                'accuracy': round(week_stat.get_accuracy(), 1),
-                'study_hours': round(week_stat.study_hours, 1)
-            })
-        else:
-            weeks_data.append({
-                'week': f"Week {4-i}",
-                'week_start': week_start.strftime('%Y-%m-%d'),
-                'resources': 0,
-                'quizzes': 0,
-                'accuracy': 0,
-                'study_hours': 0
-            })
-    
-    # Calculate trends
-    if len(weeks_data) >= 2:
-        current = weeks_data[0]
-        previous = weeks_data[1]
-        
-        trends = {
-            'resources': current['resources'] - previous['resources'],
-            'quizzes': current['quizzes'] - previous['quizzes'],
-            'accuracy': current['accuracy'] - previous['accuracy'],
-            'study_hours': current['study_hours'] - previous['study_hours']
-        }
-    else:
-        trends = {'resources': 0, 'quizzes': 0, 'accuracy': 0, 'study_hours': 0}
+    # Read-only: one range query over WeeklyStats, no writes on this GET
+    weeks = request.args.get('weeks', DEFAULT_HISTORY_WEEKS, type=int)
+    current_week_stat, weeks_data, trends = weekly_history(current_user.id, weeks)
     
     return render_template('weekly_monitoring.html', 
                          current_week=current_week_stat,
                          weeks_data=weeks_data,
-                         trends=trends)
+                         trends=trends,
+                         history_options=[4, 8, 12, 26, MAX_HISTORY_WEEKS])
+
+app = create_app()
 
 if __name__ == '__main__':
-    with app.app_context():
-        # Create all tables (including WeeklyStats)
-        db.create_all()
-        print("✓ Database tables created/verified")
-        
-        # Add resource_type column if it doesn't exist (migration)
-        try:
-            from sqlalchemy import inspect, text
-            inspector = inspect(db.engine)
-            
-            # Check if resource table exists and add resource_type column if needed
-            try:
-                columns = [col['name'] for col in inspector.get_columns('resource')]
-                if 'resource_type' not in columns:
-                    with db.engine.begin() as conn:
-                        conn.execute(text('ALTER TABLE resource ADD COLUMN resource_type VARCHAR(20) DEFAULT "other"'))
-                    print("✓ Added resource_type column to resource table")
-            except Exception:
-                pass  # Table might not exist yet
-            
-            # Verify WeeklyStats table exists
-            try:
-                inspector.get_columns('weekly_stats')
-                print("✓ WeeklyStats table verified")
-            except Exception:
-                # Table doesn't exist, create it
-                db.create_all()
-                print("✓ WeeklyStats table created")
-                
-        except Exception as e:
-            print(f"Database migration note: {e}")
-            # Ensure all tables are created
-            db.create_all()
-    
-    print("Starting EduTrack server...")
-    print("Database: edutrack.db")
+    # Development server (debugger + reloader). Production: see wsgi.py.
+    # The schema is not created or migrated here; run upgrade-db first.
+    print("Starting EduTrack development server...")
+    print(f"Database: {make_url(app.config['SQLALCHEMY_DATABASE_URI']).render_as_string(hide_password=True)}")
     print("Server: http://localhost:5000")
     app.run(debug=True, host='0.0.0.0', port=5000)
-
@@ -1,20 +1,295 @@
-from flask import Flask, render_template
-from flask_sqlalchemy import SQLAlchemy
-from flask_login import LoginManager
-from datetime import datetime
-from flask_cors import CORS
-
-app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///edutrack.db'
-app.config['SECRET_KEY'] = 'supersecretkey'
-
-db = SQLAlchemy(app)
-CORS(app)
-
-# 🏠 Home route
-@app.route('/')
-def home():
-    return render_template('index.html')
-
-if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0')
+"""
+JSON API for the EduTrack mobile client
+A Blueprint mounted at /api/v1 on the main app, sharing its models, session
+login and process caches. Batch endpoints take N quiz answers or N resource
+completions and write them in one transaction. GET responses carry an ETag,
+so a client that sends If-None-Match gets a bodyless 304 when nothing
+changed.
+"""
+
+from datetime import date
+from flask import Blueprint, jsonify, request, url_for
+from flask_login import current_user, login_user, logout_user
+from sqlalchemy import select
+from werkzeug.security import check_password_hash
+from catalog import resource_query
+from leaderboard import leaderboards, DEFAULT_TOP, MAX_TOP
+from models import db, User, Resource, Question, StudyPlan, UserInsight
+from pagination import paginate_keyset
+from planner import generate_plan, MAX_PLAN_WEEKS
+from question_pool import question_pool
+from skills import record_answers, difficulty_for, skill_cache
+from sync import sync_events
+from stats import record_progress_batch, weekly_history, DEFAULT_HISTORY_WEEKS
+
+api = Blueprint('api', __name__, url_prefix='/api/v1')
+
+# Largest batch accepted by the answer and completion endpoints
+MAX_BATCH_SIZE = 500
+
+PUBLIC_ENDPOINTS = {'api.login'}
+
+
+def api_error(message, status=400):
+    response = jsonify({'error': message})
+    response.status_code = status
+    return response
+
+
+def conditional_json(payload):
+    """JSON response with an ETag; 304 if it matches If-None-Match"""
+    response = jsonify(payload)
+    response.add_etag()
+    # Per-user data: clients may store it but must revalidate every time
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
+def json_body(key):
+    """The list under key in the JSON request body, checked against MAX_BATCH_SIZE"""
+    data = request.get_json(silent=True)
+    items = data.get(key) if isinstance(data, dict) else None
+    if not isinstance(items, list) or not items:
+        raise ValueError(f"body must be a JSON object with a non-empty '{key}' list")
+    if len(items) > MAX_BATCH_SIZE:
+        raise ValueError(f"at most {MAX_BATCH_SIZE} items per request")
+    return items
+
+
+@api.before_request
+def require_login():
+    # JSON 401 instead of flask-login's redirect to the HTML login page
+    if request.endpoint not in PUBLIC_ENDPOINTS and not current_user.is_authenticated:
+        return api_error('authentication required', 401)
+
+
+def user_json(user):
+    return {
+        'id': user.id,
+        'name': user.name,
+        'email': user.email,
+        'grade': user.grade,
+        'target_exam': user.target_exam,
+        'is_admin': user.is_admin,
+    }
+
+
+def resource_json(resource):
+    return {
+        'id': resource.id,
+        'title': resource.title,
+        'subject': resource.subject,
+        'grade': resource.grade,
+        'exam': resource.exam,
+        'difficulty': resource.difficulty,
+        'resource_type': resource.resource_type,
+        'url': resource.url,
+        'preview_url': (url_for('serve_pdf_preview', digest=resource.content_hash)
+                        if resource.content_hash else None),
+        'page_count': resource.page_count,
+        'file_size': resource.file_size,
+        'created_at': resource.created_at.isoformat() if resource.created_at else None,
+    }
+
+
+def question_json(question):
+    """A question as shown to a student (no answer)"""
+    return {
+        'id': question.id,
+        'subject': question.subject,
+        'exam': question.exam,
+        'difficulty': question.difficulty,
+        'prompt': question.prompt,
+        'options': question.options,
+    }
+
+
+@api.route('/login', methods=['POST'])
+def login():
+    """Start a session from {"email", "password"}; the client keeps the cookie"""
+    data = request.get_json(silent=True) or {}
+    user = User.query.filter_by(email=data.get('email')).first()
+    if not user or not check_password_hash(user.password_hash, data.get('password') or ''):
+        return api_error('invalid email or password', 401)
+    login_user(user, remember=bool(data.get('remember')))
+    return jsonify(user_json(user))
+
+
+@api.route('/logout', methods=['POST'])
+def logout():
+    logout_user()
+    return jsonify({'status': 'ok'})
+
+
+@api.route('/me')
+def me():
+    return conditional_json(user_json(current_user))
+
+
+@api.route('/resources')
+def resources():
+    """One keyset page of resources (?subject=&difficulty=&after=&before=&per_page=)"""
+    query = resource_query(current_user, request.args.get('subject', ''),
+                           request.args.get('difficulty', ''))
+    page = paginate_keyset(query, Resource,
+                           after=request.args.get('after'),
+                           before=request.args.get('before'),
+                           per_page=request.args.get('per_page', 20, type=int))
+    return conditional_json({
+        'resources': [resource_json(resource) for resource in page.items],
+        'next_cursor': page.next_cursor,
+        'prev_cursor': page.prev_cursor,
+    })
+
+
+@api.route('/resources/complete', methods=['POST'])
+def complete_resources():
+    """Mark {"resource_ids": [...]} completed in one transaction"""
+    try:
+        raw_ids = json_body('resource_ids')
+    except ValueError as e:
+        return api_error(str(e))
+    try:
+        ids = [int(resource_id) for resource_id in raw_ids]
+    except (TypeError, ValueError):
+        return api_error('resource_ids must be integers')
+    found = set(db.session.execute(select(Resource.id).where(Resource.id.in_(ids))).scalars())
+    recorded = record_progress_batch(current_user.id, [
+        {'item_type': 'resource', 'ref_id': resource_id} for resource_id in ids if resource_id in found
+    ])
+    return jsonify({'recorded': recorded, 'unknown': [i for i in ids if i not in found]})
+
+
+@api.route('/quiz/next')
+def next_question():
+    """A question at the user's level for ?subject= (or any subject)"""
+    subject = request.args.get('subject') or None
+    difficulty = difficulty_for(skill_cache.get(current_user.id), subject)
+    question = question_pool.pick(difficulty, subject=subject,
+                                  exam=current_user.target_exam or None,
+                                  user_id=current_user.id)
+    return jsonify({
+        'difficulty': difficulty,
+        'question': question_json(question) if question else None,
+    })
+
+
+@api.route('/quiz/answers', methods=['POST'])
+def submit_answers():
+    """Grade and record {"answers": [{"question_id", "chosen"}, ...]} in one transaction
+
+    chosen is the option index. Questions are loaded with one IN query;
+    unknown question ids are reported and skipped.
+    """
+    try:
+        raw_answers = json_body('answers')
+    except ValueError as e:
+        return api_error(str(e))
+    try:
+        answers = [(int(answer['question_id']), int(answer['chosen'])) for answer in raw_answers]
+    except (TypeError, KeyError, ValueError):
+        return api_error('each answer needs integer question_id and chosen')
+
+    questions = {question.id: question for question in
+                 Question.query.filter(Question.id.in_({qid for qid, _ in answers}))}
+    results, events, graded = [], [], []
+    for qid, chosen in answers:
+        question = questions.get(qid)
+        if question is None:
+            results.append({'question_id': qid, 'error': 'unknown question'})
+            continue
+        score = 1 if chosen == question.answer_index else 0
+        events.append({'item_type': 'quiz', 'ref_id': qid, 'score': score})
+        graded.append((qid, question.subject, score))
+        results.append({'question_id': qid, 'correct': bool(score),
+                        'answer_index': question.answer_index})
+    record_answers(current_user.id, [(subject, score) for _, subject, score in graded])
+    record_progress_batch(current_user.id, events)
+
+    for qid, subject, score in graded:
+        skill_cache.apply(current_user.id, subject, score)
+        question_pool.remember(current_user.id, qid)
+    return jsonify({'results': results})
+
+
+@api.route('/sync', methods=['POST'])
+def sync():
+    """Upload queued offline events {"events": [{"id", "type", ..., "at"}]}; safe to retry"""
+    try:
+        raw_events = json_body('events')
+    except ValueError as e:
+        return api_error(str(e))
+    return jsonify(sync_events(current_user.id, raw_events))
+
+
+@api.route('/study_plan')
+def study_plan():
+    """The active plan, oldest day first, with last batch-refresh adherence"""
+    plan = StudyPlan.query.filter_by(user_id=current_user.id, is_active=True).order_by(StudyPlan.date).all()
+    insight = db.session.get(UserInsight, current_user.id) if plan else None
+    return conditional_json({
+        'days': [{'date': day.date.isoformat(), 'subject': day.subject} for day in plan],
+        'adherence': round(insight.get_adherence(), 1) if insight and insight.plan_days else None,
+    })
+
+
+@api.route('/study_plan', methods=['POST'])
+def create_study_plan():
+    """Replace the active plan from {"subjects": [...], "weeks": n}"""
+    data = request.get_json(silent=True) or {}
+    subjects = data.get('subjects')
+    if not isinstance(subjects, list) or not subjects or not all(isinstance(s, str) for s in subjects):
+        return api_error("'subjects' must be a non-empty list of names")
+    try:
+        weeks = int(data.get('weeks', 4))
+    except (TypeError, ValueError):
+        return api_error("'weeks' must be an integer")
+    allocation = generate_plan(current_user.id, current_user.target_exam, subjects,
+                               max(1, min(weeks, MAX_PLAN_WEEKS)))
+    return jsonify({'allocation': allocation}), 201
+
+
+@api.route('/weekly_stats')
+def weekly_stats():
+    """Weekly history, newest first (?weeks=N)"""
+    weeks = request.args.get('weeks', DEFAULT_HISTORY_WEEKS, type=int)
+    current_week, weeks_data, trends = weekly_history(current_user.id, weeks)
+    return conditional_json({
+        'current_week': {
+            'week_start': current_week.week_start.isoformat(),
+            'resources': current_week.resources_completed or 0,
+            'quizzes': current_week.quizzes_attempted or 0,
+            'quizzes_correct': current_week.quizzes_correct or 0,
+            'study_hours': round(current_week.study_hours or 0.0, 1),
+        },
+        'weeks': weeks_data,
+        'trends': trends,
+    })
+
+
+@api.route('/leaderboard')
+def leaderboard():
+    """Top users for an exam and week, plus the caller's rank
+
+    ?exam= defaults to the caller's target exam, ?week= (a Monday,
+    YYYY-MM-DD) to this week, ?limit= to 10.
+    """
+    my_exam = current_user.target_exam or None
+    exam = request.args.get('exam', my_exam) or None
+    week_starts = leaderboards.week_starts()
+    week = request.args.get('week')
+    try:
+        week_start = date.fromisoformat(week) if week else week_starts[0]
+    except ValueError:
+        return api_error("'week' must be a date (YYYY-MM-DD)")
+    if week_start not in week_starts:
+        return api_error(f"'week' must be one of {', '.join(w.isoformat() for w in week_starts)}")
+    limit = request.args.get('limit', DEFAULT_TOP, type=int)
+    return conditional_json({
+        'exam': exam,
+        'week_start': week_start.isoformat(),
+        'weeks': [w.isoformat() for w in week_starts],
+        'top': leaderboards.top(exam, week_start, max(1, min(limit, MAX_TOP))),
+        'me': leaderboards.rank(current_user.id, exam, week_start) if exam == my_exam else None,
+    })
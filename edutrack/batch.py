@@ -0,0 +1,257 @@
+"""
+Nightly batch refresh for EduTrack
+`flask batch-refresh` splits the user-id range into shards and recomputes,
+for every user in a shard, WeeklyStats and study-plan adherence (stored in
+UserInsight), and replays SubjectSkill from the quiz history. Each shard is
+a handful of set-based queries plus batched upserts in one transaction, run
+on a ProcessPoolExecutor.
+
+Live requests keep incrementing WeeklyStats and SubjectSkill while a shard
+is recomputed, so each shard locks its rows before it reads Progress (see
+_lock_shard). On SQLite that is the database write lock: writers wait for
+the shard to commit (about a second per 1000 users, well inside
+busy_timeout) and shards write one at a time. On other databases the
+shard's existing rows are locked; a user's first event of a new week that
+commits between the shard's read and its upsert is still overwritten, and
+the next run counts it again.
+
+Shards finish out of order, so a checkpoint file records the highest user
+id below which every shard is done; --resume continues from there.
+"""
+
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, datetime
+from sqlalchemy import case, func, insert, select, delete, text, and_, or_
+from models import db, User, Progress, Question, Resource, StudyPlan, WeeklyStats, UserInsight, SubjectSkill
+from stats import get_week_start, RESOURCE_HOURS, QUIZ_HOURS
+from skills import ewma
+
+DEFAULT_SHARD_SIZE = 1000
+
+_worker_app = None
+
+
+def upsert(model, rows, key_columns):
+    """INSERT ... ON CONFLICT (key) DO UPDATE for a batch of row dicts
+
+    SQLite and PostgreSQL upsert natively; other databases delete the
+    matching keys first. Rows are sent as one executemany.
+    """
+    if not rows:
+        return
+    table = model.__table__
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        stmt = dialect_insert(table)
+        updates = {column: stmt.excluded[column] for column in rows[0] if column not in key_columns}
+        db.session.execute(stmt.on_conflict_do_update(index_elements=key_columns, set_=updates), rows)
+        return
+    keys = [tuple(row[column] for column in key_columns) for row in rows]
+    for offset in range(0, len(keys), 500):
+        db.session.execute(delete(table).where(or_(*(
+            and_(*(table.c[column] == value for column, value in zip(key_columns, key)))
+            for key in keys[offset:offset + 500]
+        ))))
+    db.session.execute(insert(table), rows)
+
+
+def _activity(first_id, last_id):
+    """Per (user, day, kind, subject) counts for one shard in one grouped query"""
+    day = func.date(Progress.timestamp)
+    subject = func.coalesce(Question.subject, Resource.subject)
+    correct = case((Progress.extra_score == 1, 1), else_=0)
+    return db.session.execute(
+        select(Progress.user_id, day, Progress.item_type, subject, func.count(), func.sum(correct))
+        .select_from(Progress)
+        .outerjoin(Question, and_(Progress.item_type == 'quiz', Question.id == Progress.ref_id))
+        .outerjoin(Resource, and_(Progress.item_type == 'resource', Resource.id == Progress.ref_id))
+        .where(Progress.user_id.between(first_id, last_id),
+               Progress.item_type.in_(('resource', 'quiz')))
+        .group_by(Progress.user_id, day, Progress.item_type, subject)
+    ).all()
+
+
+def _lock_shard(first_id, last_id):
+    """Hold off live WeeklyStats/SubjectSkill increments for the shard until commit"""
+    if db.session.get_bind().dialect.name == 'sqlite':
+        # Any write takes SQLite's single write lock for the rest of the transaction
+        db.session.execute(text('UPDATE weekly_stats SET id = id WHERE 0'))
+        return
+    for model in (WeeklyStats, SubjectSkill):
+        db.session.execute(select(model.user_id).where(model.user_id.between(first_id, last_id))
+                           .with_for_update()).all()
+
+
+def _skills(first_id, last_id):
+    """{(user_id, subject): (accuracy, attempts)} replayed from quiz history"""
+    skills = {}
+    for user_id, subject, score in db.session.execute(
+        select(Progress.user_id, Question.subject, Progress.extra_score)
+        .join(Question, Question.id == Progress.ref_id)
+        .where(Progress.user_id.between(first_id, last_id), Progress.item_type == 'quiz')
+        .order_by(Progress.user_id, Progress.timestamp, Progress.id)
+    ):
+        accuracy, attempts = skills.get((user_id, subject), (0.0, 0))
+        skills[(user_id, subject)] = (ewma(accuracy, 1 if score == 1 else 0, attempts), attempts + 1)
+    return skills
+
+
+def refresh_shard(first_id, last_id, today=None):
+    """Recompute stats and insights for users first_id..last_id (inclusive)
+
+    Returns (users, weekly_rows). Runs in the caller's app context.
+    """
+    today = today or date.today()
+    now = datetime.utcnow()
+    user_ids = db.session.execute(
+        select(User.id).where(User.id.between(first_id, last_id))
+    ).scalars().all()
+    if not user_ids:
+        return 0, 0
+    _lock_shard(first_id, last_id)
+
+    weeks = {}
+    studied = set()  # (user_id, day, subject) with any activity
+    for user_id, day, kind, subject, count, correct in _activity(first_id, last_id):
+        if day is None:
+            continue
+        if isinstance(day, str):
+            day = datetime.strptime(day, '%Y-%m-%d').date()
+        totals = weeks.setdefault((user_id, get_week_start(day)), [0, 0, 0])
+        if kind == 'resource':
+            totals[0] += count
+        else:
+            totals[1] += count
+            totals[2] += correct or 0
+        if subject:
+            studied.add((user_id, day, subject))
+
+    plan_days, plan_done = {}, {}
+    for user_id, day, subject in db.session.execute(
+        select(StudyPlan.user_id, StudyPlan.date, StudyPlan.subject)
+        .where(StudyPlan.user_id.between(first_id, last_id),
+               StudyPlan.is_active.is_(True), StudyPlan.date < today)
+    ):
+        plan_days[user_id] = plan_days.get(user_id, 0) + 1
+        if (user_id, day, subject) in studied:
+            plan_done[user_id] = plan_done.get(user_id, 0) + 1
+
+    weekly_rows = [{
+        'user_id': user_id,
+        'week_start': week_start,
+        'resources_completed': resources,
+        'quizzes_attempted': quizzes,
+        'quizzes_correct': correct,
+        'study_hours': resources * RESOURCE_HOURS + quizzes * QUIZ_HOURS,
+    } for (user_id, week_start), (resources, quizzes, correct) in weeks.items()]
+    insight_rows = [{
+        'user_id': user_id,
+        'plan_days': plan_days.get(user_id, 0),
+        'plan_days_done': plan_done.get(user_id, 0),
+        'refreshed_at': now,
+    } for user_id in user_ids]
+
+    # Weeks whose activity has since been deleted would otherwise linger
+    stale = [row_id for row_id, user_id, week_start in db.session.execute(
+        select(WeeklyStats.id, WeeklyStats.user_id, WeeklyStats.week_start)
+        .where(WeeklyStats.user_id.between(first_id, last_id))
+    ) if (user_id, week_start) not in weeks]
+    for offset in range(0, len(stale), 500):
+        db.session.execute(delete(WeeklyStats).where(WeeklyStats.id.in_(stale[offset:offset + 500])))
+    upsert(WeeklyStats, weekly_rows, ['user_id', 'week_start'])
+    upsert(UserInsight, insight_rows, ['user_id'])
+    upsert(SubjectSkill, [{
+        'user_id': user_id, 'subject': subject, 'accuracy': accuracy,
+        'attempts': attempts, 'updated_at': now,
+    } for (user_id, subject), (accuracy, attempts) in _skills(first_id, last_id).items()],
+        ['user_id', 'subject'])
+    db.session.commit()
+    return len(user_ids), len(weekly_rows)
+
+
+def _init_worker():
+    """Give each worker process its own app and connection pool"""
+    global _worker_app
+    from app import app
+    _worker_app = app
+    with app.app_context():
+        db.engine.dispose(close=False)
+
+
+def _run_shard(first_id, last_id, today):
+    with _worker_app.app_context():
+        users, weekly_rows = refresh_shard(first_id, last_id, today)
+    return first_id, last_id, users, weekly_rows
+
+
+def load_checkpoint(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_checkpoint(path, checkpoint):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, path)
+
+
+def batch_refresh(start_id=None, end_id=None, shard_size=DEFAULT_SHARD_SIZE, workers=None,
+                  checkpoint_path=None, progress=print):
+    """Refresh every user in [start_id, end_id] on a process pool
+
+    Returns (users, weekly_rows). With workers=1 shards run in-process.
+    """
+    bounds = db.session.execute(select(func.min(User.id), func.max(User.id))).one()
+    if bounds[0] is None:
+        return 0, 0
+    start_id = max(start_id or bounds[0], bounds[0])
+    end_id = min(end_id or bounds[1], bounds[1])
+    shards = [(lo, min(lo + shard_size - 1, end_id)) for lo in range(start_id, end_id + 1, shard_size)]
+    if not shards:
+        return 0, 0
+
+    today = date.today()
+    started = time.perf_counter()
+    pending = {lo for lo, _ in shards}
+    total_users = total_rows = done = 0
+
+    def finished(first_id, last_id, users, weekly_rows):
+        nonlocal total_users, total_rows, done
+        total_users += users
+        total_rows += weekly_rows
+        done += 1
+        pending.discard(first_id)
+        rate = total_users / (time.perf_counter() - started)
+        progress(f"  [{done}/{len(shards)}] users {first_id}-{last_id}: {users} users, "
+                 f"{weekly_rows} week rows ({rate:,.0f} users/sec)")
+        if checkpoint_path:
+            # Everything below the lowest unfinished shard is done
+            resume_from = min(pending) if pending else end_id + 1
+            save_checkpoint(checkpoint_path, {'next_user_id': resume_from, 'end_user_id': end_id,
+                                              'updated_at': datetime.utcnow().isoformat()})
+
+    if workers == 1:
+        for lo, hi in shards:
+            finished(lo, hi, *refresh_shard(lo, hi, today))
+        return total_users, total_rows
+
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=_init_worker) as pool:
+        futures = [pool.submit(_run_shard, lo, hi, today) for lo, hi in shards]
+        for future in as_completed(futures):
+            finished(*future.result())
+    return total_users, total_rows
@@ -0,0 +1,199 @@
+"""
+Endpoint benchmark suite for EduTrack
+Drives dashboard, resources, quiz, track, study_plan and weekly_monitoring
+with several logged-in students at once and reports throughput and
+p50/p95/p99 per scenario. Runs in-process through the Flask test client
+(against DATABASE_URL) or over HTTP against a running server (--url).
+--save writes the results to a JSON baseline; --compare checks a run
+against one and exits with status 1 if any scenario regressed.
+
+Seed the database first, then record and compare:
+
+    flask --app app.py seed-scale --users 100000 --events 100
+    python bench_endpoints.py --save baselines/test-client.json
+    python bench_endpoints.py --compare baselines/test-client.json
+    python bench_endpoints.py --url http://localhost:8000 --compare baselines/gunicorn.json
+
+The track scenario writes Progress rows, so point it at a scratch database.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import datetime
+from instrumentation import percentile
+from load_test import logged_in_opener
+from seed import SUBJECTS, DEFAULT_PASSWORD, scale_email
+
+# name -> (method, path, form) builders; rng is per client thread
+SCENARIOS = {
+    'dashboard': lambda rng: ('GET', '/dashboard', None),
+    'resources': lambda rng: ('GET', rng.choice(['/resources'] + [f'/resources?subject={s}' for s in SUBJECTS]), None),
+    'quiz': lambda rng: ('GET', '/quiz', None),
+    'track': lambda rng: ('POST', '/track', {'kind': 'resource', 'ref_id': str(rng.randint(1, 1000))}),
+    'study_plan': lambda rng: ('GET', '/study_plan', None),
+    'weekly_monitoring': lambda rng: ('GET', '/weekly_monitoring', None),
+}
+# A scenario regresses if throughput drops or p95 grows by more than this
+DEFAULT_TOLERANCE = 15.0
+AJAX = {'X-Requested-With': 'XMLHttpRequest'}
+
+
+class TestClientSession:
+    """One logged-in student on the in-process test client"""
+
+    def __init__(self, app, email, password):
+        self.app = app
+        self.client = app.test_client()
+        with app.app_context():
+            response = self.client.post('/login', data={'email': email, 'password': password})
+        if not response.headers.get('Location', '').endswith('/dashboard'):
+            raise SystemExit(f'login as {email} failed')
+
+    def request(self, method, path, form):
+        # A fresh app context per request, as a real server has
+        with self.app.app_context():
+            response = self.client.open(path, method=method, data=form, headers=AJAX if form else None)
+            response.close()
+        return response.status_code
+
+
+class HttpSession:
+    """One logged-in student on a running server"""
+
+    def __init__(self, base, email, password):
+        self.base = base
+        self.opener = logged_in_opener(base, email, password)
+
+    def request(self, method, path, form):
+        data = urllib.parse.urlencode(form).encode() if form else None
+        request = urllib.request.Request(self.base + path, data=data, method=method, headers=AJAX if form else {})
+        try:
+            with self.opener.open(request) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            return e.code
+        except (urllib.error.URLError, ConnectionError):
+            return 599
+
+
+def run_scenario(sessions, build, duration, warmup):
+    """Every session requests back to back for `duration` seconds; returns a result dict"""
+    latencies, errors = [], []
+    lock = threading.Lock()
+    start = threading.Barrier(len(sessions) + 1)
+    deadline = []
+
+    def client(index, session):
+        rng = random.Random(index)
+        start.wait()
+        measuring = False
+        while True:
+            now = time.perf_counter()
+            if now >= deadline[1]:
+                return
+            measuring = measuring or now >= deadline[0]
+            method, path, form = build(rng)
+            started = time.perf_counter()
+            status = session.request(method, path, form)
+            elapsed = time.perf_counter() - started
+            if measuring:
+                with lock:
+                    (latencies if status < 400 else errors).append(elapsed)
+
+    pool = [threading.Thread(target=client, args=(i, session)) for i, session in enumerate(sessions)]
+    for thread in pool:
+        thread.start()
+    now = time.perf_counter()
+    deadline.extend([now + warmup, now + warmup + duration])
+    start.wait()
+    for thread in pool:
+        thread.join()
+    result = {'requests': len(latencies), 'errors': len(errors),
+              'throughput': round(len(latencies) / duration, 1)}
+    for pct in (50, 95, 99):
+        result[f'p{pct}_ms'] = round(percentile(latencies, pct) * 1000, 2) if latencies else None
+    return result
+
+
+def compare(results, baseline, tolerance):
+    """Print each scenario against the baseline; return the regressed names"""
+    regressed = []
+    print(f"\nAgainst {baseline['created']} ({baseline['mode']}, tolerance {tolerance:.0f}%):")
+    for name, old in baseline['results'].items():
+        new = results.get(name)
+        if new is None or not new['requests'] or not old['requests']:
+            continue
+        throughput = 100 * (new['throughput'] - old['throughput']) / old['throughput']
+        p95 = 100 * (new['p95_ms'] - old['p95_ms']) / old['p95_ms']
+        bad = throughput < -tolerance or p95 > tolerance or new['errors'] > old['errors']
+        if bad:
+            regressed.append(name)
+        print(f"  {'REGRESSED' if bad else 'ok':<9} {name:<18} throughput {throughput:+6.1f}%  p95 {p95:+6.1f}%"
+              f"  errors {old['errors']} -> {new['errors']}")
+    return regressed
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Benchmark the main EduTrack pages')
+    parser.add_argument('--url', help='Running server to load (default: in-process test client)')
+    parser.add_argument('--scenarios', nargs='+', choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument('--concurrency', type=int, default=4, help='Students requesting at once')
+    parser.add_argument('--duration', type=float, default=10, help='Measured seconds per scenario')
+    parser.add_argument('--warmup', type=float, default=2, help='Unmeasured seconds before each scenario')
+    parser.add_argument('--prefix', default='scale', help='seed-scale --prefix of the students to log in as')
+    parser.add_argument('--password', default=DEFAULT_PASSWORD)
+    parser.add_argument('--save', metavar='JSON', help='Write the results to this baseline file')
+    parser.add_argument('--compare', metavar='JSON', help='Compare against this baseline file')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE, help='Allowed change in percent')
+    args = parser.parse_args(argv)
+
+    emails = [scale_email(args.prefix, n) for n in range(args.concurrency)]
+    if args.url:
+        base = args.url.rstrip('/')
+        sessions = [HttpSession(base, email, args.password) for email in emails]
+        mode, target = 'http', base
+    else:
+        from app import app
+        sessions = [TestClientSession(app, email, args.password) for email in emails]
+        mode, target = 'test-client', app.config['SQLALCHEMY_DATABASE_URI']
+
+    print(f"{target} ({mode}): {args.concurrency} students, {args.duration:.0f}s per scenario")
+    results = {}
+    for name in args.scenarios:
+        results[name] = result = run_scenario(sessions, SCENARIOS[name], args.duration, args.warmup)
+        if result['requests']:
+            print(f"  {name:<18} {result['throughput']:8.1f} req/s  p50={result['p50_ms']:7.1f}ms  "
+                  f"p95={result['p95_ms']:7.1f}ms  p99={result['p99_ms']:7.1f}ms  errors={result['errors']}")
+        else:
+            print(f"  {name:<18} all {result['errors']} requests failed")
+
+    status = 0
+    if args.compare:
+        with open(args.compare) as f:
+            regressed = compare(results, json.load(f), args.tolerance)
+        if regressed:
+            print(f"✗ Regression in {', '.join(regressed)}")
+            status = 1
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, 'w') as f:
+            json.dump({'created': datetime.utcnow().isoformat(timespec='seconds') + 'Z', 'mode': mode,
+                       'target': target.split('@')[-1], 'concurrency': args.concurrency,
+                       'duration': args.duration, 'python': platform.python_version(),
+                       'cpus': os.cpu_count(), 'results': results}, f, indent=2)
+        print(f"✓ Baseline written to {args.save}")
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
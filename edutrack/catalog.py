@@ -0,0 +1,73 @@
+"""
+Process-level cache of catalog-wide counts
+Resource and Question totals only change when content is added, so they are
+cached here and invalidated by the code paths that insert catalog rows.
+Those paths also bump the catalog version, a counter kept in the database
+so every worker and CLI script sees it; cached catalog fragments are keyed
+by it (see fragments.py).
+Also home to the per-user Resource filter shared by the HTML and JSON views.
+"""
+
+import threading
+import time
+from sqlalchemy import select, func, update
+from models import db, Resource, Question, CatalogVersion
+
+# Writes from other processes (add_resource.py, other workers) are picked up
+# after this many seconds even without an explicit invalidation
+CATALOG_TTL_SECONDS = 60
+
+_lock = threading.Lock()
+_counts = None
+_loaded_at = 0.0
+
+
+def catalog_counts():
+    """Return {'resources': n, 'questions': m}, cached per process"""
+    global _counts, _loaded_at
+    counts = _counts
+    if counts is not None and time.monotonic() - _loaded_at < CATALOG_TTL_SECONDS:
+        return counts
+    resources, questions = db.session.execute(select(
+        select(func.count()).select_from(Resource).scalar_subquery(),
+        select(func.count()).select_from(Question).scalar_subquery(),
+    )).one()
+    counts = {'resources': resources, 'questions': questions}
+    with _lock:
+        _counts = counts
+        _loaded_at = time.monotonic()
+    return counts
+
+
+def catalog_version():
+    """The current catalog version (one primary-key read)"""
+    return db.session.execute(
+        select(CatalogVersion.version).where(CatalogVersion.id == 1)
+    ).scalar() or 0
+
+
+def invalidate_catalog():
+    """Forget cached counts and bump the catalog version after a catalog write"""
+    global _counts
+    with _lock:
+        _counts = None
+    bumped = db.session.execute(
+        update(CatalogVersion).where(CatalogVersion.id == 1).values(version=CatalogVersion.version + 1)
+    ).rowcount
+    if not bumped:
+        db.session.add(CatalogVersion(id=1, version=2))
+    db.session.commit()
+
+
+def resource_query(user, subject='', difficulty=''):
+    """Resources matching the filters and the user's grade/exam (or untagged)"""
+    query = Resource.query
+    if subject:
+        query = query.filter_by(subject=subject)
+    if difficulty:
+        query = query.filter_by(difficulty=difficulty)
+    if user.grade:
+        query = query.filter((Resource.grade == user.grade) | (Resource.grade == None))
+    if user.target_exam:
+        query = query.filter((Resource.exam == user.target_exam) | (Resource.exam == None))
+    return query
@@ -0,0 +1,121 @@
+"""
+Runtime configuration for EduTrack
+Settings come from the environment; a .env file next to app.py fills in
+anything not already set. DATABASE_URL picks the database: SQLite (the
+default) gets WAL journaling and a busy timeout on every new connection so
+concurrent writers wait instead of failing with "database is locked";
+PostgreSQL and other servers get a sized connection pool.
+"""
+
+import os
+from alembic.config import Config as AlembicConfig
+from dotenv import load_dotenv
+from sqlalchemy import event
+
+load_dotenv(os.path.join(os.path.dirname(os.path.abspath(__file__)), '.env'))
+
+DEFAULT_DATABASE_URL = 'sqlite:///edutrack.db'
+DEFAULT_SECRET_KEY = 'supersecretkey'
+
+
+def env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value not in (None, '') else default
+
+
+def env_float(name, default):
+    value = os.environ.get(name)
+    return float(value) if value not in (None, '') else default
+
+
+def env_bool(name, default):
+    value = os.environ.get(name)
+    if value in (None, ''):
+        return default
+    return value.strip().lower() not in ('0', 'false', 'no', 'off')
+
+
+def database_url():
+    """DATABASE_URL, accepting the postgres:// spelling some hosts hand out"""
+    url = os.environ.get('DATABASE_URL') or DEFAULT_DATABASE_URL
+    if url.startswith('postgres://'):
+        url = 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
+def sqlite_pragmas():
+    """PRAGMAs run on each new SQLite connection; SQLITE_TUNING=0 turns them off"""
+    if not env_bool('SQLITE_TUNING', True):
+        return {}
+    return {
+        # Readers no longer block the writer, and commits append to the WAL
+        'journal_mode': 'WAL',
+        # Safe with WAL: a power loss can drop the last commits, never corrupt
+        'synchronous': 'NORMAL',
+        # Wait this long for the write lock instead of raising at once
+        'busy_timeout': env_int('SQLITE_BUSY_TIMEOUT_MS', 10000),
+        'mmap_size': env_int('SQLITE_MMAP_SIZE', 256 * 1024 * 1024),
+    }
+
+
+def engine_options(url):
+    """SQLALCHEMY_ENGINE_OPTIONS for url; SQLite keeps SQLAlchemy's defaults"""
+    if url.startswith('sqlite'):
+        return {}
+    return {
+        'pool_size': env_int('DB_POOL_SIZE', 10),
+        'max_overflow': env_int('DB_MAX_OVERFLOW', 20),
+        'pool_timeout': env_int('DB_POOL_TIMEOUT', 30),
+        # Replace connections before the server or a proxy drops them
+        'pool_recycle': env_int('DB_POOL_RECYCLE', 1800),
+        'pool_pre_ping': True,
+    }
+
+
+def instrumentation_settings(instance_path):
+    """app.config entries for instrumentation.py; off unless INSTRUMENTATION=1"""
+    return {
+        'INSTRUMENTATION': env_bool('INSTRUMENTATION', False),
+        'SLOW_REQUEST_MS': env_float('SLOW_REQUEST_MS', 500),
+        'SLOW_QUERY_MS': env_float('SLOW_QUERY_MS', 100),
+        # The same SELECT this many times in one request is logged as N+1
+        'N_PLUS_ONE_THRESHOLD': env_int('N_PLUS_ONE_THRESHOLD', 5),
+        # Share of requests run under cProfile; slow ones are dumped
+        'PROFILE_SAMPLE_RATE': env_float('PROFILE_SAMPLE_RATE', 0.0),
+        'PROFILE_DIR': os.environ.get('PROFILE_DIR') or os.path.join(instance_path, 'profiles'),
+        # Lets a Prometheus scraper read /metrics with "Authorization: Bearer <token>"
+        'METRICS_TOKEN': os.environ.get('METRICS_TOKEN') or None,
+    }
+
+
+def write_behind_settings():
+    """ProgressWriter arguments (write_behind.py); off unless WRITE_BEHIND=1"""
+    return {
+        'enabled': env_bool('WRITE_BEHIND', False),
+        'flush_ms': env_float('WRITE_BEHIND_FLUSH_MS', 50),
+        'batch_size': env_int('WRITE_BEHIND_BATCH', 500),
+        'queue_size': env_int('WRITE_BEHIND_QUEUE_SIZE', 10000),
+        'max_lag_ms': env_float('WRITE_BEHIND_MAX_LAG_MS', 2000),
+        'block_ms': env_float('WRITE_BEHIND_BLOCK_MS', 100),
+        'flush_on_exit': env_bool('WRITE_BEHIND_FLUSH_ON_EXIT', True),
+    }
+
+
+def apply_sqlite_pragmas(engine, pragmas):
+    """Run pragmas on every connection the engine opens (no-op off SQLite)"""
+    if engine.dialect.name != 'sqlite' or not pragmas:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
+
+
+def alembic_config(root_path):
+    """Alembic settings for the migrations shipped next to app.py"""
+    config = AlembicConfig(os.path.join(root_path, 'alembic.ini'))
+    config.set_main_option('script_location', os.path.join(root_path, 'migrations'))
+    return config
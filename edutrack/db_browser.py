@@ -5,7 +5,8 @@ Run this script to browse and query the edutrack.db database
 
 from app import app, db
 from models import User, Resource, Question, StudyPlan, Progress, WeeklyStats
-from sqlalchemy import text
+from pagination import stream
+from sqlalchemy import func, text
 
 def show_menu():
     """Display menu options"""
@@ -25,10 +26,9 @@ def show_menu():
 
 def view_users():
     """Display all users"""
-    users = User.query.all()
-    print(f"\nTotal Users: {len(users)}")
+    print(f"\nTotal Users: {User.query.count()}")
     print("-" * 60)
-    for u in users:
+    for u in stream(User.query.order_by(User.id)):
         admin_status = " [ADMIN]" if u.is_admin else ""
         print(f"ID: {u.id} | Name: {u.name} | Email: {u.email}{admin_status}")
         print(f"  Grade: {u.grade or 'N/A'} | Exam: {u.target_exam or 'N/A'}")
@@ -36,10 +36,9 @@ def view_users():
 
 def view_resources():
     """Display all resources"""
-    resources = Resource.query.all()
-    print(f"\nTotal Resources: {len(resources)}")
+    print(f"\nTotal Resources: {Resource.query.count()}")
     print("-" * 60)
-    for r in resources:
+    for r in stream(Resource.query.order_by(Resource.id)):
         print(f"ID: {r.id} | {r.title}")
         print(f"  Subject: {r.subject} | Type: {r.resource_type.upper()}")
         print(f"  Grade: {r.grade or 'N/A'} | Exam: {r.exam or 'N/A'} | Difficulty: {r.difficulty}")
@@ -47,14 +46,13 @@ def view_resources():
 
 def view_questions():
     """Display all questions"""
-    questions = Question.query.all()
-    print(f"\nTotal Questions: {len(questions)}")
+    print(f"\nTotal Questions: {Question.query.count()}")
     print("-" * 60)
-    for q in questions:
+    for q in stream(Question.query.order_by(Question.id)):
         print(f"ID: {q.id} | Subject: {q.subject} | Exam: {q.exam} | Difficulty: {q.difficulty}")
         print(f"  Question: {q.prompt[:60]}...")
         print(f"  Answer: {q.answer}")
-        print(f"  Options: {q.options}")
+        print(f"  Options: {' | '.join(q.options)}")
 
 def view_progress():
     """Display progress records"""
@@ -69,7 +67,7 @@ def view_progress():
 
 def view_weekly_stats():
     """Display weekly stats"""
-    stats = WeeklyStats.query.order_by(WeeklyStats.week_start.desc()).all()
+    stats = stream(WeeklyStats.query.order_by(WeeklyStats.week_start.desc()))
     print(f"\nWeekly Statistics:")
     print("-" * 60)
     for s in stats:
@@ -123,10 +121,7 @@ def database_stats():
     print(f"Weekly Stats: {WeeklyStats.query.count()}")
     
     # Resource types breakdown
-    resources = Resource.query.all()
-    types = {}
-    for r in resources:
-        types[r.resource_type] = types.get(r.resource_type, 0) + 1
+    types = dict(db.session.query(Resource.resource_type, func.count()).group_by(Resource.resource_type))
     print("\nResource Types:")
     for rtype, count in types.items():
         print(f"  {rtype.upper()}: {count}")
@@ -0,0 +1,59 @@
+"""
+Process-level cache of rendered catalog fragments
+The resource list a user sees depends only on their grade and target exam,
+the filters and page cursor in the URL, and the catalog itself, so the
+rendered HTML (and the subject list that feeds its filter) is cached under
+those keys plus the catalog version. A catalog write bumps the version and
+later lookups simply miss; the stale entries age out of the LRU.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+MAX_FRAGMENTS = 512
+
+
+class FragmentCache:
+    """Per-process LRU of rendered fragments, with hit/miss counters"""
+
+    def __init__(self, max_entries=MAX_FRAGMENTS):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> value
+
+    def get(self, key, build):
+        """The cached value for key, or build() stored under it"""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+        # Built outside the lock: two threads may render the same key once each
+        value = build()
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """{'hits', 'misses', 'size'} since the process started"""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries)}
+
+
+def fragment_etag(*parts):
+    """A stable ETag for a page built from these key parts"""
+    return hashlib.sha1(repr(parts).encode()).hexdigest()[:20]
+
+
+fragment_cache = FragmentCache()
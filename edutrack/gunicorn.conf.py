@@ -0,0 +1,28 @@
+"""
+gunicorn settings for EduTrack: gunicorn -c gunicorn.conf.py wsgi:application
+Every setting can be overridden from the environment or the command line.
+"""
+
+import multiprocessing
+import os
+
+bind = os.environ.get('BIND', f"0.0.0.0:{os.environ.get('PORT', '8000')}")
+# Sync workers: one request at a time each, so size by CPU
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', '1'))
+# Import wsgi.py once in the master and fork the workers from it
+preload_app = True
+timeout = 60
+# On SIGTERM, workers finish in-flight requests for up to this long
+graceful_timeout = 30
+keepalive = 5
+# Recycle workers now and then so per-process caches cannot grow forever
+max_requests = 5000
+max_requests_jitter = 500
+accesslog = os.environ.get('ACCESS_LOG') or None
+
+
+def worker_exit(server, worker):
+    # Commit events still in the write-behind queue before the worker goes
+    from app import app
+    app.extensions['progress_writer'].close()
@@ -0,0 +1,44 @@
+"""
+Liveness and readiness probes for EduTrack
+/health/live answers whenever the worker can serve a request. /health/ready
+also checks that the database answers and that its schema is at the newest
+migration, so a load balancer keeps traffic off workers that started before
+`flask --app app.py upgrade-db` ran. Neither needs a login.
+"""
+
+from alembic.script import ScriptDirectory
+from flask import Blueprint, current_app, jsonify
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from config import alembic_config
+from models import db
+
+health = Blueprint('health', __name__, url_prefix='/health')
+
+
+def schema_head():
+    """Newest migration shipped with the code (read once per app)"""
+    head = current_app.extensions.get('schema_head')
+    if head is None:
+        head = ScriptDirectory.from_config(alembic_config(current_app.root_path)).get_current_head()
+        current_app.extensions['schema_head'] = head
+    return head
+
+
+@health.route('/live')
+def live():
+    return jsonify({'status': 'ok'})
+
+
+@health.route('/ready')
+def ready():
+    """200 once the database is reachable and migrated, 503 until then"""
+    try:
+        version = db.session.execute(text('SELECT version_num FROM alembic_version')).scalar()
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return jsonify({'status': 'unavailable', 'error': e.__class__.__name__}), 503
+    head = schema_head()
+    if version != head:
+        return jsonify({'status': 'migration pending', 'schema': version, 'expected': head}), 503
+    return jsonify({'status': 'ok', 'schema': version})
@@ -0,0 +1,303 @@
+"""
+Opt-in request and SQL instrumentation for EduTrack
+With INSTRUMENTATION=1, every request is timed and every statement it sends
+is counted and timed through SQLAlchemy engine events. Per endpoint the
+process keeps counters and a window of recent latencies, shown as
+p50/p95/p99 on /admin/metrics and in Prometheus text on /metrics, next to
+the counters of the in-process caches and queues (see add_source). Slow
+requests, slow queries (with their parameters) and probable N+1 patterns
+(the same SELECT run many times in one request) are logged. With
+PROFILE_SAMPLE_RATE > 0, a sample of requests runs under cProfile and the
+slow ones are written to PROFILE_DIR as collapsed stacks for flamegraph.pl
+or speedscope, plus a .prof file for pstats.
+
+Numbers are per process; with several gunicorn workers each keeps its own.
+When the setting is off nothing is registered and requests pay nothing.
+"""
+
+import cProfile
+import logging
+import os
+import pstats
+import random
+import re
+import threading
+import time
+from collections import Counter, deque
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from models import db
+
+# Latencies kept per endpoint for the percentiles
+LATENCY_WINDOW = 1000
+MAX_LOGGED_PARAMS = 500
+
+request_log = logging.getLogger('edutrack.requests')
+sql_log = logging.getLogger('edutrack.sql')
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    ordered = sorted(samples)
+    return ordered[max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))]
+
+
+class RequestStats:
+    """What one request did, collected on flask.g"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.statements = 0
+        self.sql_seconds = 0.0
+        self.selects = Counter()
+
+
+class EndpointStats:
+    def __init__(self, window):
+        self.requests = 0
+        self.errors = 0
+        self.seconds = 0.0
+        self.statements = 0
+        self.sql_seconds = 0.0
+        self.n_plus_one = 0
+        self.latencies = deque(maxlen=window)
+
+
+class Metrics:
+    """Per-endpoint aggregates for one process"""
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.window = window
+        self.slow_queries = 0
+        self.slow_requests = 0
+        self._lock = threading.Lock()
+        self._endpoints = {}
+        self._sources = {}  # name -> (description, stats callable, counter keys)
+
+    def add_source(self, name, description, stats, counters=()):
+        """Report stats(), a dict of numbers, with the request metrics
+
+        Shown on /admin/metrics and exported as edutrack_<name>_<key>; keys
+        in counters only ever grow, the rest are gauges. Sources are read
+        whether or not INSTRUMENTATION is on.
+        """
+        self._sources[name] = (description, stats, frozenset(counters))
+
+    def sources(self):
+        """[(name, description, stats dict)] in registration order"""
+        return [(name, description, stats()) for name, (description, stats, _) in self._sources.items()]
+
+    def count_slow_query(self):
+        with self._lock:
+            self.slow_queries += 1
+
+    def count_slow_request(self):
+        with self._lock:
+            self.slow_requests += 1
+
+    def record(self, endpoint, elapsed, status, stats, n_plus_one):
+        with self._lock:
+            entry = self._endpoints.get(endpoint)
+            if entry is None:
+                entry = self._endpoints[endpoint] = EndpointStats(self.window)
+            entry.requests += 1
+            entry.errors += status >= 500
+            entry.seconds += elapsed
+            entry.statements += stats.statements
+            entry.sql_seconds += stats.sql_seconds
+            entry.n_plus_one += n_plus_one
+            entry.latencies.append(elapsed)
+
+    def snapshot(self):
+        """One dict per endpoint, slowest p95 first"""
+        with self._lock:
+            rows = [(endpoint, entry, list(entry.latencies)) for endpoint, entry in self._endpoints.items()]
+        result = []
+        for endpoint, entry, latencies in rows:
+            result.append({
+                'endpoint': endpoint,
+                'requests': entry.requests,
+                'errors': entry.errors,
+                'seconds': entry.seconds,
+                'statements': entry.statements,
+                'sql_seconds': entry.sql_seconds,
+                'n_plus_one': entry.n_plus_one,
+                'statements_per_request': entry.statements / entry.requests,
+                'p50': percentile(latencies, 50),
+                'p95': percentile(latencies, 95),
+                'p99': percentile(latencies, 99),
+            })
+        return sorted(result, key=lambda row: -row['p95'])
+
+    def prometheus(self):
+        """The aggregates in Prometheus text exposition format"""
+        lines = [
+            '# HELP edutrack_request_seconds Request latency by endpoint (recent window)',
+            '# TYPE edutrack_request_seconds summary',
+        ]
+        rows = self.snapshot()
+        for row in rows:
+            label = row['endpoint'].replace('\\', '\\\\').replace('"', '\\"')
+            for quantile in ('0.5', '0.95', '0.99'):
+                value = row['p' + str(int(float(quantile) * 100))]
+                lines.append(f'edutrack_request_seconds{{endpoint="{label}",quantile="{quantile}"}} {value:.6f}')
+            lines.append(f'edutrack_request_seconds_sum{{endpoint="{label}"}} {row["seconds"]:.6f}')
+            lines.append(f'edutrack_request_seconds_count{{endpoint="{label}"}} {row["requests"]}')
+        for name, key, kind, help_text in (
+            ('edutrack_request_errors_total', 'errors', 'counter', 'Responses with a 5xx status'),
+            ('edutrack_sql_statements_total', 'statements', 'counter', 'SQL statements sent'),
+            ('edutrack_sql_seconds_total', 'sql_seconds', 'counter', 'Time spent in SQL statements'),
+            ('edutrack_n_plus_one_total', 'n_plus_one', 'counter', 'Requests that repeated one SELECT'),
+        ):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            for row in rows:
+                label = row['endpoint'].replace('\\', '\\\\').replace('"', '\\"')
+                value = row[key]
+                lines.append(f'{name}{{endpoint="{label}"}} {value:.6f}' if isinstance(value, float)
+                             else f'{name}{{endpoint="{label}"}} {value}')
+        lines += [
+            '# HELP edutrack_slow_queries_total Statements slower than SLOW_QUERY_MS',
+            '# TYPE edutrack_slow_queries_total counter',
+            f'edutrack_slow_queries_total {self.slow_queries}',
+            '# HELP edutrack_slow_requests_total Requests slower than SLOW_REQUEST_MS',
+            '# TYPE edutrack_slow_requests_total counter',
+            f'edutrack_slow_requests_total {self.slow_requests}',
+        ]
+        for name, description, values in self.sources():
+            counters = self._sources[name][2]
+            for key, value in values.items():
+                metric = f'edutrack_{name}_{key}' + ('_total' if key in counters else '')
+                lines.append(f'# HELP {metric} {description}: {key.replace("_", " ")}')
+                lines.append(f'# TYPE {metric} {"counter" if key in counters else "gauge"}')
+                lines.append(f'{metric} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+def folded_stacks(profile, min_fraction=0.001):
+    """cProfile results as collapsed stacks ("a;b;c microseconds" lines)
+
+    cProfile records caller -> callee edges, not whole stacks, so each
+    function's time is split between the paths that reach it in proportion
+    to the time spent in it from each caller (as flameprof does). Paths
+    under min_fraction of the total are dropped, which keeps the walk
+    bounded on large call graphs.
+    """
+    stats = pstats.Stats(profile).stats  # func -> (cc, nc, tt, ct, callers)
+    callees = {}
+    for func, (_, _, _, _, callers) in stats.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, {})[func] = edge
+    lines = Counter()
+
+    def name(func):
+        filename, line, function = func
+        if filename == '~':
+            return function  # builtins: "<built-in method ...>"
+        return f'{function} ({os.path.basename(filename)}:{line})'
+
+    roots = [func for func, (_, _, _, _, callers) in stats.items() if not callers]
+    cutoff = sum(stats[func][3] for func in roots) * min_fraction
+
+    def walk(func, path, share):
+        # share: the part of func's total time that was spent on this path
+        lines[path] += stats[func][2] * share
+        for callee, (_, _, _, edge_ct) in callees.get(func, {}).items():
+            callee_ct = stats[callee][3] if callee in stats else 0
+            callee_share = share * min(1.0, edge_ct / callee_ct) if callee_ct else 0
+            if callee_ct * callee_share >= cutoff and name(callee) not in path.split(';'):
+                walk(callee, f'{path};{name(callee)}', callee_share)
+
+    for func in roots:
+        walk(func, name(func), 1.0)
+    return ''.join(f'{path} {round(seconds * 1e6)}\n' for path, seconds in lines.items()
+                   if round(seconds * 1e6) > 0)
+
+
+def init_instrumentation(app):
+    """Register the request hooks and engine listeners on app (if enabled)"""
+    metrics = app.extensions['metrics'] = Metrics()
+    if not app.config['INSTRUMENTATION']:
+        return
+    slow_request = app.config['SLOW_REQUEST_MS'] / 1000
+    slow_query = app.config['SLOW_QUERY_MS'] / 1000
+    n_plus_one_threshold = app.config['N_PLUS_ONE_THRESHOLD']
+    sample_rate = app.config['PROFILE_SAMPLE_RATE']
+    profile_dir = app.config['PROFILE_DIR']
+    # One profiled request at a time per process; others are not sampled
+    profiler_lock = threading.Lock()
+    reported = set()
+
+    with app.app_context():
+        engine = db.engine
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def start_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def stop_timer(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['query_started'].pop()
+        if elapsed >= slow_query:
+            metrics.count_slow_query()
+            endpoint = request.endpoint if has_request_context() else None
+            sql_log.warning('slow query %.1fms in %s: %s params=%.*s', elapsed * 1000, endpoint or '-',
+                            ' '.join(statement.split()), MAX_LOGGED_PARAMS, repr(parameters))
+        stats = g.get('request_stats') if has_request_context() else None
+        if stats is not None:
+            stats.statements += 1
+            stats.sql_seconds += elapsed
+            if statement.lstrip()[:6].upper() == 'SELECT':
+                stats.selects[statement] += 1
+
+    @app.before_request
+    def start_request():
+        g.request_stats = RequestStats()
+        if sample_rate and random.random() < sample_rate and profiler_lock.acquire(blocking=False):
+            g.profiler = cProfile.Profile()
+            g.profiler.enable()
+
+    @app.after_request
+    def finish_request(response):
+        stats = g.pop('request_stats', None)
+        if stats is None:
+            return response
+        elapsed = time.perf_counter() - stats.started
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            profiler.disable()
+            profiler_lock.release()
+        endpoint = request.endpoint or 'unmatched'
+
+        repeated = [(statement, count) for statement, count in stats.selects.items()
+                    if count >= n_plus_one_threshold]
+        for statement, count in repeated:
+            # Counted every time, logged once per endpoint and statement
+            if (endpoint, statement) not in reported:
+                reported.add((endpoint, statement))
+                sql_log.warning('possible N+1 in %s: %d x %s', endpoint, count, ' '.join(statement.split()))
+        metrics.record(endpoint, elapsed, response.status_code, stats, bool(repeated))
+
+        if elapsed >= slow_request:
+            metrics.count_slow_request()
+            request_log.warning('slow request %s %s (%s): %.1fms, %d statements, %.1fms SQL',
+                                request.method, request.full_path.rstrip('?'), endpoint,
+                                elapsed * 1000, stats.statements, stats.sql_seconds * 1000)
+            if profiler is not None:
+                os.makedirs(profile_dir, exist_ok=True)
+                slug = re.sub(r'[^A-Za-z0-9_.-]', '_', endpoint)
+                base = os.path.join(profile_dir, f'{slug}-{int(time.time() * 1000)}')
+                profiler.dump_stats(base + '.prof')
+                with open(base + '.folded', 'w') as f:
+                    f.write(folded_stacks(profiler))
+        response.headers['Server-Timing'] = (f'app;dur={elapsed * 1000:.1f}, '
+                                             f'db;dur={stats.sql_seconds * 1000:.1f};desc="{stats.statements} queries"')
+        return response
+
+    @app.teardown_request
+    def stop_profiler(exc):
+        # after_request is skipped if building the response failed
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            profiler.disable()
+            profiler_lock.release()
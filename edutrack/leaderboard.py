@@ -0,0 +1,229 @@
+"""
+In-memory weekly leaderboards per target exam
+Ranks every user with a WeeklyStats row by quizzes correct, then accuracy,
+then study hours, separately for each target exam and week. Each board is
+a sorted list (sortedcontainers) plus a dict of each user's entry, so a
+change of totals is one O(log n) remove and insert, the top K is an
+O(log n + K) slice and a user's rank is one O(log n) bisect. Tied users
+share a rank.
+
+The boards for the last LEADERBOARD_WEEKS weeks are built from WeeklyStats
+on first use. After that, bump_weekly_stats() hands the new totals of each
+row it touches to this process when its transaction commits. Other
+processes' writes (CLI scripts, other workers) show up at the next full
+rebuild, every LEADERBOARD_TTL_SECONDS.
+"""
+
+import threading
+import time
+from datetime import datetime, timedelta
+from itertools import islice
+from sortedcontainers import SortedList
+from sqlalchemy import event, select
+from models import db, User, WeeklyStats
+from stats import LEADERBOARD_COLUMNS, PENDING_TOTALS, get_week_start
+from user_cache import user_cache
+
+# This week and last week's final standings
+LEADERBOARD_WEEKS = 2
+LEADERBOARD_TTL_SECONDS = 300
+DEFAULT_TOP = 10
+MAX_TOP = 100
+REBUILD_CHUNK_SIZE = 10000
+USER_ID_BITS = 32
+USER_ID_MASK = 2 ** USER_ID_BITS - 1
+
+
+class Board:
+    """One exam's standings for one week
+
+    Each user is one int in the sorted list: their score (correct answers,
+    then accuracy in millionths, then study hours in hundredths, packed
+    into one number) negated so the best sort first, with the user id in
+    the low bits. About half the memory of a tuple per user.
+    """
+
+    def __init__(self):
+        self._ranked = SortedList()
+        self._entries = {}  # user_id -> its int in _ranked
+
+    def __len__(self):
+        return len(self._ranked)
+
+    @staticmethod
+    def _score(attempted, correct, hours):
+        accuracy = round(1_000_000 * correct / attempted) if attempted else 0
+        return ((min(correct, 2 ** 20 - 1) << 44) | (accuracy << 24)
+                | min(round((hours or 0.0) * 100), 2 ** 24 - 1))
+
+    def set(self, user_id, attempted, correct, hours):
+        old = self._entries.get(user_id)
+        if old is not None:
+            self._ranked.remove(old)
+        entry = (-self._score(attempted, correct, hours) << USER_ID_BITS) | user_id
+        self._ranked.add(entry)
+        self._entries[user_id] = entry
+
+    def rank(self, user_id):
+        """1-based rank (ties share the best one), or None if not on the board"""
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        # Everyone before the first entry with this score ranks strictly higher
+        return self._ranked.bisect_left(entry >> USER_ID_BITS << USER_ID_BITS) + 1
+
+    def top(self, k):
+        """The first k as (rank, user_id, correct, accuracy, hours)"""
+        rows = []
+        previous = rank = None
+        for position, entry in enumerate(islice(self._ranked, k)):
+            score = -(entry >> USER_ID_BITS)
+            if score != previous:
+                previous, rank = score, position + 1
+            rows.append((rank, entry & USER_ID_MASK, score >> 44,
+                         (score >> 24 & 0xFFFFF) / 1_000_000, (score & 0xFFFFFF) / 100))
+        return rows
+
+
+class Leaderboards:
+    """Per-process boards keyed by (target_exam, week_start)"""
+
+    def __init__(self, weeks=LEADERBOARD_WEEKS, ttl=LEADERBOARD_TTL_SECONDS):
+        self.weeks = weeks
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._boards = None
+        self._exams = {}  # user_id -> target_exam
+        self._week_starts = ()
+        self._loaded_at = 0.0
+        self._build_lock = threading.Lock()
+        self._replay = None  # totals that arrive while a rebuild reads the table
+
+    def invalidate(self):
+        """Drop every board; they are rebuilt on the next lookup"""
+        with self._lock:
+            self._boards = None
+
+    def _current_weeks(self):
+        this_week = get_week_start(datetime.utcnow().date())
+        return tuple(this_week - timedelta(weeks=n) for n in range(self.weeks))
+
+    def _fresh(self, week_starts):
+        return (self._boards is not None and self._week_starts == week_starts
+                and time.monotonic() - self._loaded_at < self.ttl)
+
+    def _ensure_loaded(self):
+        """Return the current boards, rebuilding them if missing, expired or a week old"""
+        week_starts = self._current_weeks()
+        if self._fresh(week_starts):
+            return self._boards
+        # One rebuild at a time; other threads keep serving the previous boards
+        if not self._build_lock.acquire(blocking=self._boards is None):
+            return self._boards
+        try:
+            if self._fresh(week_starts):
+                return self._boards
+            with self._lock:
+                self._replay = []
+            try:
+                exams = {}
+                boards = {}
+                for user_id, exam, week_start, attempted, correct, hours in db.session.execute(
+                    select(WeeklyStats.user_id, User.target_exam, WeeklyStats.week_start,
+                           *(getattr(WeeklyStats, name) for name in LEADERBOARD_COLUMNS))
+                    .join(User, User.id == WeeklyStats.user_id)
+                    .where(WeeklyStats.week_start.in_(week_starts))
+                    .execution_options(yield_per=REBUILD_CHUNK_SIZE)
+                ):
+                    exams[user_id] = exam = exam or None
+                    key = (exam, week_start)
+                    board = boards.get(key)
+                    if board is None:
+                        board = boards[key] = Board()
+                    board.set(user_id, attempted or 0, correct or 0, hours)
+            except Exception:
+                with self._lock:
+                    self._replay = None
+                raise
+            with self._lock:
+                self._exams = exams
+                for user_id, week_start, totals in self._replay:
+                    self._set(boards, week_starts, user_id, week_start, totals)
+                self._boards = boards
+                self._week_starts = week_starts
+                self._loaded_at = time.monotonic()
+                self._replay = None
+            return boards
+        finally:
+            self._build_lock.release()
+
+    def _set(self, boards, week_starts, user_id, week_start, totals):
+        if week_start not in week_starts:
+            return
+        if user_id not in self._exams:
+            # Registered since the last rebuild. This runs in after_commit,
+            # where the session cannot query, so use a connection of its own
+            with db.engine.connect() as connection:
+                self._exams[user_id] = connection.execute(
+                    select(User.target_exam).where(User.id == user_id)
+                ).scalar() or None
+        key = (self._exams[user_id], week_start)
+        board = boards.get(key)
+        if board is None:
+            board = boards[key] = Board()
+        board.set(user_id, *totals)
+
+    def apply(self, committed):
+        """Fold committed (user_id, week_start, totals) into the boards"""
+        with self._lock:
+            if self._replay is not None:
+                self._replay.extend(committed)
+            if self._boards is None:
+                return
+            for user_id, week_start, totals in committed:
+                self._set(self._boards, self._week_starts, user_id, week_start, totals)
+
+    def top(self, exam, week_start=None, k=DEFAULT_TOP):
+        """The best k users on one board, with names, as dicts"""
+        boards = self._ensure_loaded()
+        week_start = week_start or self._week_starts[0]
+        with self._lock:
+            board = boards.get((exam, week_start))
+            rows = board.top(min(k, MAX_TOP)) if board is not None else []
+        # Leaders are looked up often, so their names are usually in user_cache
+        users = {row[1]: user_cache.get(row[1]) for row in rows}
+        return [{'rank': rank, 'user_id': user_id, 'name': users[user_id].name if users[user_id] else None,
+                 'quizzes_correct': correct, 'accuracy': round(accuracy * 100, 1), 'study_hours': hours}
+                for rank, user_id, correct, accuracy, hours in rows]
+
+    def rank(self, user_id, exam, week_start=None):
+        """{'rank': r, 'of': n} for a user, or None if they have no stats that week"""
+        boards = self._ensure_loaded()
+        week_start = week_start or self._week_starts[0]
+        with self._lock:
+            board = boards.get((exam, week_start))
+            rank = board.rank(user_id) if board is not None else None
+            return {'rank': rank, 'of': len(board)} if rank is not None else None
+
+    def week_starts(self):
+        """The weeks with boards, newest first"""
+        self._ensure_loaded()
+        return self._week_starts
+
+
+leaderboards = Leaderboards()
+
+
+@event.listens_for(db.session, 'after_commit')
+def _apply_committed_totals(session):
+    committed = session.info.pop(PENDING_TOTALS, None)
+    if committed:
+        leaderboards.apply(committed)
+
+
+@event.listens_for(db.session, 'after_transaction_end')
+def _forget_uncommitted_totals(session, transaction):
+    # A rolled-back savepoint (bump_weekly_stats() lost an insert race) keeps
+    # the outer transaction's totals; only the outermost end discards them
+    if transaction.parent is None:
+        session.info.pop(PENDING_TOTALS, None)
@@ -0,0 +1,92 @@
+"""
+HTTP load test for a running EduTrack server
+Each client thread logs in once, then requests one path back to back for a
+fixed time. Reports requests/sec, p50/p99 latency and errors per path. Use it
+to compare the development server (python app.py) with gunicorn (wsgi.py).
+
+Usage: python load_test.py --url http://localhost:8000 --email a@b --password x
+                           [--paths /resources /quiz] [--concurrency 8] [--duration 15]
+"""
+
+import argparse
+import http.cookiejar
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from instrumentation import percentile
+
+
+def logged_in_opener(base, email, password):
+    jar = http.cookiejar.CookieJar()
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(jar))
+    form = urllib.parse.urlencode({'email': email, 'password': password}).encode()
+    with opener.open(base + '/login', data=form) as response:
+        if not response.geturl().endswith('/dashboard'):
+            raise SystemExit(f'login as {email} failed')
+    return opener
+
+
+def hammer(base, path, args):
+    """(latencies, errors, elapsed) for `concurrency` threads on one path"""
+    openers = [logged_in_opener(base, args.email, args.password) for _ in range(args.concurrency)]
+    latencies, errors = [], []
+    lock = threading.Lock()
+    start = threading.Barrier(args.concurrency + 1)
+    deadline = []
+
+    def client(opener):
+        start.wait()
+        while time.perf_counter() < deadline[0]:
+            started = time.perf_counter()
+            try:
+                with opener.open(base + path) as response:
+                    response.read()
+                failed = None
+            except (urllib.error.URLError, ConnectionError) as e:
+                failed = getattr(e, 'code', None) or e.__class__.__name__
+            elapsed = time.perf_counter() - started
+            with lock:
+                if failed is None:
+                    latencies.append(elapsed)
+                else:
+                    errors.append(failed)
+
+    pool = [threading.Thread(target=client, args=(opener,)) for opener in openers]
+    for thread in pool:
+        thread.start()
+    deadline.append(time.perf_counter() + args.duration)
+    started = time.perf_counter()
+    start.wait()
+    for thread in pool:
+        thread.join()
+    return latencies, errors, time.perf_counter() - started
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Load test a running EduTrack server')
+    parser.add_argument('--url', default='http://localhost:5000')
+    parser.add_argument('--email', default='student@edutrack.local')
+    parser.add_argument('--password', default='student123')
+    parser.add_argument('--paths', nargs='+', default=['/resources', '/quiz'])
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=15, help='seconds per path')
+    args = parser.parse_args(argv)
+    base = args.url.rstrip('/')
+
+    print(f"{base}: {args.concurrency} clients, {args.duration:.0f}s per path")
+    for path in args.paths:
+        latencies, errors, elapsed = hammer(base, path, args)
+        if not latencies:
+            print(f"  GET {path:<12} all {len(errors)} requests failed ({errors[0] if errors else 'none sent'})")
+            continue
+        print(f"  GET {path:<12} {len(latencies) / elapsed:8.1f} req/s  "
+              f"p50={percentile(latencies, 50) * 1000:7.1f}ms  "
+              f"p99={percentile(latencies, 99) * 1000:7.1f}ms  errors={len(errors)}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,54 @@
+"""Composite indexes for the hot Progress/WeeklyStats/StudyPlan queries
+
+Databases created by older versions of init-db have no secondary indexes.
+Indexes that db.create_all() already made on newer databases are skipped.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 12:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    ('ix_progress_user_type_time', 'progress', ['user_id', 'item_type', 'timestamp'], False),
+    ('uq_weekly_stats_user_week', 'weekly_stats', ['user_id', 'week_start'], True),
+    ('ix_study_plan_user_active_date', 'study_plan', ['user_id', 'is_active', 'date'], False),
+    ('ix_question_difficulty_subject', 'question', ['difficulty', 'subject'], False),
+    ('ix_resource_subject_difficulty', 'resource', ['subject', 'difficulty'], False),
+]
+
+
+def _index_names(table):
+    inspector = sa.inspect(op.get_bind())
+    return {index['name'] for index in inspector.get_indexes(table)}
+
+
+def upgrade() -> None:
+    # The old get-or-create could race and leave duplicate weeks behind.
+    # Keep the oldest row (the one update_weekly_stats() kept updating);
+    # run `flask recompute-weekly-stats` afterwards to re-derive the counts.
+    op.execute(
+        'DELETE FROM weekly_stats WHERE id NOT IN '
+        '(SELECT MIN(id) FROM weekly_stats GROUP BY user_id, week_start)'
+    )
+
+    for name, table, columns, unique in INDEXES:
+        if name not in _index_names(table):
+            op.create_index(name, table, columns, unique=unique)
+
+
+def downgrade() -> None:
+    for name, table, columns, unique in reversed(INDEXES):
+        if name in _index_names(table):
+            op.drop_index(name, table_name=table)
@@ -0,0 +1,40 @@
+"""Widen the question index to cover exam for the QuestionPool id load
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 13:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _index_names(table):
+    inspector = sa.inspect(op.get_bind())
+    return {index['name'] for index in inspector.get_indexes(table)}
+
+
+def upgrade() -> None:
+    existing = _index_names('question')
+    if 'ix_question_difficulty_subject' in existing:
+        op.drop_index('ix_question_difficulty_subject', table_name='question')
+    if 'ix_question_difficulty_subject_exam' not in existing:
+        op.create_index('ix_question_difficulty_subject_exam', 'question',
+                        ['difficulty', 'subject', 'exam'])
+
+
+def downgrade() -> None:
+    existing = _index_names('question')
+    if 'ix_question_difficulty_subject_exam' in existing:
+        op.drop_index('ix_question_difficulty_subject_exam', table_name='question')
+    if 'ix_question_difficulty_subject' not in existing:
+        op.create_index('ix_question_difficulty_subject', 'question', ['difficulty', 'subject'])
@@ -0,0 +1,49 @@
+"""Add question.prompt_hash for importer deduplication
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 14:00:00
+
+"""
+from typing import Sequence, Union
+import hashlib
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _fingerprint(prompt):
+    # Frozen copy of models.prompt_fingerprint() as of this revision
+    normalized = re.sub(r"\s+", " ", (prompt or "").strip().lower())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if 'prompt_hash' not in {col['name'] for col in inspector.get_columns('question')}:
+        op.add_column('question', sa.Column('prompt_hash', sa.String(length=64), nullable=True))
+    if 'ix_question_prompt_hash' not in {ix['name'] for ix in inspector.get_indexes('question')}:
+        op.create_index('ix_question_prompt_hash', 'question', ['prompt_hash'])
+
+    # Backfill existing rows
+    conn = op.get_bind()
+    rows = conn.execute(sa.text('SELECT id, prompt FROM question WHERE prompt_hash IS NULL')).fetchall()
+    if rows:
+        conn.execute(
+            sa.text('UPDATE question SET prompt_hash = :hash WHERE id = :id'),
+            [{'id': row[0], 'hash': _fingerprint(row[1])} for row in rows]
+        )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_question_prompt_hash', table_name='question')
+    with op.batch_alter_table('question') as batch_op:
+        batch_op.drop_column('prompt_hash')
@@ -0,0 +1,41 @@
+"""Add content hash, size and page count to resource for PDF ingestion
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 15:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = [
+    ('content_hash', sa.String(length=64)),
+    ('file_size', sa.Integer()),
+    ('page_count', sa.Integer()),
+]
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    existing = {col['name'] for col in inspector.get_columns('resource')}
+    for name, type_ in COLUMNS:
+        if name not in existing:
+            op.add_column('resource', sa.Column(name, type_, nullable=True))
+    if 'ix_resource_content_hash' not in {ix['name'] for ix in inspector.get_indexes('resource')}:
+        op.create_index('ix_resource_content_hash', 'resource', ['content_hash'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_resource_content_hash', table_name='resource')
+    with op.batch_alter_table('resource') as batch_op:
+        for name, _ in reversed(COLUMNS):
+            batch_op.drop_column(name)
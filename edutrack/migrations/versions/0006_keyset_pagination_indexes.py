@@ -0,0 +1,48 @@
+"""Index (created_at, id) on user, resource and question for keyset pagination
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 17:00:00
+
+"""
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ('user', 'resource', 'question')
+# (name, table, columns) beyond the per-table (created_at, id) indexes
+EXTRA_INDEXES = [
+    ('ix_resource_subject_created_at_id', 'resource', ['subject', 'created_at', 'id']),
+]
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    for table in TABLES:
+        # Rows without a timestamp would fall outside every keyset page;
+        # date them to the epoch so they sort as the oldest
+        rows = sa.table(table, sa.column('created_at', sa.DateTime()))
+        op.execute(rows.update().where(rows.c.created_at.is_(None))
+                   .values(created_at=datetime(1970, 1, 1)))
+        name = f'ix_{table}_created_at_id'
+        if name not in {index['name'] for index in inspector.get_indexes(table)}:
+            op.create_index(name, table, ['created_at', 'id'])
+    for name, table, columns in EXTRA_INDEXES:
+        if name not in {index['name'] for index in inspector.get_indexes(table)}:
+            op.create_index(name, table, columns)
+
+
+def downgrade() -> None:
+    for name, table, _ in EXTRA_INDEXES:
+        op.drop_index(name, table_name=table)
+    for table in TABLES:
+        op.drop_index(f'ix_{table}_created_at_id', table_name=table)
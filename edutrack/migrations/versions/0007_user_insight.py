@@ -0,0 +1,36 @@
+"""Add user_insight for batch-refreshed difficulty and plan adherence
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 18:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if 'user_insight' in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        'user_insight',
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('user.id'), primary_key=True),
+        sa.Column('difficulty', sa.String(length=10), nullable=True),
+        sa.Column('recent_accuracy', sa.Float(), nullable=True),
+        sa.Column('plan_days', sa.Integer(), nullable=True),
+        sa.Column('plan_days_done', sa.Integer(), nullable=True),
+        sa.Column('refreshed_at', sa.DateTime(), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('user_insight')
@@ -0,0 +1,63 @@
+"""Add subject_skill for per-subject adaptive quiz difficulty
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 19:00:00
+
+"""
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0008'
+down_revision: Union[str, None] = '0007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Frozen copy of skills.SKILL_ALPHA as of this revision
+SKILL_ALPHA = 2 / 6
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    columns = [
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('user.id'), primary_key=True),
+        sa.Column('subject', sa.String(length=50), primary_key=True),
+        sa.Column('accuracy', sa.Float(), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+    ]
+    if 'subject_skill' in sa.inspect(bind).get_table_names():
+        # create_all() may have made it already; backfill only if still empty
+        skill = sa.table('subject_skill', *(sa.column(c.name) for c in columns))
+        if bind.execute(sa.select(sa.func.count()).select_from(skill)).scalar():
+            return
+    else:
+        skill = op.create_table('subject_skill', *columns)
+
+    # Replay existing quiz answers oldest-first so current users keep their level
+    skills = {}
+    for user_id, subject, score in bind.execute(sa.text(
+        "SELECT p.user_id, q.subject, p.extra_score FROM progress p "
+        "JOIN question q ON q.id = p.ref_id WHERE p.item_type = 'quiz' "
+        "ORDER BY p.user_id, p.timestamp, p.id"
+    )):
+        score = 1 if score == 1 else 0
+        accuracy, attempts = skills.get((user_id, subject), (0.0, 0))
+        accuracy = accuracy + SKILL_ALPHA * (score - accuracy) if attempts else float(score)
+        skills[(user_id, subject)] = (accuracy, attempts + 1)
+    now = datetime.utcnow()
+    if skills:
+        op.bulk_insert(skill, [
+            {'user_id': user_id, 'subject': subject, 'accuracy': accuracy,
+             'attempts': attempts, 'updated_at': now}
+            for (user_id, subject), (accuracy, attempts) in skills.items()
+        ])
+
+
+def downgrade() -> None:
+    op.drop_table('subject_skill')
@@ -0,0 +1,84 @@
+"""Store question options as JSON with the answer as an option index
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18 20:00:00
+
+"""
+import json
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0009'
+down_revision: Union[str, None] = '0008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 1000
+
+
+def _dumps(options):
+    return json.dumps(options, ensure_ascii=False, separators=(',', ':'))
+
+
+def _drop_column(bind, name):
+    if bind.dialect.name == 'sqlite':
+        # Native DROP COLUMN keeps the question_fts triggers and rowids intact;
+        # a batch-mode table rebuild would drop the triggers with the table
+        if bind.dialect.dbapi.sqlite_version_info < (3, 35, 0):
+            raise RuntimeError(f'dropping question.{name} needs SQLite 3.35 or newer')
+        op.execute(f'ALTER TABLE question DROP COLUMN {name}')
+    else:
+        op.drop_column('question', name)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    columns = {column['name'] for column in sa.inspect(bind).get_columns('question')}
+    if 'answer' not in columns:
+        return
+    if 'answer_index' not in columns:
+        op.add_column('question', sa.Column('answer_index', sa.Integer(), nullable=True))
+
+    question = sa.table('question', sa.column('id'), sa.column('options'),
+                        sa.column('answer'), sa.column('answer_index'))
+    rows = bind.execute(sa.select(question.c.id, question.c.options, question.c.answer)).all()
+    converted = []
+    for row_id, options, answer in rows:
+        options = [option.strip() for option in (options or '').split(',') if option.strip()]
+        answer = (answer or '').strip()
+        if answer not in options:
+            # Keep the question answerable even if the old row was inconsistent
+            options.append(answer)
+        converted.append({'row_id': row_id, 'options': _dumps(options),
+                          'answer_index': options.index(answer)})
+    update = (sa.update(question).where(question.c.id == sa.bindparam('row_id'))
+              .values(options=sa.bindparam('options'), answer_index=sa.bindparam('answer_index')))
+    for offset in range(0, len(converted), BATCH_SIZE):
+        bind.execute(update, converted[offset:offset + BATCH_SIZE])
+
+    if bind.dialect.name != 'sqlite':
+        op.alter_column('question', 'answer_index', existing_type=sa.Integer(), nullable=False)
+    _drop_column(bind, 'answer')
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    op.add_column('question', sa.Column('answer', sa.String(length=255), nullable=True))
+    question = sa.table('question', sa.column('id'), sa.column('options'),
+                        sa.column('answer'), sa.column('answer_index'))
+    rows = bind.execute(sa.select(question.c.id, question.c.options, question.c.answer_index)).all()
+    restored = []
+    for row_id, options, answer_index in rows:
+        options = json.loads(options)
+        restored.append({'row_id': row_id, 'options': ','.join(options),
+                         'answer': options[answer_index]})
+    update = (sa.update(question).where(question.c.id == sa.bindparam('row_id'))
+              .values(options=sa.bindparam('options'), answer=sa.bindparam('answer')))
+    for offset in range(0, len(restored), BATCH_SIZE):
+        bind.execute(update, restored[offset:offset + BATCH_SIZE])
+    _drop_column(bind, 'answer_index')
@@ -0,0 +1,35 @@
+"""Add progress.client_event_id for idempotent offline sync
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-18 21:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0010'
+down_revision: Union[str, None] = '0009'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if 'client_event_id' not in {column['name'] for column in inspector.get_columns('progress')}:
+        op.add_column('progress', sa.Column('client_event_id', sa.String(length=36), nullable=True))
+    if 'uq_progress_client_event_id' not in {index['name'] for index in inspector.get_indexes('progress')}:
+        # NULLs (web and legacy rows) never collide
+        op.create_index('uq_progress_client_event_id', 'progress', ['client_event_id'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('uq_progress_client_event_id', table_name='progress')
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute('ALTER TABLE progress DROP COLUMN client_event_id')  # SQLite 3.35+
+    else:
+        op.drop_column('progress', 'client_event_id')
@@ -0,0 +1,32 @@
+"""Add resource.resource_type to databases created before it existed
+
+Replaces the ad-hoc ALTER TABLE that app.py ran on every startup.
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-18 23:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0011'
+down_revision: Union[str, None] = '0010'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if 'resource_type' not in {column['name'] for column in inspector.get_columns('resource')}:
+        op.add_column('resource', sa.Column('resource_type', sa.String(length=20),
+                                            nullable=True, server_default='other'))
+
+
+def downgrade() -> None:
+    # The column predates the migration history on most databases; keep it
+    pass
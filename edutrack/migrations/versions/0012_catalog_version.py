@@ -0,0 +1,38 @@
+"""Add catalog_version, the counter that keys cached catalog fragments
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-19 01:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0012'
+down_revision: Union[str, None] = '0011'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    columns = [
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('version', sa.Integer(), nullable=False),
+    ]
+    if 'catalog_version' in sa.inspect(bind).get_table_names():
+        # create_all() may have made it already; seed the row if missing
+        catalog_version = sa.table('catalog_version', *(sa.column(c.name) for c in columns))
+        if bind.execute(sa.select(sa.func.count()).select_from(catalog_version)).scalar():
+            return
+    else:
+        catalog_version = op.create_table('catalog_version', *columns)
+    op.bulk_insert(catalog_version, [{'id': 1, 'version': 1}])
+
+
+def downgrade() -> None:
+    op.drop_table('catalog_version')
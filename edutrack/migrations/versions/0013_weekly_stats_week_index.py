@@ -0,0 +1,28 @@
+"""Index weekly_stats.week_start for loading a week's leaderboards
+
+Revision ID: 0013
+Revises: 0012
+Create Date: 2026-10-19 02:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0013'
+down_revision: Union[str, None] = '0012'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if 'ix_weekly_stats_week_start' not in {index['name'] for index in inspector.get_indexes('weekly_stats')}:
+        op.create_index('ix_weekly_stats_week_start', 'weekly_stats', ['week_start'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_weekly_stats_week_start', table_name='weekly_stats')
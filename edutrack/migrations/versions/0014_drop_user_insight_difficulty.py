@@ -0,0 +1,41 @@
+"""Drop user_insight.difficulty and recent_accuracy
+
+The quiz reads difficulty from subject_skill; nothing read these columns.
+
+Revision ID: 0014
+Revises: 0013
+Create Date: 2026-10-19 04:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0014'
+down_revision: Union[str, None] = '0013'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = [
+    ('difficulty', sa.String(length=10)),
+    ('recent_accuracy', sa.Float()),
+]
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    existing = {col['name'] for col in inspector.get_columns('user_insight')}
+    dropped = [name for name, _ in COLUMNS if name in existing]
+    if dropped:
+        with op.batch_alter_table('user_insight') as batch_op:
+            for name in dropped:
+                batch_op.drop_column(name)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('user_insight') as batch_op:
+        for name, type_ in COLUMNS:
+            batch_op.add_column(sa.Column(name, type_, nullable=True))
@@ -0,0 +1,36 @@
+"""Scope progress.client_event_id uniqueness to the user
+
+Another user's event with the same id no longer makes an upload a
+duplicate.
+
+Revision ID: 0015
+Revises: 0014
+Create Date: 2026-10-19 05:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0015'
+down_revision: Union[str, None] = '0014'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    indexes = {index['name'] for index in sa.inspect(op.get_bind()).get_indexes('progress')}
+    if 'uq_progress_user_client_event_id' not in indexes:
+        # NULLs (web and legacy rows) never collide
+        op.create_index('uq_progress_user_client_event_id', 'progress',
+                        ['user_id', 'client_event_id'], unique=True)
+    if 'uq_progress_client_event_id' in indexes:
+        op.drop_index('uq_progress_client_event_id', table_name='progress')
+
+
+def downgrade() -> None:
+    op.create_index('uq_progress_client_event_id', 'progress', ['client_event_id'], unique=True)
+    op.drop_index('uq_progress_user_client_event_id', table_name='progress')
@@ -1,9 +1,37 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from datetime import datetime
+import hashlib
+import json
+import re
 
 db = SQLAlchemy()
 
+def prompt_fingerprint(prompt):
+    """SHA-256 of a question prompt with case and whitespace normalized"""
+    normalized = re.sub(r"\s+", " ", (prompt or "").strip().lower())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+def _default_prompt_hash(context):
+    return prompt_fingerprint(context.get_current_parameters().get("prompt"))
+
+class OptionList(db.TypeDecorator):
+    """A list of strings stored as compact JSON text"""
+    impl = db.Text
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return json.dumps(list(value), ensure_ascii=False, separators=(",", ":"))
+
+    def process_result_value(self, value, dialect):
+        return json.loads(value) if value is not None else None
+
+    def coerce_compared_value(self, op, value):
+        # LIKE patterns and other comparisons bind as plain text
+        return db.Text()
+
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(120), nullable=False)
@@ -14,6 +42,11 @@ class User(UserMixin, db.Model):
     is_admin = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        # Keyset pagination order (see pagination.py)
+        db.Index("ix_user_created_at_id", "created_at", "id"),
+    )
+
 class Resource(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(255), nullable=False)
@@ -23,18 +56,40 @@ class Resource(db.Model):
     difficulty = db.Column(db.String(10), default="easy")
     url = db.Column(db.String(500), nullable=False)
     resource_type = db.Column(db.String(20), default="other")  # pdf, youtube, other
+    content_hash = db.Column(db.String(64), index=True)  # SHA-256 of stored PDFs
+    file_size = db.Column(db.Integer)
+    page_count = db.Column(db.Integer)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index("ix_resource_subject_difficulty", "subject", "difficulty"),
+        db.Index("ix_resource_created_at_id", "created_at", "id"),
+        # Keyset pages of the resources() subject filter
+        db.Index("ix_resource_subject_created_at_id", "subject", "created_at", "id"),
+    )
+
 class Question(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     subject = db.Column(db.String(50), nullable=False)
     exam = db.Column(db.String(20), nullable=False)
     difficulty = db.Column(db.String(10), default="easy")
     prompt = db.Column(db.Text, nullable=False)
-    answer = db.Column(db.String(255), nullable=False)
-    options = db.Column(db.Text, nullable=False)  # comma-separated options
+    options = db.Column(OptionList, nullable=False)  # ["3x10^8 m/s", ...]
+    answer_index = db.Column(db.Integer, nullable=False)  # position of the correct option
+    prompt_hash = db.Column(db.String(64), default=_default_prompt_hash, index=True)  # dedupe key
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        # Covers the quiz filters and the QuestionPool id load
+        db.Index("ix_question_difficulty_subject_exam", "difficulty", "subject", "exam"),
+        db.Index("ix_question_created_at_id", "created_at", "id"),
+    )
+
+    @property
+    def answer(self):
+        """Text of the correct option"""
+        return self.options[self.answer_index]
+
 class StudyPlan(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
@@ -43,6 +98,10 @@ class StudyPlan(db.Model):
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index("ix_study_plan_user_active_date", "user_id", "is_active", "date"),
+    )
+
 class Progress(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
@@ -50,6 +109,12 @@ class Progress(db.Model):
     ref_id = db.Column(db.Integer, nullable=False)
     extra_score = db.Column(db.Integer, nullable=True)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    client_event_id = db.Column(db.String(36))  # UUID from an offline client, for dedupe
+
+    __table_args__ = (
+        db.Index("ix_progress_user_type_time", "user_id", "item_type", "timestamp"),
+        db.Index("uq_progress_user_client_event_id", "user_id", "client_event_id", unique=True),
+    )
 
 class WeeklyStats(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -60,8 +125,40 @@ class WeeklyStats(db.Model):
     quizzes_correct = db.Column(db.Integer, default=0)
     study_hours = db.Column(db.Float, default=0.0)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    
+
+    # One row per user per week; also serves the (user_id, week_start) lookups
+    __table_args__ = (
+        db.Index("uq_weekly_stats_user_week", "user_id", "week_start", unique=True),
+        # Loading a week's leaderboards (see leaderboard.py)
+        db.Index("ix_weekly_stats_week_start", "week_start"),
+    )
+
     def get_accuracy(self):
         if self.quizzes_attempted == 0:
             return 0
-        return (self.quizzes_correct / self.quizzes_attempted) * 100
\ No newline at end of file
+        return (self.quizzes_correct / self.quizzes_attempted) * 100
+
+class UserInsight(db.Model):
+    """Per-user analytics precomputed by `flask batch-refresh`"""
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), primary_key=True)
+    plan_days = db.Column(db.Integer, default=0)  # active-plan days before today
+    plan_days_done = db.Column(db.Integer, default=0)  # ... with activity in that subject
+    refreshed_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def get_adherence(self):
+        if not self.plan_days:
+            return 0
+        return (self.plan_days_done / self.plan_days) * 100
+
+class SubjectSkill(db.Model):
+    """Exponentially weighted quiz accuracy per user and subject"""
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), primary_key=True)
+    subject = db.Column(db.String(50), primary_key=True)
+    accuracy = db.Column(db.Float, nullable=False, default=0.0)  # 0..1
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class CatalogVersion(db.Model):
+    """One row whose version goes up on every catalog write (see catalog.py)"""
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=1)
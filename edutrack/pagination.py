@@ -0,0 +1,102 @@
+"""
+Keyset pagination and streaming for EduTrack
+Web views page newest-first on (created_at, id): each page is one indexed
+range query that seeks past the last row seen, so page 5000 costs the same
+as page 1 (OFFSET would re-read every earlier row). The position travels in
+the URL as an opaque cursor token.
+
+CLI tools use stream() instead, which reads rows in fixed-size chunks.
+"""
+
+import base64
+from datetime import datetime
+from sqlalchemy import tuple_
+
+DEFAULT_PER_PAGE = 20
+MAX_PER_PAGE = 100
+STREAM_CHUNK_SIZE = 1000
+
+
+def encode_cursor(created_at, row_id):
+    """Opaque URL-safe token for a (created_at, id) position"""
+    raw = f"{created_at.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """(created_at, id) from a token; raises ValueError if it is malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode()
+        created_at, row_id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (TypeError, UnicodeDecodeError, ValueError) as e:
+        raise ValueError(f"invalid cursor: {token!r}") from e
+
+
+class KeysetPage:
+    """One page of rows plus the cursors of its neighbours (None at the ends)"""
+
+    def __init__(self, items, next_cursor=None, prev_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+
+def paginate_keyset(query, model, after=None, before=None, per_page=DEFAULT_PER_PAGE):
+    """Page an ORM query newest-first on (model.created_at, model.id)
+
+    after/before are cursor tokens from a previous page's next_cursor /
+    prev_cursor; with neither, the first (newest) page is returned. An
+    invalid token also yields the first page. Needs an index on
+    (created_at, id) to stay a range scan.
+    """
+    per_page = max(1, min(per_page, MAX_PER_PAGE))
+    key = tuple_(model.created_at, model.id)
+    position = None
+    backwards = False
+    try:
+        if before:
+            position, backwards = decode_cursor(before), True
+        elif after:
+            position = decode_cursor(after)
+    except ValueError:
+        position, backwards = None, False
+
+    if backwards:
+        # Walk towards newer rows, then flip back to newest-first
+        rows = (query.filter(key > position)
+                .order_by(model.created_at.asc(), model.id.asc())
+                .limit(per_page + 1).all())
+        more = len(rows) > per_page
+        items = list(reversed(rows[:per_page]))
+        has_prev, has_next = more, True
+    else:
+        if position is not None:
+            query = query.filter(key < position)
+        rows = (query.order_by(model.created_at.desc(), model.id.desc())
+                .limit(per_page + 1).all())
+        more = len(rows) > per_page
+        items = rows[:per_page]
+        has_prev, has_next = position is not None, more
+
+    if not items:
+        return KeysetPage(items)
+    first, last = items[0], items[-1]
+    return KeysetPage(
+        items,
+        next_cursor=encode_cursor(last.created_at, last.id) if has_next else None,
+        prev_cursor=encode_cursor(first.created_at, first.id) if has_prev else None,
+    )
+
+
+def stream(query, chunk_size=STREAM_CHUNK_SIZE):
+    """Iterate an ORM query chunk by chunk instead of loading every row"""
+    return query.yield_per(chunk_size)
@@ -0,0 +1,120 @@
+"""
+Study-plan engine for EduTrack
+Days are shared out between the chosen subjects in proportion to the exam's
+marks weightage, boosted for subjects where the student's quiz accuracy is
+low. The whole schedule is allocated in one pass (per-subject day counts by
+largest remainder, then each subject's days spread evenly over the plan)
+and written with a single multi-row INSERT.
+"""
+
+import math
+from datetime import date, timedelta
+from sqlalchemy import case, func, insert, select, update
+from models import db, StudyPlan, Progress, Question
+
+MAX_PLAN_WEEKS = 12
+
+# Share of total marks per subject in each exam
+EXAM_WEIGHTAGE = {
+    'JEE': {'Math': 1 / 3, 'Physics': 1 / 3, 'Chemistry': 1 / 3},
+    'NEET': {'Biology': 0.5, 'Physics': 0.25, 'Chemistry': 0.25},
+    'KCET': {'Math': 0.25, 'Physics': 0.25, 'Chemistry': 0.25, 'Biology': 0.25},
+}
+# Chosen subjects the exam does not test get half the smallest tested weight
+UNTESTED_WEIGHT_FACTOR = 0.5
+
+# Accuracy is smoothed towards 50% as if PRIOR_ATTEMPTS answers had been
+# given, so one lucky or unlucky answer does not swing the plan
+PRIOR_ATTEMPTS = 4
+PRIOR_ACCURACY = 0.5
+# A subject at 0% accuracy gets (1 + WEAKNESS_BOOST) times its exam weight
+WEAKNESS_BOOST = 1.0
+
+
+def subject_weights(exam, subjects):
+    """Normalized exam weightage for the chosen subjects (equal if unknown exam)"""
+    table = EXAM_WEIGHTAGE.get(exam)
+    if not table:
+        return {subject: 1 / len(subjects) for subject in subjects}
+    untested = min(table.values()) * UNTESTED_WEIGHT_FACTOR
+    weights = {subject: table.get(subject, untested) for subject in subjects}
+    total = sum(weights.values())
+    return {subject: weight / total for subject, weight in weights.items()}
+
+
+def subject_accuracy(user_id):
+    """{subject: (attempts, correct)} from one aggregate over quiz Progress"""
+    rows = db.session.execute(
+        select(
+            Question.subject,
+            func.count(),
+            func.sum(case((Progress.extra_score == 1, 1), else_=0)),
+        )
+        .select_from(Progress)
+        .join(Question, Question.id == Progress.ref_id)
+        .where(Progress.user_id == user_id, Progress.item_type == 'quiz')
+        .group_by(Question.subject)
+    )
+    return {subject: (attempts, correct or 0) for subject, attempts, correct in rows}
+
+
+def plan_weights(exam, subjects, accuracy):
+    """Exam weightage scaled up for weak subjects, normalized to sum to 1"""
+    weights = {}
+    for subject, weight in subject_weights(exam, subjects).items():
+        attempts, correct = accuracy.get(subject, (0, 0))
+        smoothed = (correct + PRIOR_ACCURACY * PRIOR_ATTEMPTS) / (attempts + PRIOR_ATTEMPTS)
+        weights[subject] = weight * (1 + WEAKNESS_BOOST * (1 - smoothed))
+    total = sum(weights.values())
+    return {subject: weight / total for subject, weight in weights.items()}
+
+
+def allocate_days(weights, days):
+    """Per-subject day counts summing to days (largest-remainder method)"""
+    quotas = {subject: weight * days for subject, weight in weights.items()}
+    counts = {subject: math.floor(quota) for subject, quota in quotas.items()}
+    leftover = days - sum(counts.values())
+    by_remainder = sorted(quotas, key=lambda s: (quotas[s] - counts[s], weights[s]), reverse=True)
+    for subject in by_remainder[:leftover]:
+        counts[subject] += 1
+    return counts
+
+
+def schedule(weights, days):
+    """Subject for each of the days, every subject's days spread evenly
+
+    Subject s with n days gets slots at (j + 0.5) * days / n; ordering all
+    slots at once interleaves subjects without per-day random draws.
+    """
+    counts = allocate_days(weights, days)
+    slots = [
+        ((j + 0.5) * days / count, -weights[subject], subject)
+        for subject, count in counts.items()
+        for j in range(count)
+    ]
+    slots.sort()
+    return [subject for _, _, subject in slots]
+
+
+def generate_plan(user_id, exam, subjects, weeks, start=None):
+    """Replace the user's active plan; returns {subject: days}
+
+    The old plan is deactivated and the new one inserted in one
+    transaction, with one UPDATE and one multi-row INSERT.
+    """
+    weeks = max(1, min(weeks, MAX_PLAN_WEEKS))
+    start = start or date.today()
+    weights = plan_weights(exam, subjects, subject_accuracy(user_id))
+    days = schedule(weights, weeks * 7)
+
+    db.session.execute(
+        update(StudyPlan)
+        .where(StudyPlan.user_id == user_id, StudyPlan.is_active.is_(True))
+        .values(is_active=False)
+    )
+    db.session.execute(insert(StudyPlan).values([
+        {'user_id': user_id, 'date': start + timedelta(days=offset), 'subject': subject, 'is_active': True}
+        for offset, subject in enumerate(days)
+    ]))
+    db.session.commit()
+    return {subject: days.count(subject) for subject in weights}
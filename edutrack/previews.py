@@ -0,0 +1,191 @@
+"""
+Lazy PDF page previews for EduTrack
+Renders the first page(s) of stored PDFs to small JPEG thumbnails on first
+request and keeps them in a size-bounded on-disk LRU cache keyed by the
+file's content hash.
+
+Rendering uses PyMuPDF when installed (pip install pymupdf), otherwise the
+pdftoppm binary from poppler-utils. Without either, no previews are made
+and the resources page falls back to the plain PDF icon.
+"""
+
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import pymupdf
+except ImportError:
+    try:
+        import fitz as pymupdf
+    except ImportError:
+        pymupdf = None
+
+PREVIEW_WIDTH = 320
+JPEG_QUALITY = 70
+MAX_PREVIEW_PAGES = 3
+RENDER_TIMEOUT_SECONDS = 30
+# Pages that failed to render are not retried for this long
+FAILED_RETRY_SECONDS = 600
+MAX_REMEMBERED_FAILURES = 1024
+
+
+def renderer_available():
+    """True if PyMuPDF or pdftoppm can render pages"""
+    return pymupdf is not None or shutil.which('pdftoppm') is not None
+
+
+def render_page(source_path, page=1, width=PREVIEW_WIDTH):
+    """Render one 1-based page of a PDF to JPEG bytes, or None on failure"""
+    if pymupdf is not None:
+        try:
+            with pymupdf.open(source_path) as doc:
+                if page > doc.page_count:
+                    return None
+                pdf_page = doc[page - 1]
+                zoom = width / pdf_page.rect.width
+                pixmap = pdf_page.get_pixmap(matrix=pymupdf.Matrix(zoom, zoom), alpha=False)
+                return pixmap.tobytes('jpeg', jpg_quality=JPEG_QUALITY)
+        except Exception:
+            return None
+
+    pdftoppm = shutil.which('pdftoppm')
+    if pdftoppm is None:
+        return None
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        out_prefix = os.path.join(tmp_dir, 'page')
+        try:
+            subprocess.run(
+                [pdftoppm, '-jpeg', '-jpegopt', f'quality={JPEG_QUALITY}',
+                 '-f', str(page), '-l', str(page), '-scale-to-x', str(width),
+                 '-scale-to-y', '-1', '-singlefile', source_path, out_prefix],
+                check=True, capture_output=True, timeout=RENDER_TIMEOUT_SECONDS
+            )
+            with open(out_prefix + '.jpg', 'rb') as f:
+                return f.read()
+        except (subprocess.SubprocessError, OSError):
+            return None
+
+
+class PreviewCache:
+    """Bounded on-disk LRU of rendered page thumbnails
+
+    Hits refresh the file's mtime; when the cache grows past max_bytes the
+    least recently used thumbnails are deleted down to 90% of the limit.
+    Pages that cannot be rendered (past the last page, corrupt files) are
+    remembered for FAILED_RETRY_SECONDS so requests for them return at once.
+    """
+
+    def __init__(self, root, max_bytes):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._render_locks = {}
+        self._failures = OrderedDict()  # thumbnail path -> when rendering it failed
+        self._size = None
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='preview')
+
+    def path_for(self, digest, page, width=PREVIEW_WIDTH):
+        return os.path.join(self.root, digest[:2], f'{digest}-p{page}-w{width}.jpg')
+
+    def get(self, source_path, digest, page=1, width=PREVIEW_WIDTH):
+        """Return the path of a cached thumbnail, rendering it if needed
+
+        Returns None when the page cannot be rendered.
+        """
+        path = self.path_for(digest, page, width)
+        if os.path.exists(path):
+            try:
+                os.utime(path)  # LRU: mark as recently used
+            except OSError:
+                pass
+            return path
+
+        # One render per thumbnail even if several requests miss at once
+        with self._lock:
+            if self._failed_recently(path):
+                return None
+            render_lock = self._render_locks.setdefault(path, threading.Lock())
+        try:
+            with render_lock:
+                if not os.path.exists(path):
+                    with self._lock:
+                        if self._failed_recently(path):
+                            return None  # another request just failed to render it
+                    data = render_page(source_path, page, width)
+                    if data is None:
+                        self._remember_failure(path)
+                        return None
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    tmp_path = f'{path}.{threading.get_ident()}.tmp'
+                    with open(tmp_path, 'wb') as f:
+                        f.write(data)
+                    os.replace(tmp_path, path)
+                    self._account(len(data))
+        finally:
+            with self._lock:
+                self._render_locks.pop(path, None)
+        return path
+
+    def _failed_recently(self, path):
+        # Called with self._lock held
+        failed_at = self._failures.get(path)
+        if failed_at is None:
+            return False
+        if time.monotonic() - failed_at < FAILED_RETRY_SECONDS:
+            return True
+        del self._failures[path]
+        return False
+
+    def _remember_failure(self, path):
+        with self._lock:
+            self._failures[path] = time.monotonic()
+            self._failures.move_to_end(path)
+            while len(self._failures) > MAX_REMEMBERED_FAILURES:
+                self._failures.popitem(last=False)
+
+    def pregenerate(self, source_path, digest, pages=1):
+        """Render the first pages in the background (e.g. right after upload)"""
+        if not renderer_available():
+            return None
+        return self._executor.submit(
+            lambda: [self.get(source_path, digest, page) for page in range(1, pages + 1)]
+        )
+
+    def _entries(self):
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                if filename.endswith('.jpg'):
+                    path = os.path.join(dirpath, filename)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    yield stat.st_mtime, stat.st_size, path
+
+    def _account(self, added):
+        with self._lock:
+            if self._size is None:
+                self._size = sum(size for _, size, _ in self._entries())
+            else:
+                self._size += added
+            if self._size <= self.max_bytes:
+                return
+            # Evict least recently used thumbnails
+            entries = sorted(self._entries())
+            total = sum(size for _, size, _ in entries)
+            target = int(self.max_bytes * 0.9)
+            for _, size, path in entries:
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except FileNotFoundError:
+                    pass
+            self._size = total
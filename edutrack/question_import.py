@@ -0,0 +1,181 @@
+"""
+Bulk question-bank importer for EduTrack
+Streams CSV or JSONL files row by row, validates each question, skips
+prompts that already exist (by normalized prompt hash) and inserts the rest
+in batched executemany transactions.
+
+CSV columns: subject, exam, difficulty, prompt, options, answer
+  (options separated by "|")
+JSONL keys: the same, with options as a list or a "|"-separated string
+"""
+
+import csv
+import io
+import json
+from datetime import datetime
+from sqlalchemy import insert, select
+from models import db, Question, prompt_fingerprint
+
+DIFFICULTIES = ('easy', 'medium', 'hard')
+DEFAULT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 50
+
+
+class ImportReport:
+    """Counters and the first few validation errors from one import"""
+
+    def __init__(self):
+        self.inserted = 0
+        self.duplicates = 0
+        self.invalid = 0
+        self.errors = []
+        self.stopped = False
+
+    def add_error(self, line_no, message):
+        self.invalid += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(f"line {line_no}: {message}")
+
+    def stop(self, line_no, message):
+        """Record an error that ends the import (unreadable file); listed first"""
+        self.stopped = True
+        self.errors.insert(0, f"near line {line_no}: {message}; import stopped")
+
+    def summary(self):
+        return (f"{self.inserted} imported, {self.duplicates} duplicates skipped, "
+                f"{self.invalid} invalid" + (", stopped early" if self.stopped else ""))
+
+
+def detect_format(filename):
+    """Guess 'csv' or 'jsonl' from a file name"""
+    name = (filename or '').lower()
+    if name.endswith('.jsonl') or name.endswith('.ndjson'):
+        return 'jsonl'
+    return 'csv'
+
+
+def iter_records(stream, fmt):
+    """Yield (line_no, dict) from a text stream without reading it all"""
+    if fmt == 'jsonl':
+        for line_no, line in enumerate(stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield line_no, e
+                continue
+            yield line_no, record
+    else:
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, record
+
+
+def clean_record(record):
+    """Validate one raw record and return a Question row dict
+
+    Raises ValueError with a readable message when the row is unusable.
+    """
+    if not isinstance(record, dict):
+        raise ValueError(str(record) if isinstance(record, Exception) else 'not an object')
+
+    def text(key):
+        value = record.get(key)
+        return str(value).strip() if value is not None else ''
+
+    subject, exam, prompt, answer = text('subject'), text('exam'), text('prompt'), text('answer')
+    difficulty = text('difficulty').lower() or 'easy'
+    for key, value in (('subject', subject), ('exam', exam), ('prompt', prompt), ('answer', answer)):
+        if not value:
+            raise ValueError(f"missing {key}")
+    if difficulty not in DIFFICULTIES:
+        raise ValueError(f"difficulty must be one of {', '.join(DIFFICULTIES)}")
+
+    options = record.get('options')
+    if isinstance(options, str):
+        options = options.split('|')
+    if not isinstance(options, list):
+        raise ValueError("options must be a list or a '|'-separated string")
+    options = [str(option).strip() for option in options if str(option).strip()]
+    if len(options) < 2:
+        raise ValueError("need at least two options")
+    if answer not in options:
+        raise ValueError(f"answer {answer!r} is not one of the options")
+
+    return {
+        'subject': subject,
+        'exam': exam,
+        'difficulty': difficulty,
+        'prompt': prompt,
+        'options': options,
+        'answer_index': options.index(answer),
+        'prompt_hash': prompt_fingerprint(prompt),
+    }
+
+
+def _flush(batch, report):
+    """Insert one batch, skipping prompts already in the database"""
+    if not batch:
+        return
+    existing = set(db.session.execute(
+        select(Question.prompt_hash).where(Question.prompt_hash.in_(list(batch)))
+    ).scalars())
+    rows = [row for prompt_hash, row in batch.items() if prompt_hash not in existing]
+    report.duplicates += len(batch) - len(rows)
+    if rows:
+        now = datetime.utcnow()
+        for row in rows:
+            row['created_at'] = now
+        db.session.execute(insert(Question.__table__), rows)
+    db.session.commit()
+    report.inserted += len(rows)
+    batch.clear()
+
+
+def import_questions(stream, fmt='csv', batch_size=DEFAULT_BATCH_SIZE):
+    """Import questions from a text stream; returns an ImportReport
+
+    Memory use is bounded by batch_size: duplicates within a batch are
+    dropped in Python, and earlier batches are already in the database by
+    the time later ones are checked. A file that stops decoding as UTF-8 or
+    parsing as CSV ends the import there; rows before it are kept.
+    """
+    report = ImportReport()
+    batch = {}
+    line_no = 0
+    try:
+        for line_no, record in iter_records(stream, fmt):
+            try:
+                row = clean_record(record)
+            except ValueError as e:
+                report.add_error(line_no, e)
+                continue
+            if row['prompt_hash'] in batch:
+                report.duplicates += 1
+                continue
+            batch[row['prompt_hash']] = row
+            if len(batch) >= batch_size:
+                _flush(batch, report)
+    except UnicodeDecodeError:
+        report.stop(line_no + 1, "file is not UTF-8 text (save it as CSV UTF-8)")
+    except csv.Error as e:
+        report.stop(line_no + 1, f"malformed CSV ({e})")
+    _flush(batch, report)
+    return report
+
+
+def import_questions_file(path, fmt=None, batch_size=DEFAULT_BATCH_SIZE):
+    """Import from a file on disk"""
+    with open(path, newline='', encoding='utf-8-sig') as stream:
+        return import_questions(stream, fmt or detect_format(path), batch_size)
+
+
+def import_questions_upload(file_storage, batch_size=DEFAULT_BATCH_SIZE):
+    """Import from a werkzeug FileStorage without buffering it in memory
+
+    utf-8-sig drops the byte-order mark Excel writes at the start of CSVs.
+    """
+    stream = io.TextIOWrapper(file_storage.stream, encoding='utf-8-sig', newline='')
+    return import_questions(stream, detect_format(file_storage.filename), batch_size)
@@ -0,0 +1,140 @@
+"""
+In-memory question selection for the adaptive quiz
+Keeps the ids of every Question grouped by (subject, exam, difficulty) so a
+quiz view samples one id and loads a single row by primary key, instead of
+materializing every matching question.
+"""
+
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from sqlalchemy import select
+from models import db, Question, Progress
+
+# Reload the pool periodically so questions added by other processes
+# (CLI scripts, other workers) show up without a restart
+POOL_TTL_SECONDS = 300
+# Questions a user answered recently are not served again
+RECENT_PER_USER = 20
+MAX_TRACKED_USERS = 10000
+SAMPLE_ATTEMPTS = 8
+
+
+class QuestionPool:
+    """Per-process pool of question ids keyed by (subject, exam, difficulty)
+
+    A subject or exam of None in the key means "any", so every filter
+    combination the quiz page can ask for is a single dict lookup.
+    """
+
+    def __init__(self, ttl=POOL_TTL_SECONDS, recent_size=RECENT_PER_USER):
+        self.ttl = ttl
+        self.recent_size = recent_size
+        self._lock = threading.Lock()
+        self._pools = None
+        self._subjects = []
+        self._loaded_at = 0.0
+        self._recent = OrderedDict()  # user_id -> deque of question ids
+
+    def invalidate(self):
+        """Drop the pool; it is rebuilt on the next pick"""
+        with self._lock:
+            self._pools = None
+
+    def _ensure_loaded(self):
+        """Return the current pools, rebuilding them if missing or expired"""
+        pools = self._pools
+        if pools is not None and time.monotonic() - self._loaded_at < self.ttl:
+            return pools
+        rows = db.session.execute(select(
+            Question.id, Question.subject, Question.exam, Question.difficulty
+        )).all()
+        pools = {}
+        for qid, subject, exam, difficulty in rows:
+            self._index(pools, qid, subject, exam, difficulty)
+        with self._lock:
+            self._pools = pools
+            self._subjects = sorted({row[1] for row in rows})
+            self._loaded_at = time.monotonic()
+        return pools
+
+    @staticmethod
+    def _index(pools, qid, subject, exam, difficulty):
+        for key in ((subject, exam, difficulty), (subject, None, difficulty),
+                    (None, exam, difficulty), (None, None, difficulty)):
+            pools.setdefault(key, []).append(qid)
+
+    def add(self, question):
+        """Register a newly committed Question without a full reload"""
+        with self._lock:
+            if self._pools is None:
+                return
+            self._index(self._pools, question.id, question.subject,
+                        question.exam, question.difficulty or 'easy')
+            if question.subject not in self._subjects:
+                self._subjects = sorted(self._subjects + [question.subject])
+
+    def subjects(self):
+        """Distinct question subjects, without querying the table"""
+        self._ensure_loaded()
+        return list(self._subjects)
+
+    def _recent_ids(self, user_id):
+        with self._lock:
+            recent = self._recent.get(user_id)
+            if recent is not None:
+                self._recent.move_to_end(user_id)
+                return set(recent)
+        # First quiz view for this user in this process: seed from history
+        rows = db.session.query(Progress.ref_id).filter_by(
+            user_id=user_id, item_type='quiz'
+        ).order_by(Progress.timestamp.desc()).limit(self.recent_size).all()
+        recent = deque((row[0] for row in reversed(rows)), maxlen=self.recent_size)
+        with self._lock:
+            self._recent[user_id] = recent
+            while len(self._recent) > MAX_TRACKED_USERS:
+                self._recent.popitem(last=False)
+        return set(recent)
+
+    def remember(self, user_id, question_id):
+        """Note that a user just answered a question"""
+        with self._lock:
+            recent = self._recent.get(user_id)
+            if recent is not None:
+                recent.append(int(question_id))
+
+    def pick_id(self, difficulty, subject=None, exam=None, user_id=None):
+        """Sample a question id, avoiding the user's recent answers if possible"""
+        pools = self._ensure_loaded()
+        candidates = pools.get((subject or None, exam, difficulty))
+        if not candidates and exam is not None:
+            # No questions for the user's exam yet; fall back to any exam
+            candidates = pools.get((subject or None, None, difficulty))
+        if not candidates:
+            return None
+
+        recent = self._recent_ids(user_id) if user_id is not None else set()
+        for _ in range(SAMPLE_ATTEMPTS):
+            qid = random.choice(candidates)
+            if qid not in recent:
+                return qid
+        # Small pool mostly made of recent answers: filter explicitly
+        fresh = [qid for qid in candidates if qid not in recent]
+        return random.choice(fresh or candidates)
+
+    def pick(self, difficulty, subject=None, exam=None, user_id=None):
+        """Return one Question loaded by primary key, or None"""
+        qid = self.pick_id(difficulty, subject, exam, user_id)
+        if qid is None:
+            return None
+        question = db.session.get(Question, qid)
+        if question is None:
+            # Deleted since the pool was built
+            self.invalidate()
+            qid = self.pick_id(difficulty, subject, exam, user_id)
+            question = db.session.get(Question, qid) if qid is not None else None
+        return question
+
+
+question_pool = QuestionPool()
@@ -0,0 +1,245 @@
+"""
+Offline sync replay for EduTrack
+Simulates students who studied offline: each one has a queue of quiz
+answers and resource completions spread over past weeks, uploaded to
+POST /api/v1/sync in batches from several threads, with some batches sent
+twice as a flaky connection would. Reports events/sec and batch latency.
+
+By default it runs in-process against a scratch SQLite database and then
+checks that every event was stored exactly once and that WeeklyStats
+matches a full recount from Progress. With --url it replays against a
+running server as one existing account instead (no checks).
+
+Usage: python replay_sync.py [--users 50] [--events 400] [--batch-size 100]
+                             [--threads 4] [--retry-rate 0.2]
+       python replay_sync.py --url http://localhost:5000 --email a@b --password x
+"""
+
+import argparse
+import http.cookiejar
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+import uuid
+from datetime import datetime, timedelta
+from instrumentation import percentile
+
+
+def offline_queue(rng, events, question_ids, resource_ids, weeks=8):
+    """One student's queued events, oldest first, over the last `weeks` weeks"""
+    now = datetime.utcnow()
+    queue = []
+    for _ in range(events):
+        at = now - timedelta(seconds=rng.randrange(weeks * 7 * 24 * 3600))
+        if rng.random() < 0.8:
+            event = {'type': 'quiz', 'question_id': rng.choice(question_ids), 'chosen': rng.randrange(4)}
+        else:
+            event = {'type': 'resource', 'resource_id': rng.choice(resource_ids)}
+        event.update(id=str(uuid.uuid4()), at=at.isoformat() + 'Z')
+        queue.append(event)
+    queue.sort(key=lambda event: event['at'])
+    return queue
+
+
+def batches(queue, batch_size, retry_rate, rng):
+    """Split a queue into upload batches, repeating some as lost responses would"""
+    for offset in range(0, len(queue), batch_size):
+        batch = queue[offset:offset + batch_size]
+        yield batch
+        if rng.random() < retry_rate:
+            yield batch
+
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = []
+        self.totals = {'accepted': 0, 'duplicates': 0, 'rejected': 0}
+
+    def add(self, elapsed, result):
+        with self.lock:
+            self.latencies.append(elapsed)
+            for key in self.totals:
+                self.totals[key] += len(result[key])
+
+
+def run_clients(clients, threads):
+    """Run client callables on a fixed number of threads"""
+    pending = list(clients)
+    lock = threading.Lock()
+
+    def worker():
+        while True:
+            with lock:
+                if not pending:
+                    return
+                client = pending.pop()
+            client()
+
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+
+
+def report(stats, elapsed, uploaded):
+    print(f"  {len(stats.latencies)} batches, {uploaded} events uploaded in {elapsed:.2f}s "
+          f"({uploaded / elapsed:,.0f} events/sec)")
+    print(f"  batch latency p50={percentile(stats.latencies, 50) * 1000:.1f}ms "
+          f"p95={percentile(stats.latencies, 95) * 1000:.1f}ms "
+          f"max={max(stats.latencies) * 1000:.1f}ms")
+    print(f"  accepted={stats.totals['accepted']} duplicates={stats.totals['duplicates']} "
+          f"rejected={stats.totals['rejected']}")
+
+
+def replay_local(args):
+    """Replay against the app in-process on a scratch database; returns failures"""
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'replay.db')
+    from sqlalchemy import func, insert, select
+    from werkzeug.security import generate_password_hash
+    from app import app, db
+    from models import User, Question, Resource, Progress, WeeklyStats
+    from stats import recompute_weekly_stats
+
+    rng = random.Random(args.seed)
+    with app.app_context():
+        db.create_all()
+        db.session.execute(insert(Question), [{
+            'subject': ('Math', 'Physics', 'Chemistry', 'Biology')[i % 4], 'exam': 'JEE',
+            'difficulty': ('easy', 'medium', 'hard')[i % 3], 'prompt': f'Replay question {i}',
+            'options': ['A', 'B', 'C', 'D'], 'answer_index': i % 4,
+        } for i in range(500)])
+        db.session.execute(insert(Resource), [{
+            'title': f'Replay resource {i}', 'subject': 'Physics', 'url': f'https://example.com/{i}',
+            'resource_type': 'other',
+        } for i in range(100)])
+        password = generate_password_hash('replay')
+        db.session.execute(insert(User), [{
+            'name': f'Offline {i}', 'email': f'offline{i}@edutrack.local', 'password_hash': password,
+        } for i in range(args.users)])
+        db.session.commit()
+        question_ids = db.session.execute(select(Question.id)).scalars().all()
+        resource_ids = db.session.execute(select(Resource.id)).scalars().all()
+
+    queues = [offline_queue(rng, args.events, question_ids, resource_ids) for _ in range(args.users)]
+    stats = Stats()
+    uploaded = 0
+    plans = []
+    for i, queue in enumerate(queues):
+        plan = list(batches(queue, args.batch_size, args.retry_rate, rng))
+        uploaded += sum(len(batch) for batch in plan)
+        plans.append((f'offline{i}@edutrack.local', plan))
+
+    def client_for(email, plan):
+        def run():
+            client = app.test_client()
+            client.post('/api/v1/login', json={'email': email, 'password': 'replay'})
+            for batch in plan:
+                started = time.perf_counter()
+                # A fresh app context (and session) per request, as on a server
+                with app.app_context():
+                    response = client.post('/api/v1/sync', json={'events': batch})
+                stats.add(time.perf_counter() - started, response.get_json())
+        return run
+
+    print(f"Replaying {args.users} offline students x {args.events} events "
+          f"(batches of {args.batch_size}, {args.retry_rate:.0%} resent, {args.threads} threads)")
+    started = time.perf_counter()
+    run_clients([client_for(email, plan) for email, plan in plans], args.threads)
+    report(stats, time.perf_counter() - started, uploaded)
+
+    failures = 0
+    expected = args.users * args.events
+    with app.app_context():
+        stored = db.session.execute(select(func.count()).select_from(Progress)).scalar()
+        live = sorted(tuple(row) for row in db.session.execute(select(
+            WeeklyStats.user_id, WeeklyStats.week_start, WeeklyStats.resources_completed,
+            WeeklyStats.quizzes_attempted, WeeklyStats.quizzes_correct)))
+        recompute_weekly_stats()
+        db.session.commit()
+        recounted = sorted(tuple(row) for row in db.session.execute(select(
+            WeeklyStats.user_id, WeeklyStats.week_start, WeeklyStats.resources_completed,
+            WeeklyStats.quizzes_attempted, WeeklyStats.quizzes_correct)))
+    if stored != expected or stats.totals['accepted'] != expected:
+        failures += 1
+        print(f"  [FAIL] {stored} progress rows / {stats.totals['accepted']} accepted, expected {expected}")
+    else:
+        print(f"  [OK] every event stored exactly once ({stored} rows)")
+    if live != recounted:
+        failures += 1
+        print(f"  [FAIL] WeeklyStats differs from a recount ({len(live)} vs {len(recounted)} rows)")
+    else:
+        print(f"  [OK] WeeklyStats matches a full recount ({len(live)} user-weeks)")
+    return failures
+
+
+def replay_remote(args):
+    """Replay as one account against a running server"""
+    rng = random.Random(args.seed)
+    base = args.url.rstrip('/')
+
+    def opener():
+        jar = http.cookiejar.CookieJar()
+        session = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(jar))
+        post(session, '/api/v1/login', {'email': args.email, 'password': args.password})
+        return session
+
+    def post(session, path, payload):
+        request = urllib.request.Request(base + path, data=json.dumps(payload).encode(),
+                                         headers={'Content-Type': 'application/json'})
+        with session.open(request) as response:
+            return json.load(response)
+
+    # Ids the server has; the API pages are small, which is enough to sample from
+    session = opener()
+    question_ids = list(range(1, 51))
+    resource_ids = [resource['id'] for resource in
+                    json.load(session.open(base + '/api/v1/resources?per_page=100'))['resources']] or [1]
+    stats = Stats()
+    plans = [list(batches(offline_queue(rng, args.events, question_ids, resource_ids),
+                          args.batch_size, args.retry_rate, rng)) for _ in range(args.users)]
+    uploaded = sum(len(batch) for plan in plans for batch in plan)
+
+    def client_for(plan):
+        def run():
+            client = opener()
+            for batch in plan:
+                started = time.perf_counter()
+                result = post(client, '/api/v1/sync', {'events': batch})
+                stats.add(time.perf_counter() - started, result)
+        return run
+
+    print(f"Replaying {args.users} offline queues x {args.events} events against {base}")
+    started = time.perf_counter()
+    run_clients([client_for(plan) for plan in plans], args.threads)
+    report(stats, time.perf_counter() - started, uploaded)
+    return 0
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Replay offline sync uploads')
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--events', type=int, default=400, help='queued events per student')
+    parser.add_argument('--batch-size', type=int, default=100)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--retry-rate', type=float, default=0.2, help='share of batches sent twice')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--url', help='replay against a running server instead')
+    parser.add_argument('--email')
+    parser.add_argument('--password')
+    args = parser.parse_args(argv)
+    if args.url:
+        if not (args.email and args.password):
+            parser.error('--url needs --email and --password')
+        return replay_remote(args)
+    return 1 if replay_local(args) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
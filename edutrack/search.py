@@ -0,0 +1,220 @@
+"""
+Full-text search over resources and questions
+On SQLite the catalog is indexed in FTS5 tables (resource_fts over
+Resource.title/subject, question_fts over Question.prompt/options) that
+triggers keep in sync with every insert, update and delete, including the
+bulk Core inserts used by the importers. Results are ranked with BM25; the last
+search term matches as a prefix, so "electro" already finds
+"Electrochemistry" while it is being typed.
+
+Other databases fall back to unranked LIKE matching.
+"""
+
+import re
+from markupsafe import Markup, escape
+from sqlalchemy import event, text, and_, or_, select
+from models import db, Resource, Question
+
+DEFAULT_PER_PAGE = 20
+MAX_PER_PAGE = 50
+MAX_TERMS = 8
+KINDS = ('resources', 'questions')
+SNIPPET_WORDS = 24
+
+RESOURCE_FIELDS = ('id', 'title', 'subject', 'exam', 'grade', 'difficulty', 'url',
+                   'resource_type', 'content_hash')
+QUESTION_FIELDS = ('id', 'subject', 'exam', 'difficulty', 'prompt')
+
+# Highlight markers inside snippets, turned into <mark> by highlight()
+MARK_START, MARK_END = '\x02', '\x03'
+
+_TERM = re.compile(r'\w+\*?', re.UNICODE)
+
+# FTS5 external-content tables: rows live in the real tables, the index
+# holds only tokens. prefix='2 3' adds prefix indexes for short prefixes.
+FTS_INDEXES = {
+    'resource_fts': ('resource', ('title', 'subject')),
+    'question_fts': ('question', ('prompt', 'options')),
+}
+
+
+def _index_ddl(fts_table, table, columns):
+    cols = ', '.join(columns)
+    new = ', '.join(f'new.{c}' for c in columns)
+    old = ', '.join(f'old.{c}' for c in columns)
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table} USING fts5("
+        f"{cols}, content='{table}', content_rowid='id', "
+        f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts_table}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts_table}(rowid, {cols}) VALUES (new.id, {new}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts_table}_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts_table}({fts_table}, rowid, {cols}) VALUES ('delete', old.id, {old}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts_table}_au AFTER UPDATE OF {cols} ON {table} BEGIN "
+        f"INSERT INTO {fts_table}({fts_table}, rowid, {cols}) VALUES ('delete', old.id, {old}); "
+        f"INSERT INTO {fts_table}(rowid, {cols}) VALUES (new.id, {new}); END",
+    ]
+
+
+def install_search_index(connection, rebuild=False):
+    """Create the FTS tables and sync triggers if missing (SQLite only)
+
+    A newly created index is filled from the existing rows; rebuild=True
+    refills existing ones too (repair after out-of-band edits).
+    """
+    if connection.dialect.name != 'sqlite':
+        return False
+    existing = set(connection.exec_driver_sql(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name IN ('resource_fts', 'question_fts')"
+    ).scalars())
+    for fts_table, (table, columns) in FTS_INDEXES.items():
+        for statement in _index_ddl(fts_table, table, columns):
+            connection.exec_driver_sql(statement)
+        if rebuild or fts_table not in existing:
+            connection.exec_driver_sql(f"INSERT INTO {fts_table}({fts_table}) VALUES ('rebuild')")
+    return True
+
+
+def drop_search_index(connection):
+    if connection.dialect.name != 'sqlite':
+        return
+    for fts_table in FTS_INDEXES:
+        connection.exec_driver_sql(f"DROP TABLE IF EXISTS {fts_table}")
+
+
+# Keep the index alongside the tables whenever db.create_all()/drop_all() run
+event.listen(db.metadata, 'after_create', lambda target, connection, **kw: install_search_index(connection))
+event.listen(db.metadata, 'before_drop', lambda target, connection, **kw: drop_search_index(connection))
+
+
+def search_terms(query):
+    """Split free text into at most MAX_TERMS word tokens
+
+    The last term (still being typed) and any term written with a trailing
+    "*" are prefix terms and keep the "*".
+    """
+    terms = _TERM.findall(query or '')[:MAX_TERMS]
+    if terms and not terms[-1].endswith('*'):
+        terms[-1] += '*'
+    return terms
+
+
+def match_expression(terms):
+    """FTS5 MATCH string requiring every term
+
+    Terms are quoted, so user input can never inject FTS5 operators.
+    """
+    return ' '.join(f'"{term[:-1]}"*' if term.endswith('*') else f'"{term}"' for term in terms)
+
+
+def highlight(snippet):
+    """Render a snippet as HTML with matches wrapped in <mark>"""
+    return Markup(str(escape(snippet or ''))
+                  .replace(MARK_START, '<mark>').replace(MARK_END, '</mark>'))
+
+
+def plain(snippet):
+    """A snippet with the highlight markers removed"""
+    return (snippet or '').replace(MARK_START, '').replace(MARK_END, '')
+
+
+def mark_terms(text_value, terms, max_words=None):
+    """Wrap words starting with a search term in highlight markers
+
+    With max_words, return an excerpt of that many words around the first
+    match instead of the whole text.
+    """
+    text_value = text_value or ''
+    if not terms:
+        return text_value
+    stems = [term.rstrip('*') for term in terms]
+    pattern = re.compile(r'\b(?:' + '|'.join(re.escape(stem) for stem in stems) + r')\w*', re.IGNORECASE)
+    if max_words:
+        words = text_value.split()
+        if len(words) > max_words:
+            first = next((i for i, word in enumerate(words) if pattern.search(word)), 0)
+            start = max(0, min(first - max_words // 3, len(words) - max_words))
+            text_value = ('… ' if start else '') + ' '.join(words[start:start + max_words]) + \
+                (' …' if start + max_words < len(words) else '')
+    return pattern.sub(lambda m: MARK_START + m.group(0) + MARK_END, text_value)
+
+
+def _use_fts():
+    return db.engine.dialect.name == 'sqlite'
+
+
+def _search_fts(fts_table, table, columns, weights, match, limit, offset):
+    """BM25-ranked page of rows; ties go to the newer row
+
+    Every match is scored, so the order is the same on every page and
+    paging walks each row exactly once.
+    """
+    rows = db.session.execute(text(
+        f"SELECT {', '.join('t.' + c for c in columns)}, h.score "
+        f"FROM (SELECT rowid, bm25({fts_table}, {weights}) AS score FROM {fts_table} "
+        f"WHERE {fts_table} MATCH :match ORDER BY score, rowid DESC LIMIT :limit OFFSET :offset) h "
+        f"JOIN {table} t ON t.id = h.rowid "
+        "ORDER BY h.score, t.id DESC"
+    ), {'match': match, 'limit': limit, 'offset': offset})
+    return [dict(row._mapping) for row in rows]
+
+
+def _search_like(model, columns, fields, terms, limit, offset):
+    """Portable fallback: every term must appear in one of the columns"""
+    condition = and_(*(or_(*(column.ilike(f"%{term.rstrip('*')}%") for column in columns))
+                       for term in terms))
+    rows = db.session.execute(
+        select(*(getattr(model, field) for field in fields))
+        .where(condition).order_by(model.id).limit(limit).offset(offset)
+    )
+    return [dict(row._mapping, score=None) for row in rows]
+
+
+def search(query, kind='resources', page=1, per_page=DEFAULT_PER_PAGE):
+    """One page of ranked results for a search box query
+
+    Returns {'query', 'kind', 'page', 'per_page', 'has_next', 'results'}.
+    One extra row is fetched to compute has_next, so no COUNT(*) is needed.
+    """
+    if kind not in KINDS:
+        raise ValueError(f"kind must be one of {', '.join(KINDS)}")
+    page = max(1, page)
+    per_page = max(1, min(per_page, MAX_PER_PAGE))
+    terms = search_terms(query)
+    results = []
+    if terms:
+        limit, offset = per_page + 1, (page - 1) * per_page
+        if kind == 'resources':
+            fields = RESOURCE_FIELDS
+            if _use_fts():
+                results = _search_fts('resource_fts', 'resource', fields, '10.0, 2.0',
+                                      match_expression(terms), limit, offset)
+            else:
+                results = _search_like(Resource, [Resource.title, Resource.subject],
+                                       fields, terms, limit, offset)
+            for row in results:
+                row['snippet'] = mark_terms(row['title'], terms)
+        else:
+            fields = QUESTION_FIELDS
+            if _use_fts():
+                results = _search_fts('question_fts', 'question', fields, '5.0, 1.0',
+                                      match_expression(terms), limit, offset)
+            else:
+                results = _search_like(Question, [Question.prompt, Question.options],
+                                       fields, terms, limit, offset)
+            for row in results:
+                row['snippet'] = mark_terms(row.pop('prompt'), terms, SNIPPET_WORDS)
+    return {
+        'query': ' '.join(terms).rstrip('*'),
+        'kind': kind,
+        'page': page,
+        'per_page': per_page,
+        'has_next': len(results) > per_page,
+        'results': results[:per_page],
+    }
+
+
+def rebuild_search_index():
+    """Refill both FTS indexes from the catalog tables"""
+    with db.engine.begin() as connection:
+        return install_search_index(connection, rebuild=True)
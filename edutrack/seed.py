@@ -0,0 +1,248 @@
+"""
+Synthetic scale data for EduTrack
+`flask --app app.py seed-scale` fills a database with users, resources,
+questions, study plans and Progress history at production-like volumes,
+so the hot views can be measured at scale (see bench_endpoints.py). Rows go
+in through bulk Core inserts in batches, and WeeklyStats and SubjectSkill
+are computed while the history is generated, so no recount pass is needed.
+
+The shape is meant to look real, not uniform:
+- how active a student is follows a log-normal distribution (a few heavy
+  users, a long tail of light ones);
+- activity clusters in the evening, dips at the weekend and grows towards
+  the present;
+- each student has a skill level, and easier questions are answered
+  correctly more often.
+"""
+
+import itertools
+import math
+import random
+from datetime import datetime, timedelta
+from sqlalchemy import func, insert, select
+from werkzeug.security import generate_password_hash
+from models import (db, User, Resource, Question, StudyPlan, Progress, WeeklyStats, SubjectSkill,
+                    prompt_fingerprint)
+from skills import SKILL_ALPHA
+from stats import RESOURCE_HOURS, QUIZ_HOURS, get_week_start
+
+SUBJECTS = ['Math', 'Physics', 'Chemistry', 'Biology', 'English']
+# (exam, share of students); None = no target exam
+EXAMS = [('JEE', 0.45), ('NEET', 0.35), ('KCET', 0.12), (None, 0.08)]
+GRADES = ['10', '11', '12']
+DIFFICULTIES = [('easy', 0.4), ('medium', 0.4), ('hard', 0.2)]
+# How much a question's difficulty moves the chance of a correct answer
+DIFFICULTY_BONUS = {'easy': 0.15, 'medium': 0.0, 'hard': -0.2}
+RESOURCE_TYPES = [('youtube', 0.5), ('pdf', 0.3), ('other', 0.2)]
+# Relative activity per hour of day (UTC), peaking in the evening
+HOUR_WEIGHTS = [1, 1, 1, 1, 1, 2, 3, 4, 5, 5, 5, 5, 6, 6, 6, 7, 9, 11, 13, 14, 13, 10, 6, 3]
+HOURS = range(24)
+HOUR_CUM_WEIGHTS = list(itertools.accumulate(HOUR_WEIGHTS))
+WEEKEND_FACTOR = 0.6
+QUIZ_SHARE = 0.7
+PLAN_SHARE = 0.6
+ACTIVITY_SIGMA = 1.0
+BATCH_SIZE = 50000
+DEFAULT_PASSWORD = 'scale123'
+
+
+def scale_email(prefix, n):
+    """Login of the n-th generated user, for the benchmark suite"""
+    return f'{prefix}{n}@edutrack.local'
+
+
+def pick(rng, weighted):
+    """One value from [(value, weight), ...]"""
+    return rng.choices([value for value, _ in weighted], [weight for _, weight in weighted])[0]
+
+
+class SeedReport:
+    """Rows written per table"""
+
+    def __init__(self):
+        self.rows = {}
+
+    def add(self, table, count):
+        self.rows[table] = self.rows.get(table, 0) + count
+
+    @property
+    def total(self):
+        return sum(self.rows.values())
+
+    def summary(self):
+        return ', '.join(f'{count:,} {table}' for table, count in self.rows.items())
+
+
+def _flush(model, rows, report):
+    if rows:
+        # Core executemany on the table: no ORM bookkeeping per row
+        db.session.execute(insert(model.__table__), rows)
+        report.add(model.__tablename__, len(rows))
+        rows.clear()
+
+
+def _new_ids(model, before):
+    """Ids of the rows inserted after id `before`, oldest first"""
+    return db.session.execute(select(model.id).where(model.id > before).order_by(model.id)).scalars().all()
+
+
+def _max_id(model):
+    return db.session.execute(select(func.max(model.id))).scalar() or 0
+
+
+def _timestamps(rng, count, weeks, now):
+    """count event times over the last `weeks` weeks, sorted oldest first"""
+    days = weeks * 7
+    midnight = now.replace(hour=0, minute=0, second=0)
+    times = []
+    while len(times) < count:
+        # Density grows linearly to twice the oldest day's (inverse CDF of 1 + x)
+        recency = math.sqrt(1 + 3 * rng.random()) - 1
+        day = midnight - timedelta(days=int((1 - recency) * days))
+        if day.weekday() >= 5 and rng.random() > WEEKEND_FACTOR:
+            continue
+        hour = rng.choices(HOURS, cum_weights=HOUR_CUM_WEIGHTS)[0]
+        moment = day + timedelta(seconds=hour * 3600 + rng.randrange(3600))
+        if moment <= now:
+            times.append(moment)
+    times.sort()
+    return times
+
+
+def seed_scale(users, resources, questions, events, weeks=12, prefix='scale', password=DEFAULT_PASSWORD,
+               seed=42, batch_size=BATCH_SIZE, progress=None):
+    """Generate and insert a synthetic dataset; returns a SeedReport
+
+    events is the average number of Progress rows per user. progress, if
+    given, is called with (table, rows written so far) after each batch.
+    """
+    rng = random.Random(seed)
+    now = datetime.utcnow().replace(microsecond=0)
+    start = now - timedelta(weeks=weeks)
+    report = SeedReport()
+    rows = []
+
+    def flush(model):
+        _flush(model, rows, report)
+        db.session.commit()
+        if progress:
+            progress(model.__tablename__, report.rows.get(model.__tablename__, 0))
+
+    # Users: one password hash for everyone (hashing is deliberately slow)
+    password_hash = generate_password_hash(password)
+    before = _max_id(User)
+    profiles = []
+    for n in range(users):
+        exam = pick(rng, EXAMS)
+        grade = rng.choice(GRADES)
+        rows.append({'name': f'Scale Student {n}', 'email': scale_email(prefix, n), 'password_hash': password_hash,
+                     'grade': grade, 'target_exam': exam, 'is_admin': False,
+                     'created_at': start - timedelta(days=rng.randrange(365))})
+        profiles.append(exam)
+        if len(rows) >= batch_size:
+            flush(User)
+    flush(User)
+    user_ids = _new_ids(User, before)
+
+    # Catalog
+    before = _max_id(Resource)
+    for n in range(resources):
+        subject = rng.choice(SUBJECTS)
+        resource_type = pick(rng, RESOURCE_TYPES)
+        rows.append({
+            'title': f'{subject} {rng.choice(["notes", "lecture", "worked examples", "revision sheet"])} {n}',
+            'subject': subject, 'grade': rng.choice(GRADES + [None]), 'exam': pick(rng, EXAMS),
+            'difficulty': pick(rng, DIFFICULTIES),
+            'url': (f'https://youtube.com/watch?v=scale{n}' if resource_type == 'youtube'
+                    else f'https://example.com/{prefix}/{n}' + ('.pdf' if resource_type == 'pdf' else '')),
+            'resource_type': resource_type,
+            'page_count': rng.randint(2, 120) if resource_type == 'pdf' else None,
+            'created_at': start - timedelta(minutes=rng.randrange(525600)),
+        })
+        if len(rows) >= batch_size:
+            flush(Resource)
+    flush(Resource)
+    resource_ids = _new_ids(Resource, before)
+
+    before = _max_id(Question)
+    question_meta = []
+    for n in range(questions):
+        subject = rng.choice(SUBJECTS)
+        exam = pick(rng, EXAMS[:-1])
+        difficulty = pick(rng, DIFFICULTIES)
+        prompt = f'[{prefix}] {subject} {difficulty} question {n}: which option is correct?'
+        rows.append({'subject': subject, 'exam': exam, 'difficulty': difficulty, 'prompt': prompt,
+                     'options': [f'Option {c}' for c in 'ABCD'], 'answer_index': rng.randrange(4),
+                     'prompt_hash': prompt_fingerprint(prompt),
+                     'created_at': start - timedelta(minutes=rng.randrange(525600))})
+        question_meta.append((exam, subject, difficulty))
+        if len(rows) >= batch_size:
+            flush(Question)
+    flush(Question)
+    question_ids = _new_ids(Question, before)
+    by_exam = {}
+    for question_id, meta in zip(question_ids, question_meta):
+        by_exam.setdefault(meta[0], []).append((question_id,) + meta[1:])
+    all_questions = [item for items in by_exam.values() for item in items]
+
+    # Study plans: an active plan over the coming weeks for most students
+    today = now.date()
+    for user_id in user_ids:
+        if rng.random() < PLAN_SHARE:
+            subjects = rng.sample(SUBJECTS, rng.randint(2, 4))
+            for day in range(-7, 21):
+                rows.append({'user_id': user_id, 'date': today + timedelta(days=day),
+                             'subject': subjects[day % len(subjects)], 'is_active': True, 'created_at': now})
+            if len(rows) >= batch_size:
+                flush(StudyPlan)
+    flush(StudyPlan)
+
+    # Progress history, with WeeklyStats and SubjectSkill built alongside
+    weekly = []
+    skill_rows = []
+    week_starts = {}  # date -> its Monday
+    mu = math.log(max(events, 1)) - ACTIVITY_SIGMA ** 2 / 2  # log-normal with mean `events`
+    for user_id, exam in zip(user_ids, profiles):
+        count = min(int(rng.lognormvariate(mu, ACTIVITY_SIGMA)), events * 20) if events else 0
+        ability = rng.betavariate(4, 3)
+        pool = by_exam.get(exam) or all_questions
+        weeks_seen = {}
+        skills = {}
+        for moment in _timestamps(rng, count, weeks, now):
+            day = moment.date()
+            week_start = week_starts.get(day)
+            if week_start is None:
+                week_start = week_starts[day] = get_week_start(day)
+            week = weeks_seen.setdefault(week_start, [0, 0, 0])
+            if pool and rng.random() < QUIZ_SHARE:
+                question_id, subject, difficulty = rng.choice(pool)
+                score = int(rng.random() < min(0.97, max(0.05, ability + DIFFICULTY_BONUS[difficulty])))
+                rows.append({'user_id': user_id, 'item_type': 'quiz', 'ref_id': question_id,
+                             'extra_score': score, 'timestamp': moment})
+                week[1] += 1
+                week[2] += score
+                accuracy, attempts = skills.get(subject, (0.0, 0))
+                skills[subject] = (accuracy + SKILL_ALPHA * (score - accuracy) if attempts else float(score),
+                                   attempts + 1)
+            elif resource_ids:
+                rows.append({'user_id': user_id, 'item_type': 'resource', 'ref_id': rng.choice(resource_ids),
+                             'extra_score': None, 'timestamp': moment})
+                week[0] += 1
+        for week_start, (done, attempted, correct) in weeks_seen.items():
+            weekly.append({'user_id': user_id, 'week_start': week_start, 'resources_completed': done,
+                           'quizzes_attempted': attempted, 'quizzes_correct': correct,
+                           'study_hours': done * RESOURCE_HOURS + attempted * QUIZ_HOURS, 'created_at': now})
+        for subject, (accuracy, attempts) in skills.items():
+            skill_rows.append({'user_id': user_id, 'subject': subject, 'accuracy': accuracy,
+                               'attempts': attempts, 'updated_at': now})
+        if len(rows) >= batch_size:
+            flush(Progress)
+        if len(weekly) >= batch_size:
+            _flush(WeeklyStats, weekly, report)
+        if len(skill_rows) >= batch_size:
+            _flush(SubjectSkill, skill_rows, report)
+    flush(Progress)
+    _flush(WeeklyStats, weekly, report)
+    _flush(SubjectSkill, skill_rows, report)
+    db.session.commit()
+    return report
@@ -0,0 +1,142 @@
+"""
+Per-subject adaptive difficulty for EduTrack
+Each (user, subject) keeps an exponentially weighted quiz accuracy in
+SubjectSkill. Recording answers is one UPDATE per subject; the quiz view
+reads a user's skills from a small per-process LRU cache, so picking a
+difficulty needs no Progress queries.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from sqlalchemy import select, update, insert
+from sqlalchemy.exc import IntegrityError
+from models import db, SubjectSkill
+from stats import difficulty_for_score, RECENT_QUIZ_COUNT
+
+# Weight of the newest answer; 2 / (N + 1) tracks roughly the last N answers
+SKILL_ALPHA = 2 / (RECENT_QUIZ_COUNT + 1)
+# Answers recorded by other processes show up after this many seconds
+SKILL_TTL_SECONDS = 300
+MAX_CACHED_USERS = 10000
+
+
+def ewma(accuracy, score, attempts):
+    """Fold one 0/1 score into an accuracy; the first answer sets it outright"""
+    if not attempts:
+        return float(score)
+    return accuracy + SKILL_ALPHA * (score - accuracy)
+
+
+def _increment_skill(user_id, subject, decay, offset, count, now):
+    """accuracy = accuracy * decay + offset; returns the number of rows matched"""
+    table = SubjectSkill.__table__
+    result = db.session.execute(
+        update(table)
+        .where(table.c.user_id == user_id, table.c.subject == subject)
+        .values(accuracy=table.c.accuracy * decay + offset,
+                attempts=table.c.attempts + count, updated_at=now)
+    )
+    return result.rowcount
+
+
+def record_answers(user_id, answers):
+    """Fold (subject, score) answers, oldest first, into the user's skills
+
+    k answers in a subject collapse to accuracy * (1 - alpha)^k + offset,
+    so each subject costs one UPDATE however many answers it has. The
+    caller commits, then calls skill_cache.apply() for each answer.
+    """
+    by_subject = {}
+    for subject, score in answers:
+        by_subject.setdefault(subject, []).append(1 if score == 1 else 0)
+    now = datetime.utcnow()
+    for subject, scores in by_subject.items():
+        decay, offset = 1.0, 0.0
+        for score in scores:
+            decay *= 1 - SKILL_ALPHA
+            offset = offset * (1 - SKILL_ALPHA) + SKILL_ALPHA * score
+        if _increment_skill(user_id, subject, decay, offset, len(scores), now):
+            continue
+        accuracy = 0.0
+        for attempts, score in enumerate(scores):
+            accuracy = ewma(accuracy, score, attempts)
+        try:
+            # Savepoint so a concurrent first answer only undoes this step
+            with db.session.begin_nested():
+                db.session.execute(insert(SubjectSkill.__table__).values(
+                    user_id=user_id, subject=subject, accuracy=accuracy,
+                    attempts=len(scores), updated_at=now
+                ))
+        except IntegrityError:
+            _increment_skill(user_id, subject, decay, offset, len(scores), now)
+
+
+def record_answer(user_id, subject, score):
+    """Fold one quiz answer into the user's skill for subject (caller commits)"""
+    record_answers(user_id, [(subject, score)])
+
+
+def overall_accuracy(skills):
+    """Attempt-weighted accuracy across subjects, or None with no answers"""
+    attempts = sum(count for _, count in skills.values())
+    if not attempts:
+        return None
+    return sum(accuracy * count for accuracy, count in skills.values()) / attempts
+
+
+def difficulty_for(skills, subject=None):
+    """Quiz level for a subject, falling back to all subjects if it is new"""
+    accuracy, attempts = skills.get(subject, (None, 0)) if subject else (None, 0)
+    if not attempts:
+        accuracy = overall_accuracy(skills)
+    return difficulty_for_score(accuracy)
+
+
+class SkillCache:
+    """Per-process LRU of {subject: (accuracy, attempts)} keyed by user id"""
+
+    def __init__(self, ttl=SKILL_TTL_SECONDS, max_users=MAX_CACHED_USERS):
+        self.ttl = ttl
+        self.max_users = max_users
+        self._lock = threading.Lock()
+        self._users = OrderedDict()  # user_id -> (loaded_at, skills)
+
+    def get(self, user_id):
+        """The user's skills, loading them with one SELECT on a miss"""
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is not None and time.monotonic() - entry[0] < self.ttl:
+                self._users.move_to_end(user_id)
+                return dict(entry[1])
+        skills = {subject: (accuracy, attempts) for subject, accuracy, attempts in db.session.execute(
+            select(SubjectSkill.subject, SubjectSkill.accuracy, SubjectSkill.attempts)
+            .where(SubjectSkill.user_id == user_id)
+        )}
+        with self._lock:
+            self._users[user_id] = (time.monotonic(), skills)
+            self._users.move_to_end(user_id)
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+        return dict(skills)
+
+    def apply(self, user_id, subject, score):
+        """Mirror record_answer() in a cached entry instead of reloading it"""
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is None:
+                return
+            accuracy, attempts = entry[1].get(subject, (0.0, 0))
+            entry[1][subject] = (ewma(accuracy, score, attempts), attempts + 1)
+
+    def invalidate(self, user_id=None):
+        """Forget one user's skills, or everyone's"""
+        with self._lock:
+            if user_id is None:
+                self._users.clear()
+            else:
+                self._users.pop(user_id, None)
+
+
+skill_cache = SkillCache()
@@ -0,0 +1,313 @@
+"""
+Incremental weekly statistics for EduTrack
+Progress events bump the matching WeeklyStats counters in the same transaction
+instead of recounting the whole week on every click.
+"""
+
+from collections import deque
+from datetime import datetime, timedelta
+from sqlalchemy import func, case, update, insert, delete, select
+from sqlalchemy.exc import IntegrityError
+from catalog import catalog_counts
+from models import db, Progress, WeeklyStats
+
+# Estimated study time per event (1 resource = 0.5 hours, 1 quiz = 0.25 hours)
+RESOURCE_HOURS = 0.5
+QUIZ_HOURS = 0.25
+
+# Adaptive quiz difficulty from the average score of the last few answers
+RECENT_QUIZ_COUNT = 5
+DIFFICULTY_THRESHOLDS = ((0.8, 'hard'), (0.5, 'medium'))
+
+# WeeklyStats columns the leaderboards rank by; bump_weekly_stats() leaves
+# (user_id, week_start, totals) under PENDING_TOTALS in session.info
+LEADERBOARD_COLUMNS = ('quizzes_attempted', 'quizzes_correct', 'study_hours')
+PENDING_TOTALS = 'weekly_stats_totals'
+
+# Weekly monitoring window (?weeks=N) and trailing moving-average length
+DEFAULT_HISTORY_WEEKS = 4
+MAX_HISTORY_WEEKS = 52
+MOVING_AVERAGE_WEEKS = 4
+
+
+def get_week_start(date_obj):
+    """Get the Monday of the week for a given date"""
+    days_since_monday = date_obj.weekday()
+    return date_obj - timedelta(days=days_since_monday)
+
+
+def difficulty_for_score(avg_score):
+    """Map an average quiz score (0..1, or None for no answers) to a level"""
+    if avg_score is None:
+        return 'easy'
+    for threshold, level in DIFFICULTY_THRESHOLDS:
+        if avg_score >= threshold:
+            return level
+    return 'easy'
+
+
+def stat_deltas(item_type, score):
+    """Return the WeeklyStats counter increments for one Progress event"""
+    if item_type == 'resource':
+        return {'resources_completed': 1, 'quizzes_attempted': 0,
+                'quizzes_correct': 0, 'study_hours': RESOURCE_HOURS}
+    if item_type == 'quiz':
+        return {'resources_completed': 0, 'quizzes_attempted': 1,
+                'quizzes_correct': 1 if score == 1 else 0, 'study_hours': QUIZ_HOURS}
+    return None
+
+
+def _increment_weekly_stats(user_id, week_start, deltas):
+    """UPDATE ... SET col = col + delta; returns the new LEADERBOARD_COLUMNS, or None if no row"""
+    table = WeeklyStats.__table__
+    return db.session.execute(
+        update(table)
+        .where(table.c.user_id == user_id, table.c.week_start == week_start)
+        .values({name: table.c[name] + value for name, value in deltas.items()})
+        .returning(*(table.c[name] for name in LEADERBOARD_COLUMNS))
+    ).first()
+
+
+def bump_weekly_stats(user_id, week_start, deltas):
+    """Atomically add deltas to a user's WeeklyStats row, creating it if missing"""
+    totals = _increment_weekly_stats(user_id, week_start, deltas)
+    if totals is None:
+        try:
+            # Savepoint so a concurrent insert of the same week only undoes this step
+            with db.session.begin_nested():
+                db.session.execute(insert(WeeklyStats.__table__).values(
+                    user_id=user_id,
+                    week_start=week_start,
+                    created_at=datetime.utcnow(),
+                    **deltas
+                ))
+            totals = tuple(deltas[name] for name in LEADERBOARD_COLUMNS)
+        except IntegrityError:
+            # Another request created the row first (uq_weekly_stats_user_week)
+            totals = _increment_weekly_stats(user_id, week_start, deltas)
+    # The row's new totals, for the leaderboards once this transaction commits
+    db.session.info.setdefault(PENDING_TOTALS, []).append((user_id, week_start, tuple(totals)))
+
+
+def record_progress(user_id, item_type, ref_id, score=None, timestamp=None):
+    """Insert a Progress row and fold it into WeeklyStats in one transaction"""
+    timestamp = timestamp or datetime.utcnow()
+    progress = Progress(
+        user_id=user_id,
+        item_type=item_type,
+        ref_id=ref_id,
+        extra_score=score,
+        timestamp=timestamp
+    )
+    db.session.add(progress)
+
+    deltas = stat_deltas(item_type, score)
+    if deltas:
+        bump_weekly_stats(user_id, get_week_start(timestamp.date()), deltas)
+
+    db.session.commit()
+    return progress
+
+
+def record_progress_batch(user_id, events):
+    """Insert many Progress rows and fold them into WeeklyStats; one commit
+
+    events are dicts with item_type, ref_id and optionally score, timestamp
+    and client_event_id. Each event counts towards the week of its own
+    timestamp, and deltas are summed per week first, so each week touched
+    by the batch costs one UPDATE however many events fall in it.
+    """
+    return record_progress_many([dict(event, user_id=user_id) for event in events])
+
+
+def record_progress_many(events):
+    """record_progress_batch() for events that each carry their own user_id"""
+    now = datetime.utcnow()
+    rows = []
+    weeks = {}
+    for event in events:
+        timestamp = event.get('timestamp') or now
+        rows.append({
+            'user_id': event['user_id'],
+            'item_type': event['item_type'],
+            'ref_id': event['ref_id'],
+            'extra_score': event.get('score'),
+            'timestamp': timestamp,
+            'client_event_id': event.get('client_event_id'),
+        })
+        deltas = stat_deltas(event['item_type'], event.get('score'))
+        if deltas:
+            key = (event['user_id'], get_week_start(timestamp.date()))
+            totals = weeks.setdefault(key, dict.fromkeys(deltas, 0))
+            for name, value in deltas.items():
+                totals[name] += value
+
+    if rows:
+        db.session.execute(insert(Progress), rows)
+    for (user_id, week_start), deltas in weeks.items():
+        bump_weekly_stats(user_id, week_start, deltas)
+    db.session.commit()
+    return len(rows)
+
+
+def _empty_week(user_id, week_start):
+    """Unsaved zeroed WeeklyStats for a week with no activity"""
+    return WeeklyStats(
+        user_id=user_id,
+        week_start=week_start,
+        resources_completed=0,
+        quizzes_attempted=0,
+        quizzes_correct=0,
+        study_hours=0.0
+    )
+
+
+def weekly_history(user_id, weeks=DEFAULT_HISTORY_WEEKS):
+    """Read-only weekly history for the monitoring page
+
+    Loads every week in the window with one range query, zero-fills the gaps
+    and computes accuracy, moving averages and week-over-week trends in a
+    single oldest-to-newest pass. Returns (current_week, weeks_data, trends)
+    with weeks_data ordered newest first.
+    """
+    weeks = max(1, min(MAX_HISTORY_WEEKS, weeks))
+    current_start = get_week_start(datetime.utcnow().date())
+    # Pull a few extra weeks so the oldest rows get a full moving average
+    span = weeks + MOVING_AVERAGE_WEEKS - 1
+    first_start = current_start - timedelta(weeks=span - 1)
+
+    rows = WeeklyStats.query.filter(
+        WeeklyStats.user_id == user_id,
+        WeeklyStats.week_start >= first_start,
+        WeeklyStats.week_start <= current_start
+    ).all()
+    by_week = {row.week_start: row for row in rows}
+
+    series = []
+    window = deque()
+    window_quizzes = window_hours = 0
+    for offset in range(span):
+        week_start = first_start + timedelta(weeks=offset)
+        stat = by_week.get(week_start) or _empty_week(user_id, week_start)
+        quizzes = stat.quizzes_attempted or 0
+        hours = stat.study_hours or 0.0
+
+        window.append((quizzes, hours))
+        window_quizzes += quizzes
+        window_hours += hours
+        if len(window) > MOVING_AVERAGE_WEEKS:
+            old_quizzes, old_hours = window.popleft()
+            window_quizzes -= old_quizzes
+            window_hours -= old_hours
+
+        series.append({
+            'week_start': week_start.strftime('%Y-%m-%d'),
+            'resources': stat.resources_completed or 0,
+            'quizzes': quizzes,
+            'accuracy': round(stat.get_accuracy(), 1),
+            'study_hours': round(hours, 1),
+            'avg_quizzes': round(window_quizzes / len(window), 1),
+            'avg_study_hours': round(window_hours / len(window), 1),
+        })
+
+    weeks_data = series[-weeks:][::-1]
+    for i, week in enumerate(weeks_data):
+        week['week'] = f"Week {weeks - i}"
+
+    if len(weeks_data) >= 2:
+        current, previous = weeks_data[0], weeks_data[1]
+        trends = {key: round(current[key] - previous[key], 1)
+                  for key in ('resources', 'quizzes', 'accuracy', 'study_hours')}
+    else:
+        trends = {'resources': 0, 'quizzes': 0, 'accuracy': 0, 'study_hours': 0}
+
+    current_week = by_week.get(current_start) or _empty_week(user_id, current_start)
+    return current_week, weeks_data, trends
+
+
+def recompute_weekly_stats(user_id=None):
+    """Rebuild WeeklyStats from the Progress history (repair path)
+
+    Returns the number of WeeklyStats rows written.
+    """
+    is_resource = case((Progress.item_type == 'resource', 1), else_=0)
+    is_quiz = case((Progress.item_type == 'quiz', 1), else_=0)
+    is_correct = case(((Progress.item_type == 'quiz') & (Progress.extra_score == 1), 1), else_=0)
+
+    query = select(
+        Progress.user_id,
+        func.date(Progress.timestamp).label('day'),
+        func.sum(is_resource),
+        func.sum(is_quiz),
+        func.sum(is_correct),
+    ).where(Progress.item_type.in_(('resource', 'quiz'))).group_by(
+        Progress.user_id, func.date(Progress.timestamp)
+    )
+    if user_id is not None:
+        query = query.where(Progress.user_id == user_id)
+
+    # Roll the per-day totals up into ISO weeks
+    weeks = {}
+    for uid, day, resources, quizzes, correct in db.session.execute(query):
+        if day is None:
+            continue
+        if isinstance(day, str):
+            day = datetime.strptime(day, '%Y-%m-%d').date()
+        key = (uid, get_week_start(day))
+        totals = weeks.setdefault(key, [0, 0, 0])
+        totals[0] += resources or 0
+        totals[1] += quizzes or 0
+        totals[2] += correct or 0
+
+    stale = delete(WeeklyStats)
+    if user_id is not None:
+        stale = stale.where(WeeklyStats.user_id == user_id)
+    db.session.execute(stale)
+
+    now = datetime.utcnow()
+    rows = [{
+        'user_id': uid,
+        'week_start': week_start,
+        'resources_completed': resources,
+        'quizzes_attempted': quizzes,
+        'quizzes_correct': correct,
+        'study_hours': resources * RESOURCE_HOURS + quizzes * QUIZ_HOURS,
+        'created_at': now,
+    } for (uid, week_start), (resources, quizzes, correct) in weeks.items()]
+    if rows:
+        db.session.execute(insert(WeeklyStats), rows)
+
+    db.session.commit()
+    return len(rows)
+
+
+def achievements_for(completed_resources, quiz_attempts):
+    """Simple achievements unlocked by activity totals"""
+    achievements = []
+    if completed_resources >= 5:
+        achievements.append('Resource Explorer')
+    if quiz_attempts >= 10:
+        achievements.append('Quiz Master')
+    if completed_resources >= 10 and quiz_attempts >= 20:
+        achievements.append('Dedicated Learner')
+    return achievements
+
+
+def dashboard_summary(user_id):
+    """Per-user activity totals in one grouped query, plus cached catalog totals"""
+    totals = dict(db.session.execute(
+        select(Progress.item_type, func.count())
+        .where(Progress.user_id == user_id)
+        .group_by(Progress.item_type)
+    ).all())
+    completed_resources = totals.get('resource', 0)
+    quiz_attempts = totals.get('quiz', 0)
+    catalog = catalog_counts()
+
+    return {
+        'completed_resources': completed_resources,
+        'total_resources': catalog['resources'],
+        'quiz_attempts': quiz_attempts,
+        'total_quizzes': catalog['questions'],
+        'achievements': achievements_for(completed_resources, quiz_attempts),
+    }
@@ -0,0 +1,149 @@
+"""
+Content-addressed PDF storage for EduTrack
+Files are stored once under their SHA-256 (fanned out as ab/cd/<hash>.pdf),
+referenced from Resource.content_hash, and served with immutable caching,
+strong ETags and Range support by the /files route in app.py.
+
+A file is deleted when the last Resource pointing at it is removed
+(release()), or by `flask gc-pdfs`. Uploads and ingestion write the file
+before they commit its Resource row, so both leave files alone until they
+are GC_MIN_AGE_SECONDS old. Storing content that already exists refreshes
+its mtime for the same reason.
+"""
+
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+import time
+from models import db, Resource
+
+CHUNK_SIZE = 64 * 1024
+PDF_URL_PREFIX = '/files'
+DIGEST_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+# Files younger than this may belong to a Resource row not yet committed
+GC_MIN_AGE_SECONDS = 3600
+
+
+def blob_path(root, digest):
+    """Where the file with this digest lives under the storage root"""
+    return os.path.join(root, digest[:2], digest[2:4], f'{digest}.pdf')
+
+
+def blob_url(digest):
+    """Public URL of a stored file"""
+    return f'{PDF_URL_PREFIX}/{digest}.pdf'
+
+
+def store_stream(stream, root):
+    """Stream a file object into storage, hashing as it is written
+
+    Returns (digest, size). If the content is already stored, the new copy
+    is discarded and the existing file is kept.
+    """
+    tmp_dir = os.path.join(root, '.tmp')
+    os.makedirs(tmp_dir, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=tmp_dir, suffix='.pdf')
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            for chunk in iter(lambda: stream.read(CHUNK_SIZE), b''):
+                digest.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+        hexdigest = digest.hexdigest()
+        target = blob_path(root, hexdigest)
+        if os.path.exists(target):
+            os.remove(tmp_path)
+            _touch(target)
+        else:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.replace(tmp_path, target)
+        return hexdigest, size
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def store_file(path, root):
+    """Copy a file from disk into storage; returns (digest, size)"""
+    with open(path, 'rb') as f:
+        return store_stream(f, root)
+
+
+def link_file(path, root, digest):
+    """Store a file whose digest is already known, without re-hashing it"""
+    target = blob_path(root, digest)
+    if os.path.exists(target):
+        _touch(target)
+    else:
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        tmp_path = target + '.tmp'
+        shutil.copyfile(path, tmp_path)
+        os.replace(tmp_path, target)
+    return target
+
+
+def _touch(path):
+    """Mark an existing file as just stored, so garbage collection waits"""
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def _age(path):
+    return time.time() - os.stat(path).st_mtime
+
+
+def reference_count(digest):
+    """Number of Resource rows pointing at a stored file"""
+    return Resource.query.filter_by(content_hash=digest).count()
+
+
+def release(digest, root, min_age=GC_MIN_AGE_SECONDS):
+    """Delete a stored file once no Resource references it; returns True if removed
+
+    Call after the Resource row is deleted and committed. A file stored in
+    the last min_age seconds is kept for gc-pdfs, since an upload of the
+    same content may be about to reference it.
+    """
+    if not digest or reference_count(digest):
+        return False
+    path = blob_path(root, digest)
+    try:
+        if _age(path) < min_age:
+            return False
+        os.remove(path)
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def collect_garbage(root, dry_run=False, min_age=GC_MIN_AGE_SECONDS):
+    """Remove stored files no Resource references; returns the digests removed
+
+    Files stored in the last min_age seconds are skipped (see module docstring).
+    """
+    referenced = set(db.session.execute(
+        db.select(Resource.content_hash).where(Resource.content_hash.isnot(None)).distinct()
+    ).scalars())
+    removed = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if d != '.tmp']
+        for filename in filenames:
+            digest = filename[:-4]
+            if filename.endswith('.pdf') and DIGEST_PATTERN.match(digest) and digest not in referenced:
+                path = os.path.join(dirpath, filename)
+                try:
+                    if _age(path) < min_age:
+                        continue
+                    if not dry_run:
+                        os.remove(path)
+                except FileNotFoundError:
+                    continue
+                removed.append(digest)
+    return removed
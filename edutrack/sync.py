@@ -0,0 +1,145 @@
+"""
+Offline event sync for EduTrack
+Clients that lose connectivity queue quiz answers and resource completions,
+each with a client-generated UUID and the time it happened, and upload them
+in batches to POST /api/v1/sync. A batch is applied in one transaction:
+events this user already stored (by client_event_id) are skipped, quiz answers are
+graded against one Question lookup, Progress rows go in as one executemany,
+each event is counted in the WeeklyStats row of its own week and each
+subject's skill is updated once.
+
+Uploading the same batch twice is harmless, so clients can retry freely.
+"""
+
+import uuid
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from models import db, Progress, Question, Resource
+from question_pool import question_pool
+from skills import record_answers, skill_cache
+from stats import record_progress_batch
+
+# Client clocks drift; timestamps further ahead than this are clamped to now
+MAX_CLOCK_SKEW = timedelta(minutes=5)
+EVENT_TYPES = ('quiz', 'resource')
+
+
+def parse_timestamp(value, now):
+    """Naive UTC datetime from an ISO 8601 string (None means now)"""
+    if value is None:
+        return now
+    try:
+        moment = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    except ValueError:
+        raise ValueError(f"invalid timestamp {value!r}")
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return min(moment, now + MAX_CLOCK_SKEW)
+
+
+def parse_event(raw, now):
+    """Validate one uploaded event; raises ValueError with a readable message"""
+    if not isinstance(raw, dict):
+        raise ValueError('event must be an object')
+    try:
+        event_id = str(uuid.UUID(str(raw.get('id'))))
+    except ValueError:
+        raise ValueError('id must be a UUID')
+    kind = raw.get('type')
+    if kind not in EVENT_TYPES:
+        raise ValueError(f"type must be one of {', '.join(EVENT_TYPES)}")
+    try:
+        if kind == 'quiz':
+            ref_id, chosen = int(raw['question_id']), int(raw['chosen'])
+        else:
+            ref_id, chosen = int(raw['resource_id']), None
+    except (KeyError, TypeError, ValueError):
+        needs = 'question_id and chosen' if kind == 'quiz' else 'resource_id'
+        raise ValueError(f"{kind} events need integer {needs}")
+    return {'id': event_id, 'type': kind, 'ref_id': ref_id, 'chosen': chosen,
+            'timestamp': parse_timestamp(raw.get('at'), now)}
+
+
+def _apply(user_id, events):
+    """Store the events not seen before; returns (stored, duplicate ids, rejected, graded)"""
+    ids = [event['id'] for event in events]
+    seen = set(db.session.execute(
+        select(Progress.client_event_id)
+        .where(Progress.user_id == user_id, Progress.client_event_id.in_(ids))
+    ).scalars())
+    fresh = [event for event in events if event['id'] not in seen]
+
+    quiz_ids = {event['ref_id'] for event in fresh if event['type'] == 'quiz'}
+    resource_ids = {event['ref_id'] for event in fresh if event['type'] == 'resource'}
+    questions = {question.id: question for question in
+                 Question.query.filter(Question.id.in_(quiz_ids))} if quiz_ids else {}
+    resources = set(db.session.execute(
+        select(Resource.id).where(Resource.id.in_(resource_ids))
+    ).scalars()) if resource_ids else set()
+
+    stored, rejected, graded = [], [], []
+    # Oldest first, so the skill average sees answers in the order they were given
+    for event in sorted(fresh, key=lambda event: event['timestamp']):
+        if event['type'] == 'quiz':
+            question = questions.get(event['ref_id'])
+            if question is None:
+                rejected.append({'id': event['id'], 'error': 'unknown question'})
+                continue
+            score = 1 if event['chosen'] == question.answer_index else 0
+            graded.append((event, question, score))
+        elif event['ref_id'] not in resources:
+            rejected.append({'id': event['id'], 'error': 'unknown resource'})
+            continue
+        else:
+            score = None
+        stored.append({'item_type': event['type'], 'ref_id': event['ref_id'], 'score': score,
+                       'timestamp': event['timestamp'], 'client_event_id': event['id']})
+    record_answers(user_id, [(question.subject, score) for _, question, score in graded])
+    record_progress_batch(user_id, stored)
+    return stored, [event_id for event_id in ids if event_id in seen], rejected, graded
+
+
+def sync_events(user_id, raw_events):
+    """Apply a batch of uploaded events for user_id in one transaction
+
+    Returns {'accepted', 'duplicates', 'rejected', 'results'}: ids stored
+    now, ids stored by an earlier upload (or repeated in this one),
+    {id, error} for events that can never be stored, and {id, correct,
+    answer_index} for each newly graded quiz answer. The client can drop
+    every event mentioned in the first three from its queue.
+    """
+    now = datetime.utcnow()
+    events, duplicates, rejected = {}, [], []
+    for raw in raw_events:
+        try:
+            event = parse_event(raw, now)
+        except ValueError as e:
+            rejected.append({'id': raw.get('id') if isinstance(raw, dict) else None, 'error': str(e)})
+            continue
+        if event['id'] in events:
+            duplicates.append(event['id'])
+        else:
+            events[event['id']] = event
+
+    for attempt in range(2):
+        try:
+            stored, seen, unknown, graded = _apply(user_id, list(events.values()))
+            break
+        except IntegrityError:
+            # A concurrent upload of the same events committed first; the
+            # retry finds them in the dedupe query
+            db.session.rollback()
+            if attempt:
+                raise
+
+    for event, question, score in graded:
+        skill_cache.apply(user_id, question.subject, score)
+        question_pool.remember(user_id, question.id)
+    return {
+        'accepted': [row['client_event_id'] for row in stored],
+        'duplicates': duplicates + seen,
+        'rejected': rejected + unknown,
+        'results': [{'id': event['id'], 'correct': bool(score), 'answer_index': question.answer_index}
+                    for event, question, score in graded],
+    }
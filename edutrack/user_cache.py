@@ -0,0 +1,124 @@
+"""
+Process-level cache behind flask-login's user_loader
+Every authenticated request needs the current user, so instead of a User
+SELECT per request the loader serves a detached, read-only copy of the
+profile columns from a small LRU. Entries expire after a TTL. When a User
+row is updated or deleted in this process its entry is dropped at the
+flush and again when the transaction commits, so a request that reloads
+the still-committed old row in between cannot keep it cached.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from flask_login import UserMixin
+from sqlalchemy import event, select
+from sqlalchemy.orm import object_session
+from models import db, User
+
+# Changes made by other processes (CLI scripts, other workers) show up
+# after this many seconds; 0 disables the cache
+USER_CACHE_TTL_SECONDS = 60
+MAX_CACHED_USERS = 10000
+
+PROFILE_COLUMNS = ('id', 'name', 'email', 'grade', 'target_exam', 'is_admin')
+# session.info key: ids of users changed in the open transaction
+CHANGED_USERS = 'user_cache_changed'
+
+
+class CachedUser(UserMixin):
+    """The profile columns of a User, without a session or password hash"""
+
+    def __init__(self, id, name, email, grade, target_exam, is_admin):
+        self.id = id
+        self.name = name
+        self.email = email
+        self.grade = grade
+        self.target_exam = target_exam
+        self.is_admin = bool(is_admin)
+
+    def __repr__(self):
+        return f'<CachedUser {self.id}>'
+
+
+class UserCache:
+    """Per-process LRU of CachedUser by id, with hit/miss counters"""
+
+    def __init__(self, ttl=USER_CACHE_TTL_SECONDS, max_users=MAX_CACHED_USERS):
+        self.ttl = ttl
+        self.max_users = max_users
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._users = OrderedDict()  # user_id -> (loaded_at, CachedUser)
+        self._generation = 0  # bumped by invalidate()
+
+    def get(self, user_id):
+        """Return the CachedUser for user_id, or None if there is no such user"""
+        if self.ttl > 0:
+            with self._lock:
+                entry = self._users.get(user_id)
+                if entry is not None and time.monotonic() - entry[0] < self.ttl:
+                    self._users.move_to_end(user_id)
+                    self.hits += 1
+                    return entry[1]
+                self.misses += 1
+                generation = self._generation
+        row = db.session.execute(
+            select(*(getattr(User, column) for column in PROFILE_COLUMNS)).where(User.id == user_id)
+        ).first()
+        if row is None:
+            return None
+        user = CachedUser(*row)
+        if self.ttl > 0:
+            with self._lock:
+                if generation != self._generation:
+                    # Invalidated while we read: the row may already be stale
+                    return user
+                self._users[user_id] = (time.monotonic(), user)
+                self._users.move_to_end(user_id)
+                while len(self._users) > self.max_users:
+                    self._users.popitem(last=False)
+        return user
+
+    def invalidate(self, user_id=None):
+        """Forget one user, or everyone"""
+        with self._lock:
+            self._generation += 1
+            if user_id is None:
+                self._users.clear()
+            else:
+                self._users.pop(user_id, None)
+
+    def stats(self):
+        """{'hits', 'misses', 'size'} since the process started"""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._users)}
+
+
+user_cache = UserCache()
+
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _forget_user(mapper, connection, target):
+    # Profile edits and is_admin changes through the ORM apply immediately;
+    # forgotten again at commit (see _forget_committed_users)
+    user_cache.invalidate(target.id)
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(CHANGED_USERS, set()).add(target.id)
+
+
+@event.listens_for(db.session, 'after_commit')
+def _forget_committed_users(session):
+    for user_id in session.info.pop(CHANGED_USERS, ()):
+        user_cache.invalidate(user_id)
+
+
+@event.listens_for(db.session, 'after_transaction_end')
+def _forget_rolled_back_users(session, transaction):
+    # A rolled-back change never reached the database; the flush already
+    # dropped the entries, so there is nothing more to forget
+    if transaction.parent is None:
+        session.info.pop(CHANGED_USERS, None)
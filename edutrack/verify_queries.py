@@ -0,0 +1,186 @@
+"""
+Query verification for EduTrack
+Drives the hot request handlers against a scratch database, captures every
+statement they issue and fails if EXPLAIN QUERY PLAN shows a full table scan
+or an endpoint issues more statements than its budget.
+
+Usage: python verify_queries.py
+"""
+
+import os
+import re
+import sys
+import tempfile
+
+# Point the app at a scratch database before it is imported
+os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'verify.db'))
+
+from datetime import datetime
+from sqlalchemy import event
+from app import app, db
+from pagination import encode_cursor
+
+# (method, url, form data) for every query-issuing path in dashboard(),
+# resources(), quiz(), study_plan(), weekly_monitoring(), search_page() and
+# the /api/v1 blueprint
+REQUESTS = [
+    ('GET', '/dashboard', None),
+    ('GET', '/quiz', None),
+    ('GET', '/quiz?subject=Math', None),
+    ('POST', '/quiz', {'qid': '1', 'chosen': '2'}),
+    ('GET', '/study_plan', None),
+    ('POST', '/study_plan', {'duration_weeks': '2', 'subjects': ['Math', 'Physics']}),
+    ('GET', '/weekly_monitoring', None),
+    ('GET', '/resources', None),
+    ('GET', '/resources?subject=Math&after=' + encode_cursor(datetime(2100, 1, 1), 1), None),
+    ('GET', '/search?q=kinematics', None),
+    ('GET', '/search?q=newton+law&kind=questions', None),
+    ('GET', '/api/v1/resources', None),
+    ('GET', '/api/v1/quiz/next', None),
+    ('POST', '/api/v1/quiz/answers', {'answers': [{'question_id': 1, 'chosen': 2},
+                                                  {'question_id': 3, 'chosen': 0}]}),
+    ('POST', '/api/v1/resources/complete', {'resource_ids': [1, 2]}),
+    ('POST', '/api/v1/sync', {'events': [
+        {'id': '7d0c5d2e-1b7a-4c55-9b1e-3f7a2a1c0001', 'type': 'quiz',
+         'question_id': 1, 'chosen': 2, 'at': '2024-01-08T09:30:00Z'},
+        {'id': '7d0c5d2e-1b7a-4c55-9b1e-3f7a2a1c0002', 'type': 'resource',
+         'resource_id': 1, 'at': '2024-01-09T18:00:00Z'}]}),
+    ('GET', '/api/v1/study_plan', None),
+    ('GET', '/api/v1/weekly_stats', None),
+    ('GET', '/api/v1/leaderboard', None),
+]
+
+# Statements allowed per request once process caches are warm; flask-login's
+# load_user() is served from user_cache, so it costs nothing here.
+QUERY_BUDGETS = [
+    ('/dashboard', 1),
+    ('/api/dashboard', 1),
+    # Difficulty comes from the skill cache: only the picked Question row
+    ('/quiz', 1),
+    ('/quiz?subject=Math', 1),
+    # Constant in the history length: one WeeklyStats range query
+    ('/weekly_monitoring?weeks=4', 1),
+    ('/weekly_monitoring?weeks=52', 1),
+    ('/api/v1/quiz/next', 1),
+    ('/api/v1/weekly_stats', 1),
+    # Served from the in-memory boards; leader names come from user_cache
+    ('/api/v1/leaderboard', 0),
+]
+
+# "SCAN progress" (or "SCAN TABLE progress" on older SQLite) without an index
+FULL_SCAN = re.compile(r'^SCAN (?:TABLE )?(\w+)(?!.*\bINDEX\b)')
+
+
+class StatementCapture:
+    """Record statements sent to the engine while enabled"""
+
+    def __init__(self, engine):
+        self.enabled = False
+        self.statements = []
+        event.listen(engine, 'before_cursor_execute', self._record)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        if self.enabled and not executemany:
+            self.statements.append((statement, parameters))
+
+    def run(self, func):
+        self.statements = []
+        self.enabled = True
+        try:
+            func()
+        finally:
+            self.enabled = False
+        return self.statements
+
+
+def full_scans(statement, parameters):
+    """Return the tables EXPLAIN QUERY PLAN scans without an index"""
+    keyword = statement.lstrip().split(None, 1)[0].upper()
+    if keyword not in ('SELECT', 'UPDATE', 'DELETE'):
+        return []
+    tables = set(db.metadata.tables)
+    with app.app_context(), db.engine.connect() as conn:
+        plan = conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).fetchall()
+    scans = []
+    for row in plan:
+        match = FULL_SCAN.match(row[-1])
+        if match and match.group(1) in tables:
+            scans.append(row[-1])
+    return scans
+
+
+def seed_database(client):
+    """Create the sample data and log in as the demo student"""
+    result = app.test_cli_runner().invoke(args=['init-db'])
+    if result.exit_code != 0:
+        raise SystemExit(result.output)
+    client.post('/login', data={'email': 'student@edutrack.local', 'password': 'student123'})
+    client.post('/track', data={'kind': 'resource', 'ref_id': '1'})
+    client.post('/quiz', data={'qid': '2', 'chosen': '1'})
+
+
+def check_query_plans(client, capture):
+    """Check every captured statement; return the number of failures"""
+    failures = 0
+    for method, url, data in REQUESTS:
+        # The JSON API takes JSON bodies; the HTML views take form posts
+        body = {'json': data} if url.startswith('/api/v1/') else {'data': data}
+        statements = capture.run(lambda: client.open(url, method=method, **body))
+        print(f"\n{method} {url} ({len(statements)} statements)")
+        for statement, parameters in statements:
+            summary = ' '.join(statement.split())[:70]
+            scans = full_scans(statement, parameters)
+            if scans:
+                failures += 1
+                print(f"  [FAIL] {summary}")
+                for detail in scans:
+                    print(f"         {detail}")
+            else:
+                print(f"  [OK] {summary}")
+    return failures
+
+
+def check_query_budgets(client, capture):
+    """Compare warm-cache statement counts against QUERY_BUDGETS"""
+    failures = 0
+    print("\nQuery budgets:")
+    for url, budget in QUERY_BUDGETS:
+        client.get(url)  # warm process-level caches
+        statements = capture.run(lambda: client.get(url))
+        if len(statements) > budget:
+            failures += 1
+            print(f"  [FAIL] GET {url}: {len(statements)} statements (budget {budget})")
+            for statement, parameters in statements:
+                print(f"         {' '.join(statement.split())[:70]}")
+        else:
+            print(f"  [OK] GET {url}: {len(statements)} statements (budget {budget})")
+    return failures
+
+
+def verify_queries():
+    """Run all checks; return the number of failures"""
+    print("=" * 60)
+    print("EduTrack Query Verification")
+    print("=" * 60)
+
+    app.config['TESTING'] = True
+    client = app.test_client()
+    # Requests run outside a long-lived app context so each one gets a
+    # fresh session, exactly as in production
+    seed_database(client)
+    with app.app_context():
+        capture = StatementCapture(db.engine)
+    failures = check_query_plans(client, capture)
+    failures += check_query_budgets(client, capture)
+
+    print("\n" + "=" * 60)
+    if failures:
+        print(f"[FAIL] {failures} check(s) failed")
+    else:
+        print("[OK] No full table scans and all query budgets met")
+    print("=" * 60)
+    return failures
+
+
+if __name__ == '__main__':
+    sys.exit(1 if verify_queries() else 0)
@@ -5,6 +5,7 @@ Shows database contents without interactive input
 
 from app import app, db
 from models import User, Resource, Question, StudyPlan, Progress, WeeklyStats
+from pagination import stream
 
 def show_database_contents():
     """Display database contents"""
@@ -14,41 +15,39 @@ def show_database_contents():
         print("=" * 70)
         
         # Users
-        users = User.query.all()
-        print(f"\n[USERS] Total: {len(users)}")
+        print(f"\n[USERS] Total: {User.query.count()}")
         print("-" * 70)
-        for u in users:
+        for u in stream(User.query.order_by(User.id)):
             admin = " [ADMIN]" if u.is_admin else ""
             print(f"  {u.id}. {u.name} ({u.email}){admin}")
         
         # Resources
-        resources = Resource.query.all()
-        print(f"\n[RESOURCES] Total: {len(resources)}")
+        resource_count = Resource.query.count()
+        print(f"\n[RESOURCES] Total: {resource_count}")
         print("-" * 70)
-        for r in resources[:10]:  # Show first 10
+        for r in Resource.query.order_by(Resource.id).limit(10):  # Show first 10
             print(f"  {r.id}. {r.title} [{r.resource_type.upper()}] - {r.subject}")
-        if len(resources) > 10:
-            print(f"  ... and {len(resources) - 10} more")
+        if resource_count > 10:
+            print(f"  ... and {resource_count - 10} more")
         
         # Questions
-        questions = Question.query.all()
-        print(f"\n[QUESTIONS] Total: {len(questions)}")
+        question_count = Question.query.count()
+        print(f"\n[QUESTIONS] Total: {question_count}")
         print("-" * 70)
-        for q in questions[:10]:  # Show first 10
+        for q in Question.query.order_by(Question.id).limit(10):  # Show first 10
             print(f"  {q.id}. {q.subject} ({q.exam}) - {q.difficulty}")
             print(f"      Q: {q.prompt[:50]}...")
-        if len(questions) > 10:
-            print(f"  ... and {len(questions) - 10} more")
+        if question_count > 10:
+            print(f"  ... and {question_count - 10} more")
         
         # Progress
         progress_count = Progress.query.count()
         print(f"\n[PROGRESS RECORDS] Total: {progress_count}")
         
         # Weekly Stats
-        weekly_stats = WeeklyStats.query.all()
-        print(f"\n[WEEKLY STATS] Total: {len(weekly_stats)}")
+        print(f"\n[WEEKLY STATS] Total: {WeeklyStats.query.count()}")
         print("-" * 70)
-        for ws in weekly_stats:
+        for ws in stream(WeeklyStats.query.order_by(WeeklyStats.id)):
             accuracy = ws.get_accuracy()
             print(f"  Week {ws.week_start}: Resources={ws.resources_completed}, "
                   f"Quizzes={ws.quizzes_attempted}, Accuracy={accuracy:.1f}%, "
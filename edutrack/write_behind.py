@@ -0,0 +1,209 @@
+"""
+Write-behind queue for Progress events
+With WRITE_BEHIND=1, /track and the quiz form hand their Progress event
+(and the quiz answer's skill update) to a bounded in-process queue and
+return at once. A background thread drains it in group commits: it waits
+until WRITE_BEHIND_BATCH events are queued or WRITE_BEHIND_FLUSH_MS has
+passed since the first one, then writes the whole batch with one INSERT,
+one UPDATE per (user, week) and one commit. On SQLite that turns one
+fsync and one write-lock hold per click into one per batch.
+
+Durability knobs:
+- An accepted event is at most about WRITE_BEHIND_FLUSH_MS old when it is
+  written. If the writer falls further behind than WRITE_BEHIND_MAX_LAG_MS
+  (a stuck or failing database), submit() writes synchronously instead,
+  so requests slow down or fail rather than pile up unwritten events.
+- When the queue is full, submit() blocks for up to
+  WRITE_BEHIND_BLOCK_MS, then writes synchronously (backpressure).
+- At interpreter exit (gunicorn worker shutdown included) the queue is
+  flushed, unless WRITE_BEHIND_FLUSH_ON_EXIT=0.
+
+Events still in the queue are lost if the process is killed. The queue is
+per process, and the thread starts on the first submit() in each process,
+so gunicorn's preloaded master never owns one. Without WRITE_BEHIND,
+submit() writes synchronously, exactly as before.
+"""
+
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from sqlalchemy.exc import OperationalError
+from models import db
+from skills import record_answers
+from stats import record_progress_many
+
+log = logging.getLogger(__name__)
+
+_CLOSE = object()
+
+
+def write_events(events):
+    """Write Progress events (and quiz skills) in one transaction"""
+    answers = {}
+    for event in events:
+        if event.get('subject') is not None:
+            answers.setdefault(event['user_id'], []).append((event['subject'], event['score']))
+    for user_id, user_answers in answers.items():
+        record_answers(user_id, user_answers)
+    return record_progress_many(events)
+
+
+class ProgressWriter:
+    """Queue Progress events and commit them in groups from a thread"""
+
+    def __init__(self, app, enabled=False, flush_ms=50, batch_size=500, queue_size=10000,
+                 max_lag_ms=2000, block_ms=100, flush_on_exit=True):
+        self.app = app
+        self.enabled = enabled
+        self.flush_interval = flush_ms / 1000
+        self.batch_size = batch_size
+        self.max_lag = max_lag_ms / 1000
+        self.block = block_ms / 1000
+        self.flush_on_exit = flush_on_exit
+        self.queue_size = queue_size
+        self.written = 0
+        self.batches = 0
+        self.synchronous = 0
+        self._lock = threading.Lock()
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self._in_flight_since = None
+        self._closed = False
+
+    def submit(self, user_id, item_type, ref_id, score=None, subject=None):
+        """Record one event: queued when enabled, else written now
+
+        subject is set for graded quiz answers, which also update the
+        user's SubjectSkill.
+        """
+        event = {'user_id': user_id, 'item_type': item_type, 'ref_id': ref_id, 'score': score,
+                 'subject': subject, 'timestamp': datetime.utcnow()}
+        if self.enabled and self._ensure_running() and self.lag() <= self.max_lag:
+            event['queued_at'] = time.monotonic()
+            try:
+                self._queue.put(event, timeout=self.block)
+                return
+            except queue.Full:
+                pass
+        with self._lock:
+            self.synchronous += 1
+        write_events([event])
+
+    def lag(self):
+        """Seconds the oldest unwritten event has been waiting"""
+        oldest = self._in_flight_since
+        with self._queue.mutex:
+            if self._queue.queue:
+                head = self._queue.queue[0]
+                if head is not _CLOSE and (oldest is None or head['queued_at'] < oldest):
+                    oldest = head['queued_at']
+        return time.monotonic() - oldest if oldest is not None else 0.0
+
+    def stats(self):
+        """Counters for this process"""
+        queued = self._queue.qsize() if self._queue is not None else 0
+        return {'queued': queued, 'written': self.written, 'batches': self.batches,
+                'synchronous': self.synchronous,
+                'lag_ms': round(self.lag() * 1000, 1) if self._queue is not None else 0.0}
+
+    def _ensure_running(self):
+        with self._lock:
+            if self._pid == os.getpid() and (self._thread is not None or self._closed):
+                return not self._closed
+            # First submit in this process (or the first after a fork)
+            self._queue = queue.Queue(maxsize=self.queue_size)
+            self._in_flight_since = None
+            self._closed = False
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='progress-writer', daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+            return True
+
+    def _take(self):
+        """The next batch: up to batch_size events within flush_interval of the first"""
+        first = self._queue.get()
+        if first is _CLOSE:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                event = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if event is _CLOSE:
+                self._queue.put(_CLOSE)  # handled after this batch is written
+                break
+            batch.append(event)
+        self._in_flight_since = first['queued_at']
+        return batch
+
+    def _run(self):
+        with self.app.app_context():
+            while True:
+                batch = self._take()
+                if batch is None:
+                    return
+                self._flush(batch)
+
+    def _flush(self, batch):
+        delay = 0.05
+        while True:
+            try:
+                write_events(batch)
+                break
+            except OperationalError:
+                # Locked or unreachable database: keep the batch and retry;
+                # submit() goes synchronous once the lag passes max_lag
+                db.session.rollback()
+                log.exception('write-behind flush of %d events failed; retrying', len(batch))
+                time.sleep(delay)
+                delay = min(delay * 2, 1.0)
+            except Exception:
+                # A bad event would fail every retry: write one at a time
+                db.session.rollback()
+                self._flush_singly(batch)
+                break
+            finally:
+                db.session.remove()
+        with self._lock:
+            self.written += len(batch)
+            self.batches += 1
+        self._in_flight_since = None
+
+    def _flush_singly(self, batch):
+        for event in batch:
+            try:
+                write_events([event])
+            except Exception:
+                db.session.rollback()
+                log.exception('write-behind: dropped event %r', event)
+
+    def close(self, timeout=30):
+        """Flush what is queued (unless flush_on_exit is off) and stop the thread"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+            self._closed = True
+        if thread is None or self._pid != os.getpid():
+            return
+        if not self.flush_on_exit:
+            dropped = 0
+            while True:
+                try:
+                    self._queue.get_nowait()
+                    dropped += 1
+                except queue.Empty:
+                    break
+            if dropped:
+                log.warning('write-behind: dropped %d unwritten events at exit', dropped)
+        self._queue.put(_CLOSE)
+        thread.join(timeout)
+        if thread.is_alive():
+            log.warning('write-behind: %d events still queued after %ss', self._queue.qsize(), timeout)
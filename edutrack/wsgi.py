@@ -0,0 +1,39 @@
+"""
+Production entry point for EduTrack
+
+    flask --app app.py upgrade-db                  # once per deploy
+    gunicorn -c gunicorn.conf.py wsgi:application
+
+gunicorn.conf.py turns on preload_app, so this module is imported once, in
+the master: the app is built and the question pool and catalog counts are
+loaded before the workers fork and share them copy-on-write. The master's
+database connections are closed before forking so no two workers ever use
+the same socket. Startup does not create or migrate tables; until
+upgrade-db has run, /health/ready answers 503.
+"""
+
+import logging
+from sqlalchemy.exc import SQLAlchemyError
+from app import app
+from catalog import catalog_counts
+from models import db
+from question_pool import question_pool
+
+application = app
+
+
+def warm_up():
+    """Load the process caches every worker needs, then drop connections"""
+    with app.app_context():
+        try:
+            question_pool.subjects()
+            catalog_counts()
+        except SQLAlchemyError as e:
+            # Serve anyway; the readiness probe reports what is missing
+            logging.getLogger(__name__).warning('cache warm-up skipped: %s', e)
+        finally:
+            db.session.remove()
+            db.engine.dispose()
+
+
+warm_up()